@@ -31,6 +31,7 @@ def run(num_epochs=10, show_plot=False):
     rbm.initialize(data, 'stddev')
     rbm.layers[0].params.log_var[:] = \
       be.log(0.05*be.ones_like(rbm.layers[0].params.log_var))
+    rbm.mark_parameters_changed()
 
     opt = optimizers.ADAM(stepsize=learning_rate)
 
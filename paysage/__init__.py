@@ -8,3 +8,4 @@ from . import metrics
 from . import models
 from . import preprocess
 from . import factorization
+from . import profiler
@@ -1,3 +1,4 @@
+import multiprocessing
 import numpy
 import numexpr as ne
 from . import typedef as T
@@ -191,6 +192,26 @@ def zeros_like(tensor: T.Tensor) -> T.Tensor:
     """
     return zeros(shape(tensor))
 
+def shared_zeros(shape: T.Tuple[int], dtype: T.Dtype = T.Float) -> T.Tensor:
+    """
+    Return a tensor of zeros stored in shared memory.
+
+    Notes:
+        The memory is shared with any processes that are forked
+        after the tensor is created, so changes made by one process
+        are seen by all of them.
+
+    Args:
+        shape: The shape of the desired tensor.
+
+    Returns:
+        tensor: A tensor of zeros with the desired shape.
+
+    """
+    size = int(numpy.prod(shape))
+    buffer = multiprocessing.RawArray('b', max(1, size * numpy.dtype(dtype).itemsize))
+    return numpy.frombuffer(buffer, dtype=dtype, count=size).reshape(shape)
+
 def ones(shape: T.Tuple[int], dtype: T.Dtype = T.Float) -> T.Tensor:
     """
     Return a tensor of a specified shape filled with ones.
@@ -314,6 +335,71 @@ def index_select(mat: T.Tensor, index: T.Tensor, dim: int = 0) -> T.Tensor:
     elif dim == 1:
         return mat[:, index]
 
+def index_select_(mat: T.Tensor, index: T.Tensor, out: T.Tensor) -> None:
+    """
+    Select the specified rows of a tensor into an existing tensor.
+    Equivalent to out[:] = mat[index, :] in numpy.
+
+    Notes:
+        Modifies out in place.
+
+    Args:
+        mat (tensor (num_samples, num_units))
+        index (tensor; 1 -dimensional)
+        out (tensor (len(index), num_units))
+
+    Returns:
+        None
+
+    """
+    numpy.take(mat, index, axis=0, out=out)
+
+def pack_bits(tensor: T.Tensor) -> T.Tensor:
+    """
+    Pack the rows of a binary tensor into bytes.
+    Each byte holds 8 units, with the first unit in the most significant bit.
+
+    Args:
+        tensor (tensor (num_samples, num_units)): a tensor of zeros and ones.
+
+    Returns:
+        tensor (tensor (num_samples, ceil(num_units / 8)); uint8)
+
+    """
+    return numpy.packbits(tensor != 0, axis=1)
+
+def unpack_bits(packed: T.Tensor, num_units: int) -> T.Tensor:
+    """
+    Unpack the rows of a tensor packed with pack_bits.
+
+    Args:
+        packed (tensor (num_samples, ceil(num_units / 8)); uint8)
+        num_units (int): the number of units in each row.
+
+    Returns:
+        tensor (tensor (num_samples, num_units)): a tensor of zeros and ones.
+
+    """
+    return numpy.unpackbits(packed, axis=1, count=num_units).astype(T.Float)
+
+def unpack_bits_(packed: T.Tensor, out: T.Tensor) -> None:
+    """
+    Unpack the rows of a tensor packed with pack_bits into an existing tensor.
+
+    Notes:
+        Modifies out in place.
+
+    Args:
+        packed (tensor (num_samples, ceil(num_units / 8)); uint8)
+        out (tensor (num_samples, num_units))
+
+    Returns:
+        None
+
+    """
+    numpy.copyto(out, numpy.unpackbits(packed, axis=1, count=out.shape[1]),
+                 casting='unsafe')
+
 def sign(tensor: T.Tensor) -> T.Tensor:
     """
     Return the elementwise sign of a tensor.
@@ -572,6 +658,37 @@ def sqrt_div(x: T.Tensor, y: T.Tensor) -> T.Tensor:
     z = T.EPSILON + y
     return ne.evaluate('x/sqrt(z)')
 
+def adam_delta_(stepsize: T.Scalar, mean_norm: T.Scalar,
+                mean_square_norm: T.Scalar, mean: T.Tensor,
+                mean_square: T.Tensor, delta: T.Tensor) -> None:
+    """
+    Compute a normalized gradient step in a single pass.
+
+    delta <- stepsize * (mean / mean_norm) /
+                sqrt(EPSILON + mean_square / mean_square_norm)
+
+    Notes:
+        Modifies delta in place.
+
+    Args:
+        stepsize: The step size.
+        mean_norm: The normalization of the mean.
+        mean_square_norm: The normalization of the mean square.
+        mean: A tensor.
+        mean_square: A non-negative tensor.
+        delta: A tensor.
+
+    Returns:
+        None
+
+    """
+    eps = T.Float(T.EPSILON)
+    lr = T.Float(stepsize)
+    norm = T.Float(mean_norm)
+    square_norm = T.Float(mean_square_norm)
+    ne.evaluate('lr * ((mean / norm) / sqrt(eps + mean_square / square_norm))',
+                out=delta)
+
 def normalize(x: T.Tensor) -> T.Tensor:
     """
     Divide x by it's sum.
@@ -898,6 +1015,24 @@ def greater(x: T.Tensor, y: T.Tensor) -> T.Boolean:
     """
     return numpy.greater(x, y)
 
+def greater_(x: T.Tensor, y: T.Tensor, out: T.Tensor) -> None:
+    """
+    Elementwise test if x > y, stored as floats.
+
+    Notes:
+        Modifies out in place.
+
+    Args:
+        x: A tensor.
+        y: A tensor.
+        out: A tensor.
+
+    Returns:
+        None
+
+    """
+    numpy.greater(x, y, out=out)
+
 def greater_equal(x: T.Tensor, y: T.Tensor) -> T.Boolean:
     """
     Elementwise test if x >= y.
@@ -926,6 +1061,24 @@ def lesser(x: T.Tensor, y: T.Tensor) -> T.Boolean:
     """
     return numpy.less(x, y)
 
+def lesser_(x: T.Tensor, y: T.Tensor, out: T.Tensor) -> None:
+    """
+    Elementwise test if x < y, stored as floats.
+
+    Notes:
+        Modifies out in place.
+
+    Args:
+        x: A tensor.
+        y: A tensor.
+        out: A tensor.
+
+    Returns:
+        None
+
+    """
+    numpy.less(x, y, out=out)
+
 def lesser_equal(x: T.Tensor, y: T.Tensor) -> T.Boolean:
     """
     Elementwise test if x <= y.
@@ -997,6 +1150,23 @@ def argsort(x: T.Tensor, axis: int = None) -> T.Tensor:
     """
     return numpy.argsort(x, axis=axis)
 
+def kth_smallest(x: T.Tensor, k: int, axis: int = 1) -> T.Tensor:
+    """
+    Get the kth smallest values along an axis of a tensor.
+    Uses a partial sort (selection) rather than a full sort.
+
+    Args:
+        x: A tensor.
+        k (int > 0): the rank of the value (k=1 is the minimum).
+        axis: The axis of interest.
+
+    Returns:
+        tensor: the kth smallest values, with the axis removed.
+
+    """
+    partitioned = numpy.partition(x, k-1, axis=axis)
+    return numpy.take(partitioned, k-1, axis=axis)
+
 def argmax(x: T.Tensor, axis: int) -> T.Tensor:
     """
     Compute the indices of the maximal elements in x along the specified axis.
@@ -1059,6 +1229,25 @@ def dot(a: T.Tensor, b: T.Tensor) -> T.FloatingPoint:
     """
     return numpy.dot(a, b)
 
+def dot_(a: T.Tensor, b: T.Tensor, out: T.Tensor) -> None:
+    """
+    Compute the matrix product of matrices a and b.
+
+    Notes:
+        Modifies out in place.
+        Out must have the shape and dtype of the product.
+
+    Args:
+        a: A tensor (n, k).
+        b: A tensor (k, m).
+        out: A tensor (n, m).
+
+    Returns:
+        None
+
+    """
+    numpy.dot(a, b, out=out)
+
 def outer(x: T.Tensor, y: T.Tensor) -> T.Tensor:
     """
     Compute the outer product of vectors x and y.
@@ -104,6 +104,22 @@ def expit(x: T.Tensor) -> T.Tensor:
     """
     return ne.evaluate('(1 + tanh(x/2))/2')
 
+def expit_(x: T.Tensor) -> None:
+    """
+    Elementwise expit (a.k.a. logistic) function of a tensor.
+
+    Notes:
+        Modifies x in place.
+
+    Args:
+        x: A tensor.
+
+    Returns:
+        None
+
+    """
+    ne.evaluate('(1 + tanh(x/2))/2', out=x)
+
 def softmax(x: T.Tensor, axis: int = 1) -> T.Tensor:
     """
     Softmax function on a tensor.
@@ -1,10 +1,14 @@
 import numpy
+import numexpr as ne
 from . import matrix
 from . import nonlinearity as nl
 from . import typedef as T
 
 DEFAULT_SEED = 137
 
+# a generator that can write random numbers directly into existing tensors
+GENERATOR = numpy.random.Generator(numpy.random.PCG64(DEFAULT_SEED))
+
 def set_seed(n: int = DEFAULT_SEED) -> None:
     """
     Set the seed of the random number generator.
@@ -20,6 +24,34 @@ def set_seed(n: int = DEFAULT_SEED) -> None:
 
     """
     numpy.random.seed(int(n))
+    GENERATOR.bit_generator.state = numpy.random.PCG64(int(n)).state
+
+def get_rng_state():
+    """
+    Get the state of the random number generators.
+
+    Args:
+        None
+
+    Returns:
+        state: An object that can be passed to set_rng_state.
+
+    """
+    return (numpy.random.get_state(), GENERATOR.bit_generator.state)
+
+def set_rng_state(state) -> None:
+    """
+    Set the state of the random number generators.
+
+    Args:
+        state: A state returned by get_rng_state.
+
+    Returns:
+        None
+
+    """
+    numpy.random.set_state(state[0])
+    GENERATOR.bit_generator.state = state[1]
 
 def rand(shape: T.Tuple[int]) -> T.Tensor:
     """
@@ -76,6 +108,74 @@ def randn_like(tensor: T.Tensor) -> T.Tensor:
     """
     return numpy.random.randn(*matrix.shape(tensor)).astype(tensor.dtype)
 
+def rand_(tensor: T.Tensor) -> None:
+    """
+    Fill a tensor with uniform random numbers between 0 and 1.
+
+    Notes:
+        Modifies tensor in place.
+        Draws from a generator that is seeded along with numpy.random.
+
+    Args:
+        tensor: A float tensor.
+
+    Returns:
+        None
+
+    """
+    GENERATOR.random(dtype=tensor.dtype, out=tensor)
+
+def randn_(tensor: T.Tensor) -> None:
+    """
+    Fill a tensor with random numbers drawn from a standard normal
+    distribution (mean = 0, variance = 1).
+
+    Notes:
+        Modifies tensor in place.
+        Draws from a generator that is seeded along with numpy.random.
+
+    Args:
+        tensor: A float tensor.
+
+    Returns:
+        None
+
+    """
+    GENERATOR.standard_normal(dtype=tensor.dtype, out=tensor)
+
+def rand_bernoulli_(field: T.Tensor, loc: T.Tensor, beta: T.Tensor,
+                    random: T.Tensor, out: T.Tensor) -> None:
+    """
+    Draw Bernoulli samples from a field in a single fused pass.
+
+    out = float(random < expit(beta * (field + loc)))
+
+    Notes:
+        Modifies random and out in place.
+        The field is typically the output of a matrix product and may be
+        overwritten (it is treated as scratch space).
+
+    Args:
+        field (tensor (num_samples, num_units)): the field from the
+            connected layers.
+        loc (tensor (num_units,)): the bias of the units.
+        beta (tensor (num_samples, 1) or None): inverse temperatures.
+        random (tensor (num_samples, num_units)): a buffer that is filled
+            with uniform random numbers.
+        out (tensor (num_samples, num_units)): the sampled units.
+
+    Returns:
+        None
+
+    """
+    rand_(random)
+    if beta is None:
+        ne.evaluate('where(random < (1 + tanh((field + loc)/2))/2, 1, 0)',
+                    out=out, casting='unsafe')
+    else:
+        ne.evaluate('where(random < (1 + tanh(beta*(field + loc)/2))/2, 1, 0)',
+                    out=out, casting='unsafe')
+
 def rand_int(a: int, b: int, shape: T.Tuple[int]) -> T.Tensor:
     """
     Generate random integers in [a, b).
@@ -200,6 +200,25 @@ def zeros_like(tensor: T.TorchTensor) -> T.FloatTensor:
     """
     return torch.zeros_like(tensor)
 
+def shared_zeros(shape: T.Tuple[int], dtype: T.Dtype=T.Float) -> T.Tensor:
+    """
+    Return a tensor of zeros stored in shared memory.
+
+    Notes:
+        The memory is shared with any processes that are forked
+        after the tensor is created, so changes made by one process
+        are seen by all of them.
+        Only tensors on the cpu can be shared.
+
+    Args:
+        shape: The shape of the desired tensor.
+
+    Returns:
+        tensor: A tensor of zeros with the desired shape.
+
+    """
+    return torch.zeros(shape, dtype=dtype).share_memory_()
+
 def ones(shape: T.Tuple[int], dtype: T.Dtype=T.Float) -> T.Tensor:
     """
     Return a tensor of a specified shape filled with ones.
@@ -322,6 +341,92 @@ def index_select(mat: T.Tensor, index: T.LongTensor, dim: int = 0) -> T.Tensor:
     """
     return torch.index_select(mat, dim, index)
 
+def index_select_(mat: T.Tensor, index: T.LongTensor, out: T.Tensor) -> None:
+    """
+    Select the specified rows of a tensor into an existing tensor.
+    Equivalent to out[:] = mat[index, :] in numpy.
+
+    Notes:
+        Modifies out in place.
+
+    Args:
+        mat (tensor (num_samples, num_units))
+        index (tensor; 1 -dimensional)
+        out (tensor (len(index), num_units))
+
+    Returns:
+        None
+
+    """
+    torch.index_select(mat, 0, index, out=out)
+
+def _bit_shifts(tensor: T.Tensor) -> T.ByteTensor:
+    """
+    The shifts of the bits in a byte, from the most significant bit.
+
+    Args:
+        tensor: a tensor on the device to use.
+
+    Returns:
+        tensor (8,)
+
+    """
+    return torch.arange(7, -1, -1, dtype=T.Byte, device=tensor.device)
+
+def pack_bits(tensor: T.Tensor) -> T.ByteTensor:
+    """
+    Pack the rows of a binary tensor into bytes.
+    Each byte holds 8 units, with the first unit in the most significant bit.
+
+    Args:
+        tensor (tensor (num_samples, num_units)): a tensor of zeros and ones.
+
+    Returns:
+        tensor (tensor (num_samples, ceil(num_units / 8)); uint8)
+
+    """
+    num_samples, num_units = tensor.shape
+    bits = (tensor != 0).to(T.Byte)
+    padding = (-num_units) % 8
+    if padding:
+        bits = torch.cat([bits, torch.zeros((num_samples, padding), dtype=T.Byte,
+                                            device=bits.device)], dim=1)
+    bits = bits.view(num_samples, -1, 8) << _bit_shifts(bits)
+    return torch.sum(bits, dim=2, dtype=T.Byte)
+
+def unpack_bits(packed: T.ByteTensor, num_units: int) -> T.FloatTensor:
+    """
+    Unpack the rows of a tensor packed with pack_bits.
+
+    Args:
+        packed (tensor (num_samples, ceil(num_units / 8)); uint8)
+        num_units (int): the number of units in each row.
+
+    Returns:
+        tensor (tensor (num_samples, num_units)): a tensor of zeros and ones.
+
+    """
+    bits = (packed.unsqueeze(2) >> _bit_shifts(packed)) & 1
+    return bits.view(len(packed), -1)[:, :num_units].to(T.Float)
+
+def unpack_bits_(packed: T.ByteTensor, out: T.FloatTensor) -> None:
+    """
+    Unpack the rows of a tensor packed with pack_bits into an existing tensor.
+
+    Notes:
+        Modifies out in place.
+
+    Args:
+        packed (tensor (num_samples, ceil(num_units / 8)); uint8)
+        out (tensor (num_samples, num_units))
+
+    Returns:
+        None
+
+    """
+    bits = (packed.unsqueeze(2) >> _bit_shifts(packed)) & 1
+    out.copy_(bits.view(len(packed), -1)[:, :out.shape[1]])
+
 def sign(tensor: T.TorchTensor) -> T.FloatTensor:
     """
     Return the elementwise sign of a tensor.
@@ -569,7 +674,10 @@ def mix_(w: T.FloatingPoint,
 
     """
     x.mul_(w)
-    x.add_(y.mul(1-w))
+    if torch.is_tensor(w):
+        x.add_(y.mul(1-w))
+    else:
+        x.add_(y, alpha=1-w)
 
 def square_mix_(w: T.FloatingPoint,
                        x: T.FloatTensor,
@@ -593,7 +701,10 @@ def square_mix_(w: T.FloatingPoint,
 
     """
     x.mul_(w)
-    x.add_(y.mul(y).mul(1-w))
+    if torch.is_tensor(w):
+        x.add_(y.mul(y).mul(1-w))
+    else:
+        x.addcmul_(y, y, value=1-w)
 
 def sqrt_div(x: T.FloatTensor, y: T.FloatTensor) -> T.FloatTensor:
     """
@@ -609,6 +720,35 @@ def sqrt_div(x: T.FloatTensor, y: T.FloatTensor) -> T.FloatTensor:
     """
     return x.div(torch.sqrt(T.EPSILON + y))
 
+def adam_delta_(stepsize: T.Scalar, mean_norm: T.Scalar,
+                mean_square_norm: T.Scalar, mean: T.FloatTensor,
+                mean_square: T.FloatTensor, delta: T.FloatTensor) -> None:
+    """
+    Compute a normalized gradient step without allocating temporaries.
+
+    delta <- stepsize * (mean / mean_norm) /
+                sqrt(EPSILON + mean_square / mean_square_norm)
+
+    Notes:
+        Modifies delta in place.
+
+    Args:
+        stepsize: The step size.
+        mean_norm: The normalization of the mean.
+        mean_square_norm: The normalization of the mean square.
+        mean: A tensor.
+        mean_square: A non-negative tensor.
+        delta: A tensor.
+
+    Returns:
+        None
+
+    """
+    torch.div(mean_square, mean_square_norm, out=delta)
+    delta.add_(T.EPSILON).sqrt_()
+    torch.div(mean, delta, out=delta)
+    delta.mul_(stepsize / mean_norm)
+
 def normalize(x: T.FloatTensor) -> T.FloatTensor:
     """
     Divide x by it's sum.
@@ -1021,6 +1161,24 @@ def greater(x: T.FloatTensor, y: T.FloatTensor) -> T.ByteTensor:
     """
     return torch.gt(x, y)
 
+def greater_(x: T.FloatTensor, y: T.FloatTensor, out: T.FloatTensor) -> None:
+    """
+    Elementwise test if x > y, stored as floats.
+
+    Notes:
+        Modifies out in place.
+
+    Args:
+        x: A tensor.
+        y: A tensor.
+        out: A tensor.
+
+    Returns:
+        None
+
+    """
+    torch.gt(x, y, out=out)
+
 def greater_equal(x: T.FloatTensor, y: T.FloatTensor) -> T.ByteTensor:
     """
     Elementwise test if x >= y.
@@ -1049,6 +1207,24 @@ def lesser(x: T.FloatTensor, y: T.FloatTensor) -> T.ByteTensor:
     """
     return torch.lt(x, y)
 
+def lesser_(x: T.FloatTensor, y: T.FloatTensor, out: T.FloatTensor) -> None:
+    """
+    Elementwise test if x < y, stored as floats.
+
+    Notes:
+        Modifies out in place.
+
+    Args:
+        x: A tensor.
+        y: A tensor.
+        out: A tensor.
+
+    Returns:
+        None
+
+    """
+    torch.lt(x, y, out=out)
+
 def lesser_equal(x: T.FloatTensor, y: T.FloatTensor) -> T.ByteTensor:
     """
     Elementwise test if x <= y.
@@ -1126,6 +1302,22 @@ def argsort(x: T.FloatTensor, axis: int = None) -> T.LongTensor:
     else:
         return x.sort(dim=axis)[1]
 
+def kth_smallest(x: T.FloatTensor, k: int, axis: int = 1) -> T.FloatTensor:
+    """
+    Get the kth smallest values along an axis of a tensor.
+    Uses a partial sort (selection) rather than a full sort.
+
+    Args:
+        x: A tensor.
+        k (int > 0): the rank of the value (k=1 is the minimum).
+        axis: The axis of interest.
+
+    Returns:
+        tensor: the kth smallest values, with the axis removed.
+
+    """
+    return torch.kthvalue(x, k, dim=axis)[0]
+
 def argmax(x: T.FloatTensor, axis: int) -> T.LongTensor:
     """
     Compute the indices of the maximal elements in x along the specified axis.
@@ -1184,6 +1376,25 @@ def dot(a: T.FloatTensor, b: T.FloatTensor) -> T.FloatingPoint:
     """
     return a @ b
 
+def dot_(a: T.FloatTensor, b: T.FloatTensor, out: T.FloatTensor) -> None:
+    """
+    Compute the matrix product of matrices a and b.
+
+    Notes:
+        Modifies out in place.
+        Out must have the shape and dtype of the product.
+
+    Args:
+        a: A tensor (n, k).
+        b: A tensor (k, m).
+        out: A tensor (n, m).
+
+    Returns:
+        None
+
+    """
+    torch.mm(a, b, out=out)
+
 def outer(x: T.FloatTensor, y: T.FloatTensor) -> T.FloatTensor:
     """
     Compute the outer product of vectors x and y.
@@ -1681,7 +1892,7 @@ def logical_not(x: T.ByteTensor) -> T.ByteTensor:
         tensor
 
     """
-    return 1-x
+    return torch.logical_not(x)
 
 def logical_and(x: T.ByteTensor, y: T.ByteTensor) -> T.ByteTensor:
     """
@@ -1695,7 +1906,7 @@ def logical_and(x: T.ByteTensor, y: T.ByteTensor) -> T.ByteTensor:
         tensor
 
     """
-    return x*y
+    return torch.logical_and(x, y)
 
 def logical_or(x: T.ByteTensor, y: T.ByteTensor) -> T.ByteTensor:
     """
@@ -1709,4 +1920,4 @@ def logical_or(x: T.ByteTensor, y: T.ByteTensor) -> T.ByteTensor:
         tensor
 
     """
-    return 1-(1-x)*(1-y)
+    return torch.logical_or(x, y)
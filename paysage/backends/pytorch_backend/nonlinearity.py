@@ -103,6 +103,22 @@ def expit(x: T.FloatTensor) -> T.FloatTensor:
     """
     return 0.5 * (1.0 + tanh(0.5 * x))
 
+def expit_(x: T.FloatTensor) -> None:
+    """
+    Elementwise expit (a.k.a. logistic) function of a tensor.
+
+    Notes:
+        Modifies x in place.
+
+    Args:
+        x: A tensor.
+
+    Returns:
+        None
+
+    """
+    x.mul_(0.5).tanh_().add_(1.0).mul_(0.5)
+
 def softmax(x: T.Tensor, axis: int = 1) -> T.Tensor:
     """
     Softmax function on a tensor.
@@ -30,6 +30,38 @@ def set_seed(n: int = DEFAULT_SEED):
     else:
         torch.cuda.manual_seed(int(n))
 
+def get_rng_state():
+    """
+    Get the state of the random number generators.
+
+    Args:
+        None
+
+    Returns:
+        state: An object that can be passed to set_rng_state.
+
+    """
+    cuda_state = None
+    if device.type != 'cpu':
+        cuda_state = torch.cuda.get_rng_state().numpy()
+    return (torch.get_rng_state().numpy(), numpy.random.get_state(), cuda_state)
+
+def set_rng_state(state) -> None:
+    """
+    Set the state of the random number generators.
+
+    Args:
+        state: A state returned by get_rng_state.
+
+    Returns:
+        None
+
+    """
+    torch.set_rng_state(torch.from_numpy(state[0]))
+    numpy.random.set_state(state[1])
+    if state[2] is not None:
+        torch.cuda.set_rng_state(torch.from_numpy(state[2]))
+
 def rand(shape: T.Tuple[int]) -> T.FloatTensor:
     """
     Generate a tensor of the specified shape filled with uniform random numbers
@@ -94,6 +126,72 @@ def randn_like(tensor: T.FloatTensor) -> T.FloatTensor:
     x.normal_()
     return x
 
+def rand_(tensor: T.FloatTensor) -> None:
+    """
+    Fill a tensor with uniform random numbers between 0 and 1.
+
+    Notes:
+        Modifies tensor in place.
+
+    Args:
+        tensor: A float tensor.
+
+    Returns:
+        None
+
+    """
+    tensor.uniform_()
+
+def randn_(tensor: T.FloatTensor) -> None:
+    """
+    Fill a tensor with random numbers drawn from a standard normal
+    distribution (mean = 0, variance = 1).
+
+    Notes:
+        Modifies tensor in place.
+
+    Args:
+        tensor: A float tensor.
+
+    Returns:
+        None
+
+    """
+    tensor.normal_()
+
+def rand_bernoulli_(field: T.FloatTensor, loc: T.FloatTensor,
+                    beta: T.FloatTensor, random: T.FloatTensor,
+                    out: T.FloatTensor) -> None:
+    """
+    Draw Bernoulli samples from a field in a single fused pass.
+
+    out = float(random < expit(beta * (field + loc)))
+
+    Notes:
+        Modifies random and out in place.
+        The field is typically the output of a matrix product and may be
+        overwritten (it is treated as scratch space).
+
+    Args:
+        field (tensor (num_samples, num_units)): the field from the
+            connected layers.
+        loc (tensor (num_units,)): the bias of the units.
+        beta (tensor (num_samples, 1) or None): inverse temperatures.
+        random (tensor (num_samples, num_units)): a buffer that is filled
+            with uniform random numbers.
+        out (tensor (num_samples, num_units)): the sampled units.
+
+    Returns:
+        None
+
+    """
+    field.add_(loc)
+    if beta is not None:
+        field.mul_(beta)
+    field.sigmoid_()
+    random.uniform_()
+    torch.lt(random, field, out=out)
+
 def rand_int(a: int, b: int, shape: T.Tuple[int]) -> T.LongTensor:
     """
     Generate random integers in [a, b).
@@ -2,3 +2,7 @@ from .in_memory import *
 from .hdf import *
 from .batch import *
 from .shuffle import *
+from .prefetch import *
+from .memmap import *
+from .cache import *
+from .packed import *
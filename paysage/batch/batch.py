@@ -1,7 +1,9 @@
 import numpy
 
+from .. import backends as be
 from . import in_memory
 from .. import preprocess as pre
+from ..profiler import PROFILER
 
 
 def split_tensor(tensor, split_fraction):
@@ -23,7 +25,7 @@ def split_tensor(tensor, split_fraction):
 
 
 def in_memory_batch(tensor, batch_size, train_fraction=0.9,
-                    transform=pre.Transformation()):
+                    transform=pre.Transformation(), shuffle=False, seed=None):
     """
     Utility function to create a Batch object from a tensor.
 
@@ -32,13 +34,16 @@ def in_memory_batch(tensor, batch_size, train_fraction=0.9,
         batch_size (int): the (common) batch size.
         train_fraction (float): the fraction of data to use as training data.
         transform (callable): the (common) transform function.
+        shuffle (bool): whether to shuffle the training data in each epoch.
+        seed (int): the seed for the shuffle.
 
     Returns:
         data (Batch): the batcher.
 
     """
     tensor_train, tensor_validate = split_tensor(tensor, train_fraction)
-    return Batch({'train': in_memory.InMemoryTable(tensor_train, batch_size, transform),
+    return Batch({'train': in_memory.InMemoryTable(tensor_train, batch_size, transform,
+                                                   shuffle=shuffle, seed=seed),
                   'validate': in_memory.InMemoryTable(tensor_validate, batch_size, transform)})
 
 
@@ -207,6 +212,11 @@ class Batch(object):
         Get the next minibatch.
         Will raise a StopIteration if the end of the data is reached.
 
+        Notes:
+            Minibatches of tables that reuse a buffer (e.g., a shuffled
+            InMemoryTable) are copied, so that they are not overwritten
+            by the next read.
+
         Args:
             mode (str): the mode to read, 'train' or 'validate'.
 
@@ -214,7 +224,12 @@ class Batch(object):
             tensor: the minibatch of data.
 
         """
-        return self.batch[mode].get()
+        with PROFILER.timer('read_' + mode):
+            table = self.batch[mode]
+            minibatch = table.get()
+            if getattr(table, 'reuses_buffer', False):
+                return be.copy_tensor(minibatch)
+            return minibatch
 
     def get_by_index(self, mode, index):
         """
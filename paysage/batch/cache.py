@@ -0,0 +1,193 @@
+import tempfile
+import numpy
+
+from .. import backends as be
+
+
+class TransformCache(object):
+    """
+    Stores the transformed rows of a table, so that a deterministic
+    transformation is only computed once for each row.
+
+    The rows are kept in memory, or in a memory-mapped temporary file
+    if they do not fit into the allowed memory.
+
+    """
+    def __init__(self, nrows, allowed_mem=1.0, directory=None):
+        """
+        Create an empty cache.
+
+        Notes:
+            The storage is allocated when the first rows are stored,
+            because the shape and dtype of the transformed rows are
+            not known before.
+
+        Args:
+            nrows (int): the number of rows of the table.
+            allowed_mem (optional; float): the memory (in GiB) that can be
+                used to store the rows in memory.
+            directory (optional; str): the directory for the temporary file.
+                If None, uses the default temporary directory.
+
+        Returns:
+            TransformCache
+
+        """
+        self.nrows = nrows
+        self.allowed_mem = allowed_mem
+        self.directory = directory
+        self.transform = None
+        self.disabled = False
+        self.clear()
+
+    def clear(self):
+        """
+        Discard the stored rows.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        self.values = None
+        self.file = None
+        self.stored = numpy.zeros(self.nrows, dtype=bool)
+        self.num_stored = 0
+
+    def _allocate(self, ncols, dtype):
+        """
+        Allocate the storage for the transformed rows.
+
+        Args:
+            ncols (int): the number of columns of the transformed rows.
+            dtype (numpy dtype): the dtype of the transformed rows.
+
+        Returns:
+            None
+
+        """
+        shape = (self.nrows, ncols)
+        mem_footprint = numpy.prod(shape) * numpy.dtype(dtype).itemsize / 1024**3
+        if mem_footprint <= self.allowed_mem:
+            self.values = numpy.empty(shape, dtype=dtype)
+        else:
+            # the file is deleted when it is closed
+            self.file = tempfile.TemporaryFile(dir=self.directory)
+            self.values = numpy.memmap(self.file, dtype=dtype, mode='w+',
+                                       shape=shape)
+
+    def contains(self, rows):
+        """
+        Check if a set of rows is stored.
+
+        Args:
+            rows (slice or numpy array): the rows to check.
+
+        Returns:
+            bool
+
+        """
+        if self.num_stored == self.nrows:
+            return True
+        return bool(numpy.all(self.stored[rows]))
+
+    def get(self, rows):
+        """
+        Get a set of stored rows.
+
+        Notes:
+            Returns a copy, so that changing the rows in place
+            does not change the stored rows.
+
+        Args:
+            rows (slice or numpy array): the rows to get.
+
+        Returns:
+            tensor: the transformed rows.
+
+        """
+        values = self.values[rows]
+        if isinstance(rows, slice):
+            # a slice is a view of the storage; an index array is already a copy
+            values = numpy.array(values)
+        return be.from_numpy_array(values)
+
+    def put(self, rows, values):
+        """
+        Store a set of transformed rows.
+
+        Notes:
+            If the transformation does not produce one row for each input
+            row, the rows cannot be matched and the cache is disabled.
+
+        Args:
+            rows (slice or numpy array): the rows to store.
+            values (tensor): the transformed rows.
+
+        Returns:
+            None
+
+        """
+        array = be.to_numpy_array(values)
+        num_rows = len(self.stored[rows])
+        if array.ndim != 2 or len(array) != num_rows:
+            self.disabled = True
+            self.close()
+            return
+        if self.values is None:
+            self._allocate(array.shape[1], array.dtype)
+        self.values[rows] = array
+        self.num_stored += num_rows - int(numpy.sum(self.stored[rows]))
+        self.stored[rows] = True
+
+    def compute(self, transform, rows, read):
+        """
+        Apply a transformation to a set of rows of a table,
+        using the stored rows if the transformation is deterministic.
+
+        Notes:
+            The stored rows are discarded if the transformation changes.
+            A Transformation is deterministic if it was created with
+            deterministic=True.
+
+        Args:
+            transform (Transformation): the transformation to apply.
+            rows (slice or numpy array): the rows of the table.
+            read (callable): reads the rows of the table.
+
+        Returns:
+            tensor: the transformed rows.
+
+        """
+        if not getattr(transform, 'deterministic', False):
+            return transform.compute(read())
+        if transform is not self.transform:
+            self.close()
+            self.transform = transform
+            self.disabled = False
+        if self.disabled:
+            return transform.compute(read())
+        if self.contains(rows):
+            return self.get(rows)
+        values = transform.compute(read())
+        self.put(rows, values)
+        return values
+
+    def close(self):
+        """
+        Discard the stored rows and delete the temporary file.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        values, temp_file = self.values, self.file
+        self.clear()
+        del values
+        if temp_file is not None:
+            temp_file.close()
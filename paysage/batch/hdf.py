@@ -3,6 +3,10 @@ import pandas
 
 from .. import backends as be
 from .. import preprocess as pre
+from .cache import TransformCache
+
+# contiguous runs of at least this many rows are read with slices
+MIN_RUN_LENGTH = 16
 
 def maybe_int(x):
     try:
@@ -18,11 +22,20 @@ class HDFtable(object):
 
     """
     def __init__(self, filename, key, batch_size, transform=pre.Transformation(),
-                 combine_frames=False):
+                 combine_frames=False, cache_mem=1.0):
         """
         Creates an iterator that can pull minibatches from an HDFStore.
         Works on a single table.
 
+        Notes:
+            Minibatches are read as contiguous row ranges directly from the
+            underlying PyTables table into a reusable float32 buffer,
+            without building pandas objects. This works for any table
+            written by pandas in the 'table' format, including the files
+            written by the DataShuffler.
+            The results of a deterministic transform are stored
+            (see TransformCache) and reused in later epochs.
+
         Args:
             filename (str): the HDFStore file to read from.
             key (str): the key of the table to read from.
@@ -31,6 +44,9 @@ class HDFtable(object):
             combine_frames (optional; bool): datasets with too many columns
                 have to be divided into chunks. These chunks are stored as
                 frames in the hdf5 file.
+            cache_mem (optional; float): the memory (in GiB) for storing the
+                results of a deterministic transform in RAM, beyond which
+                they are stored in a memory-mapped temporary file.
 
         Returns:
             An HDFtable instance.
@@ -45,15 +61,20 @@ class HDFtable(object):
         self.batch_size = batch_size
         self.output_batch_size = batch_size
 
-        self.ncols = self.store.get_storer(key).ncols
-        self.nrows = self.store.get_storer(key).nrows
+        storer = self.store.get_storer(key)
+        self.ncols = storer.ncols
+        self.nrows = storer.nrows
 
         self.column_names = self._get_column_names()
 
-        # create and iterator over the data
-        self.iterator = self.store.select(self.key, iterator=True,
-                                          chunksize=self.batch_size)
-        self.generator = self.iterator.__iter__()
+        # set up the direct reads from the underlying table
+        self.table = storer.table
+        self.blocks = self._get_blocks()
+        self.records = numpy.empty(self.batch_size, dtype=self.table.dtype)
+        self.buffer = numpy.empty((self.batch_size, self.ncols),
+                                  dtype=numpy.float32)
+        self.position = 0
+        self.cache = TransformCache(self.nrows, cache_mem)
 
         # change parameters as needed with a test call
         self.set_parameters_with_test()
@@ -62,6 +83,104 @@ class HDFtable(object):
         cols = self.store.select(self.key, start=0, stop=0).columns
         return list(cols.get_level_values(cols.nlevels-1))
 
+    def _get_blocks(self):
+        """
+        Get the blocks of columns stored in the underlying table.
+
+        Notes:
+            Pandas stores the columns of each dtype together in a block.
+
+        Args:
+            None
+
+        Returns:
+            blocks (List[Tuple[str, numpy array]]): the name of each block
+                and the positions of its columns in the frame.
+
+        """
+        storer = self.store.get_storer(self.key)
+        positions = {name: i for i, name in
+                     enumerate(storer.non_index_axes[0][1])}
+        return [(axis.cname, numpy.array([positions[name]
+                                          for name in axis.values]))
+                for axis in storer.values_axes]
+
+    def _read_rows(self, start, stop):
+        """
+        Read a contiguous range of rows into the buffer.
+
+        Notes:
+            Modifies the records and buffer attributes in place.
+            Whole records are read from the table because this is much
+            faster than reading the blocks as separate fields.
+
+        Args:
+            start (int): the first row to read.
+            stop (int): the row after the last row to read.
+
+        Returns:
+            numpy array (stop - start, ncols): a view of the buffer.
+
+        """
+        num_rows = stop - start
+        records = self.records[:num_rows]
+        rows = self.buffer[:num_rows]
+        self.table.read(start, stop, out=records)
+        self._copy_blocks(records, rows)
+        return rows
+
+    def _copy_blocks(self, records, rows):
+        """
+        Copy the value blocks of a set of records into a float array.
+
+        Notes:
+            Modifies rows in place.
+
+        Args:
+            records (numpy record array (num_rows,)): rows read from the table.
+            rows (numpy array (num_rows, ncols)): the array to fill.
+
+        Returns:
+            None
+
+        """
+        num_rows = len(records)
+        for name, columns in self.blocks:
+            rows[:, columns] = records[name].reshape(num_rows, -1)
+
+    def _read_coordinates(self, coordinates):
+        """
+        Read a set of rows by their positions in the table.
+
+        Notes:
+            The sorted coordinates are coalesced into contiguous runs.
+            Long runs are read with slices and the remaining rows are
+            read with a single point selection.
+
+        Args:
+            coordinates (numpy array (num_rows,)): sorted, unique row positions.
+
+        Returns:
+            numpy record array (num_rows,): the rows.
+
+        """
+        records = numpy.empty(len(coordinates), dtype=self.table.dtype)
+        run_starts = numpy.flatnonzero(numpy.diff(coordinates) != 1) + 1
+        run_starts = numpy.concatenate([[0], run_starts])
+        run_stops = numpy.concatenate([run_starts[1:], [len(coordinates)]])
+        is_point = numpy.zeros(len(coordinates), dtype=bool)
+        for start, stop in zip(run_starts, run_stops):
+            if stop - start >= MIN_RUN_LENGTH:
+                self.table.read(coordinates[start],
+                                coordinates[stop-1] + 1,
+                                out=records[start:stop])
+            else:
+                is_point[start:stop] = True
+        if numpy.any(is_point):
+            records[is_point] = self.table.read_coordinates(
+                coordinates[is_point])
+        return records
+
     def close(self) -> None:
         """
         Close the HDFStore.
@@ -73,6 +192,7 @@ class HDFtable(object):
             None
 
         """
+        self.cache.close()
         self.store.close()
 
     def reset_generator(self) -> None:
@@ -80,13 +200,13 @@ class HDFtable(object):
         Reset the generator.
 
         Args:
-            mode (str): the mode, 'train', 'validate', or 'all'.
+            None
 
         Returns:
             None
 
         """
-        self.generator = self.iterator.__iter__()
+        self.position = 0
 
     def set_parameters_with_test(self):
         """
@@ -119,18 +239,25 @@ class HDFtable(object):
             tensor: the minibatch of data.
 
         """
-        try:
-            vals = be.float_tensor(numpy.array(next(self.generator)))
-        except StopIteration:
+        if self.position >= self.nrows:
             self.reset_generator()
             raise StopIteration
-        trans_vals = self.transform.compute(vals)
-        return trans_vals
+        start = self.position
+        stop = min(self.nrows, start + self.batch_size)
+        self.position = stop
+        return self.cache.compute(self.transform, slice(start, stop),
+            lambda: be.float_tensor(self._read_rows(start, stop)))
 
     def get_by_index(self, index):
         """
         Get the next minibatch by index.
 
+        Notes:
+            The index values are the positions of the rows in the table
+            (as for an InMemoryTable), not the values of the pandas index.
+            The rows are returned in the order of the index values,
+            which may contain duplicates.
+
         Args:
             index (Listable): the index values to select.
 
@@ -138,6 +265,11 @@ class HDFtable(object):
             tensor: the minibatch of data.
 
         """
-        idx = list(index)
-        vals = self.store.select(self.key, where="index={}".format(idx))
-        return self.transform.compute(be.float_tensor(numpy.array(vals)))
+        coordinates, order = numpy.unique(
+            numpy.asarray(be.to_numpy_array(index), dtype=numpy.int64),
+            return_inverse=True)
+        records = self._read_coordinates(coordinates)
+        rows = numpy.empty((len(records), self.ncols), dtype=numpy.float32)
+        self._copy_blocks(records, rows)
+        vals = be.float_tensor(rows[order.ravel()])
+        return self.transform.compute(vals)
@@ -1,5 +1,8 @@
+import numpy
+
 from .. import backends as be
 from .. import preprocess as pre
+from .cache import TransformCache
 
 def inclusive_slice(tensor, start, stop, step):
     """
@@ -22,6 +25,29 @@ def inclusive_slice(tensor, start, stop, step):
         current = next_iter
         yield tensor[result[0]:result[1]]
 
+def rows_slice(stop, step, order=None):
+    """
+    Generator yielding the rows of progressive minibatches.
+
+    Args:
+        stop (int): the number of rows.
+        step (int): the minibatch size.
+        order (optional; numpy array (stop,)): the order of the rows.
+
+    Returns:
+        rows (slice or numpy array): the rows of a minibatch,
+            as a slice if order is None or as indices otherwise.
+
+    """
+    current = 0
+    while current < stop:
+        next_iter = min(stop, current + step)
+        if order is None:
+            yield slice(current, next_iter)
+        else:
+            yield order[current:next_iter]
+        current = next_iter
+
 
 class InMemoryTable(object):
     """
@@ -30,15 +56,32 @@ class InMemoryTable(object):
     if being used to train a model.
 
     """
-    def __init__(self, tensor, batch_size, transform=pre.Transformation()):
+    def __init__(self, tensor, batch_size, transform=pre.Transformation(),
+                 shuffle=False, seed=None, cache_mem=1.0):
         """
         Creates iterators that can pull minibatches
         from a list of in-memory arrays.
 
+        Notes:
+            If shuffle is True, the rows are visited in a new random order
+            in each pass through the data. The tensor is not copied or
+            modified; each minibatch is gathered into a reusable buffer,
+            so it is only valid until the next call to get
+            (Batch.get returns a copy).
+            The order is drawn from a separate random number generator,
+            so it only depends on the seed.
+            The results of a deterministic transform are stored
+            (see TransformCache) and reused in later epochs.
+
         Args:
             tensor (tensors): the array to batch
             batch_size (int): the minibatch size
             transform (Transformation): the transform function to apply to the data
+            shuffle (optional; bool): whether to shuffle the rows in each epoch
+            seed (optional; int): the seed for the shuffle
+            cache_mem (optional; float): the memory (in GiB) for storing the
+                results of a deterministic transform in RAM, beyond which
+                they are stored in a memory-mapped temporary file
 
         Returns:
             An InMemoryTable instance.
@@ -51,9 +94,18 @@ class InMemoryTable(object):
         self.nrows, self.ncols = be.shape(self.tensor)
         self.column_names = list(range(self.ncols))
 
+        # the random order of the rows is gathered into a reusable buffer
+        self.shuffle = shuffle
+        self.reuses_buffer = shuffle
+        if shuffle:
+            self.random = numpy.random.RandomState(seed)
+            self.buffer = be.zeros((self.batch_size, self.ncols),
+                                   dtype=self.tensor.dtype)
+
+        self.cache = TransformCache(self.nrows, cache_mem)
+
         # create iterators over the data for the train/validate sets
-        self.iterators = inclusive_slice(self.tensor, 0, self.nrows,
-                                         self.batch_size)
+        self.reset_generator()
 
         # change parameters as needed with a test call
         self.set_parameters_with_test()
@@ -62,12 +114,16 @@ class InMemoryTable(object):
         """
         Frees the tensor.
         """
+        self.cache.close()
         del self.tensor
 
     def reset_generator(self) -> None:
         """
         Reset the generator.
 
+        Notes:
+            Draws a new order of the rows if shuffle is True.
+
         Args:
             None
 
@@ -75,8 +131,28 @@ class InMemoryTable(object):
             None
 
         """
-        self.iterators = inclusive_slice(self.tensor, 0, self.nrows,
-                                         self.batch_size)
+        order = self.random.permutation(self.nrows) if self.shuffle else None
+        self.iterators = rows_slice(self.nrows, self.batch_size, order)
+
+    def _read(self, rows):
+        """
+        Read a minibatch of rows from the tensor.
+
+        Notes:
+            Rows given by indices are gathered into the buffer.
+
+        Args:
+            rows (slice or numpy array): the rows to read.
+
+        Returns:
+            tensor: the rows.
+
+        """
+        if isinstance(rows, slice):
+            return self.tensor[rows]
+        out = self.buffer[:len(rows)]
+        be.index_select_(self.tensor, be.long_tensor(rows), out)
+        return out
 
     def set_parameters_with_test(self):
         """
@@ -110,12 +186,12 @@ class InMemoryTable(object):
 
         """
         try:
-            vals = next(self.iterators)
+            rows = next(self.iterators)
         except StopIteration:
             self.reset_generator()
             raise StopIteration
-        trans_vals = self.transform.compute(vals)
-        return trans_vals
+        return self.cache.compute(self.transform, rows,
+                                  lambda: self._read(rows))
 
     def get_by_index(self, index):
         """
@@ -0,0 +1,274 @@
+import os
+import numpy
+
+from .. import backends as be
+from .. import preprocess as pre
+from . import batch
+from .hdf import HDFtable
+from .cache import TransformCache
+
+
+class MemmapTable(object):
+    """
+    Serves up minibatches from a memory-mapped .npy (or raw binary) file.
+    The data should probably be randomly shuffled
+    if being used to train a model.
+
+    """
+    def __init__(self, filename, batch_size, transform=pre.Transformation(),
+                 start=0, stop=None, shape=None, dtype=numpy.float32,
+                 readahead=0, cache_mem=1.0):
+        """
+        Creates an iterator that can pull minibatches from a file
+        that is mapped into memory.
+
+        Notes:
+            Only the pages of the file that are read are loaded into memory,
+            so the file can be larger than the available memory.
+            Several tables can read different row ranges of the same file
+            (e.g., a train/validate split) without copying the data.
+            If the data are stored as float32 (and the backend uses
+            the CPU), minibatches are read-only views of the file;
+            otherwise they are converted to float tensors.
+            With readahead, the operating system is asked to load the next
+            minibatches into the page cache while the current one is used
+            (only where os.posix_fadvise is available, e.g., Linux).
+            The results of a deterministic transform are stored
+            (see TransformCache) and reused in later epochs.
+
+        Args:
+            filename (str): the .npy file (or raw binary file) to read from.
+            batch_size (int): the minibatch size.
+            transform (Transformation): the transform function to apply to the data.
+            start (int; optional): the first row of the file to read.
+            stop (int; optional): the row after the last row to read.
+                If None, reads to the end of the file.
+            shape (Tuple[int]; optional): the shape (num_rows, num_cols) of a
+                raw binary file. If None, the file is read as a .npy file.
+            dtype (numpy dtype; optional): the dtype of a raw binary file.
+            readahead (int; optional): the number of minibatches to read ahead.
+            cache_mem (optional; float): the memory (in GiB) for storing the
+                results of a deterministic transform in RAM, beyond which
+                they are stored in a memory-mapped temporary file.
+
+        Returns:
+            A MemmapTable instance.
+
+        """
+        self.filename = filename
+        self.transform = transform
+        self.batch_size = batch_size
+        self.output_batch_size = batch_size
+        self.readahead = readahead
+
+        if shape is None:
+            array = numpy.load(filename, mmap_mode='r')
+        else:
+            array = numpy.memmap(filename, dtype=dtype, mode='r', shape=shape)
+        assert array.ndim == 2 and array.flags['C_CONTIGUOUS'], \
+            "the file must hold a matrix stored in row major order"
+        self.start = start
+        self.data = array[start:stop]
+        self.nrows, self.ncols = self.data.shape
+        self.column_names = list(range(self.ncols))
+        self.zero_copy = (self.data.dtype == numpy.float32)
+
+        # the byte layout of the rows in the file, used for the readahead
+        self.offset = array.offset
+        self.row_bytes = self.ncols * array.dtype.itemsize
+        self.descriptor = None
+        if readahead and hasattr(os, 'posix_fadvise'):
+            self.descriptor = os.open(filename, os.O_RDONLY)
+            os.posix_fadvise(self.descriptor, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+
+        self.position = 0
+        self.cache = TransformCache(self.nrows, cache_mem)
+
+        # change parameters as needed with a test call
+        self.set_parameters_with_test()
+
+    def _advise(self, start, stop):
+        """
+        Ask the operating system to load a range of rows into the page cache.
+
+        Args:
+            start (int): the first row.
+            stop (int): the row after the last row.
+
+        Returns:
+            None
+
+        """
+        if self.descriptor is None or start >= stop:
+            return
+        os.posix_fadvise(self.descriptor,
+                         self.offset + (self.start + start) * self.row_bytes,
+                         (stop - start) * self.row_bytes,
+                         os.POSIX_FADV_WILLNEED)
+
+    def _to_tensor(self, rows):
+        """
+        Convert rows of the file to a tensor.
+
+        Args:
+            rows (numpy array (num_rows, ncols))
+
+        Returns:
+            tensor
+
+        """
+        if self.zero_copy:
+            return be.from_numpy_array(rows)
+        return be.float_tensor(rows)
+
+    def close(self) -> None:
+        """
+        Close the file.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        if self.descriptor is not None:
+            os.close(self.descriptor)
+            self.descriptor = None
+        self.cache.close()
+        del self.data
+
+    def reset_generator(self) -> None:
+        """
+        Reset the generator.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        self.position = 0
+
+    def set_parameters_with_test(self):
+        """
+        Set the batch-dependent parameters with a test call to get.
+        This allows to account for preprocess functions that transform
+        the output batch size, rows, or columns.
+
+        Notes:
+            Modifies output_batch_size attribute in place, resets the generator.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        self.output_batch_size = be.shape(self.get())[0]
+        self.reset_generator()
+
+    def get(self):
+        """
+        Get the next minibatch.
+        Will raise a StopIteration if the end of the data is reached.
+
+        Args:
+            None
+
+        Returns:
+            tensor: the minibatch of data.
+
+        """
+        if self.position >= self.nrows:
+            self.reset_generator()
+            raise StopIteration
+        start = self.position
+        stop = min(self.nrows, start + self.batch_size)
+        self.position = stop
+        rows = slice(start, stop)
+        if self.readahead and not self.cache.contains(rows):
+            self._advise(stop, min(self.nrows,
+                                   stop + self.readahead * self.batch_size))
+        return self.cache.compute(self.transform, rows,
+                                  lambda: self._to_tensor(self.data[rows]))
+
+    def get_by_index(self, index):
+        """
+        Get the next minibatch by index.
+
+        Args:
+            index (Listable): the index values to select.
+
+        Returns:
+            tensor: the minibatch of data.
+
+        """
+        rows = self.data[numpy.asarray(be.to_numpy_array(index), dtype=numpy.int64)]
+        return self.transform.compute(be.float_tensor(rows))
+
+
+def memmap_batch(filename, batch_size, train_fraction=0.9,
+                 transform=pre.Transformation(), readahead=0):
+    """
+    Utility function to create a Batch object from a .npy file.
+
+    Notes:
+        The train and validate tables read different rows of the same file.
+
+    Args:
+        filename (str): the .npy file to batch.
+        batch_size (int): the (common) batch size.
+        train_fraction (float): the fraction of data to use as training data.
+        transform (callable): the (common) transform function.
+        readahead (int): the number of minibatches to read ahead.
+
+    Returns:
+        data (Batch): the batcher.
+
+    """
+    nrows = numpy.load(filename, mmap_mode='r').shape[0]
+    split = int(numpy.ceil(train_fraction * nrows))
+    return batch.Batch({
+        'train': MemmapTable(filename, batch_size, transform, stop=split,
+                             readahead=readahead),
+        'validate': MemmapTable(filename, batch_size, transform, start=split,
+                                readahead=readahead)})
+
+
+def hdf_to_npy(hdf_filename, key, npy_filename, chunksize=100000):
+    """
+    Convert a table in an HDFStore into a .npy file of float32 values.
+
+    Notes:
+        Performs an IO operation.
+        The table is read and written in chunks, so it does not need to
+        fit into memory.
+
+    Args:
+        hdf_filename (str): the HDFStore file to read from.
+        key (str): the key of the table to convert.
+        npy_filename (str): the .npy file to write.
+        chunksize (int; optional): the number of rows to convert at a time.
+
+    Returns:
+        None
+
+    """
+    table = HDFtable(hdf_filename, key, chunksize)
+    output = numpy.lib.format.open_memmap(npy_filename, mode='w+',
+                                          dtype=numpy.float32,
+                                          shape=(table.nrows, table.ncols))
+    position = 0
+    while True:
+        try:
+            rows = be.to_numpy_array(table.get())
+        except StopIteration:
+            break
+        output[position:position + len(rows)] = rows
+        position += len(rows)
+    output.flush()
+    del output
+    table.close()
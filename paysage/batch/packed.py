@@ -0,0 +1,278 @@
+import numpy
+
+from .. import backends as be
+from .. import preprocess as pre
+from . import batch
+from .cache import TransformCache
+from .hdf import HDFtable
+from .in_memory import rows_slice
+
+
+class PackedTable(object):
+    """
+    Serves up minibatches of binary data stored with 8 units per byte
+    (see backends.pack_bits).
+    The data should probably be randomly shuffled
+    if being used to train a model.
+
+    """
+    def __init__(self, packed, num_units, batch_size,
+                 transform=pre.Transformation(), shuffle=False, seed=None,
+                 cache_mem=1.0):
+        """
+        Creates iterators that can pull minibatches from packed binary data.
+
+        Notes:
+            The packed data take 1/32 of the memory of the float tensor.
+            Each minibatch is unpacked into a reusable float buffer,
+            so it is only valid until the next call to get
+            (Batch.get returns a copy).
+            If shuffle is True, the rows are visited in a new random order
+            in each pass through the data (see InMemoryTable).
+            The results of a deterministic transform are stored unpacked
+            (see TransformCache), so it is usually better to use the
+            default transform with packed data.
+
+        Args:
+            packed (tensor or numpy array (num_rows, ceil(num_units / 8)); uint8):
+                the packed data.
+            num_units (int): the number of units in each row.
+            batch_size (int): the minibatch size.
+            transform (Transformation): the transform function to apply to the data.
+            shuffle (optional; bool): whether to shuffle the rows in each epoch.
+            seed (optional; int): the seed for the shuffle.
+            cache_mem (optional; float): the memory (in GiB) for storing the
+                results of a deterministic transform in RAM, beyond which
+                they are stored in a memory-mapped temporary file.
+
+        Returns:
+            A PackedTable instance.
+
+        """
+        self.packed = packed
+        self.batch_size = batch_size
+        self.output_batch_size = batch_size
+        self.transform = transform
+        self.nrows = len(packed)
+        self.ncols = num_units
+        self.column_names = list(range(self.ncols))
+
+        self.shuffle = shuffle
+        self.reuses_buffer = True
+        self.random = numpy.random.RandomState(seed)
+        self.buffer = be.zeros((self.batch_size, self.ncols))
+        self.cache = TransformCache(self.nrows, cache_mem)
+
+        # create iterators over the data
+        self.reset_generator()
+
+        # change parameters as needed with a test call
+        self.set_parameters_with_test()
+
+    @classmethod
+    def from_npy(cls, filename, num_units, batch_size, start=0, stop=None,
+                 **kwargs):
+        """
+        Create a PackedTable from a memory-mapped .npy file of packed data.
+
+        Args:
+            filename (str): the .npy file (e.g., from save_packed).
+            num_units (int): the number of units in each row.
+            batch_size (int): the minibatch size.
+            start (int; optional): the first row of the file to read.
+            stop (int; optional): the row after the last row to read.
+            kwargs: other arguments of PackedTable.
+
+        Returns:
+            A PackedTable instance.
+
+        """
+        packed = numpy.load(filename, mmap_mode='r')[start:stop]
+        return cls(packed, num_units, batch_size, **kwargs)
+
+    def close(self) -> None:
+        """
+        Frees the data.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        self.cache.close()
+        del self.packed
+
+    def reset_generator(self) -> None:
+        """
+        Reset the generator.
+
+        Notes:
+            Draws a new order of the rows if shuffle is True.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        order = self.random.permutation(self.nrows) if self.shuffle else None
+        self.iterators = rows_slice(self.nrows, self.batch_size, order)
+
+    def set_parameters_with_test(self):
+        """
+        Set the batch-dependent parameters with a test call to get.
+        This allows to account for preprocess functions that transform
+        the output batch size, number of steps, rows, or columns.
+
+        Notes:
+            Modifies output_batch_size.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        self.output_batch_size = be.shape(self.get())[0]
+        self.reset_generator()
+
+    def _read(self, rows):
+        """
+        Unpack a minibatch of rows into the buffer.
+
+        Args:
+            rows (slice or numpy array): the rows to read.
+
+        Returns:
+            tensor: the unpacked rows.
+
+        """
+        packed = self.packed[rows]
+        if isinstance(packed, numpy.ndarray):
+            packed = be.from_numpy_array(numpy.ascontiguousarray(packed))
+        out = self.buffer[:len(packed)]
+        be.unpack_bits_(packed, out)
+        return out
+
+    def get(self):
+        """
+        Get the next minibatch.
+        Will raise a StopIteration if the end of the data is reached.
+
+        Args:
+            None
+
+        Returns:
+            tensor: the minibatch of data.
+
+        """
+        try:
+            rows = next(self.iterators)
+        except StopIteration:
+            self.reset_generator()
+            raise StopIteration
+        return self.cache.compute(self.transform, rows,
+                                  lambda: self._read(rows))
+
+    def get_by_index(self, index):
+        """
+        Get the next minibatch by index.
+
+        Args:
+            index (tensor): the index values to select.
+
+        Returns:
+            tensor: the minibatch of data.
+
+        """
+        packed = self.packed[numpy.asarray(be.to_numpy_array(index))]
+        if isinstance(packed, numpy.ndarray):
+            packed = be.from_numpy_array(packed)
+        return self.transform.compute(be.unpack_bits(packed, self.ncols))
+
+
+def packed_batch(packed, num_units, batch_size, train_fraction=0.9,
+                 transform=pre.Transformation(), shuffle=False, seed=None):
+    """
+    Utility function to create a Batch object from packed binary data.
+
+    Args:
+        packed (tensor or numpy array; uint8): the packed data to batch.
+        num_units (int): the number of units in each row.
+        batch_size (int): the (common) batch size.
+        train_fraction (float): the fraction of data to use as training data.
+        transform (callable): the (common) transform function.
+        shuffle (bool): whether to shuffle the training data in each epoch.
+        seed (int): the seed for the shuffle.
+
+    Returns:
+        data (Batch): the batcher.
+
+    """
+    split = int(numpy.ceil(train_fraction * len(packed)))
+    return batch.Batch({
+        'train': PackedTable(packed[:split], num_units, batch_size, transform,
+                             shuffle=shuffle, seed=seed),
+        'validate': PackedTable(packed[split:], num_units, batch_size, transform)})
+
+
+def save_packed(filename, tensor):
+    """
+    Pack a binary tensor and save it to a .npy file.
+
+    Notes:
+        Performs an IO operation.
+        The number of units is not stored in the file, so it has to be
+        passed to PackedTable.from_npy.
+
+    Args:
+        filename (str): the .npy file to write.
+        tensor (tensor (num_rows, num_units)): a tensor of zeros and ones.
+
+    Returns:
+        None
+
+    """
+    numpy.save(filename, be.to_numpy_array(be.pack_bits(tensor)))
+
+
+def hdf_to_packed_npy(hdf_filename, key, npy_filename, chunksize=100000):
+    """
+    Convert a table of binary data in an HDFStore into a packed .npy file.
+
+    Notes:
+        Performs an IO operation.
+        The table is read and written in chunks, so it does not need to
+        fit into memory.
+
+    Args:
+        hdf_filename (str): the HDFStore file to read from.
+        key (str): the key of the table to convert.
+        npy_filename (str): the .npy file to write.
+        chunksize (int; optional): the number of rows to convert at a time.
+
+    Returns:
+        num_units (int): the number of units in each row.
+
+    """
+    table = HDFtable(hdf_filename, key, chunksize)
+    num_units = table.ncols
+    output = numpy.lib.format.open_memmap(npy_filename, mode='w+',
+                                          dtype=numpy.uint8,
+                                          shape=(table.nrows, (num_units + 7) // 8))
+    position = 0
+    while True:
+        try:
+            rows = be.to_numpy_array(be.pack_bits(table.get()))
+        except StopIteration:
+            break
+        output[position:position + len(rows)] = rows
+        position += len(rows)
+    output.flush()
+    del output
+    table.close()
+    return num_units
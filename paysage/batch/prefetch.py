@@ -0,0 +1,276 @@
+import queue
+import threading
+
+from .. import backends as be
+from . import batch
+
+
+class _EndOfData(object):
+    """
+    Marker placed in the queue when the wrapped table runs out of data.
+
+    """
+    pass
+
+
+class _WorkerError(object):
+    """
+    Container for an exception raised in the worker thread.
+
+    """
+    def __init__(self, error):
+        self.error = error
+
+
+class PrefetchTable(object):
+    """
+    Serves up minibatches from another table, reading them ahead of time
+    in a background thread.
+
+    The wrapped table (e.g., an InMemoryTable or HDFtable) does its reading
+    and transformation in the worker thread and places the minibatches in a
+    bounded queue, so that the I/O overlaps with the computations that
+    consume the minibatches.
+
+    """
+    def __init__(self, table, queue_size=2):
+        """
+        Wrap a table with a prefetching reader.
+
+        Notes:
+            The end of the data is marked in the queue, so get raises a
+            StopIteration exactly when the wrapped table would.
+            The worker keeps reading the next pass through the data while
+            the end of the current pass is being consumed.
+            Access to the wrapped table is serialized with a lock because
+            HDFStores cannot be read from multiple threads.
+
+        Args:
+            table (InMemoryTable/HDFtable): the table to read from.
+            queue_size (int): the maximum number of minibatches to read ahead.
+
+        Returns:
+            A PrefetchTable instance.
+
+        """
+        self.table = table
+        self.queue_size = queue_size
+        self.lock = threading.Lock()
+        self.queue = None
+        self.stop_event = None
+        self.worker = None
+        self._set_table_attributes()
+        self._start()
+
+    def _set_table_attributes(self):
+        """
+        Copy the dataset-level attributes from the wrapped table.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        self.batch_size = self.table.batch_size
+        self.output_batch_size = self.table.output_batch_size
+        self.nrows = self.table.nrows
+        self.ncols = self.table.ncols
+        self.column_names = self.table.column_names
+
+    @property
+    def transform(self):
+        return self.table.transform
+
+    @transform.setter
+    def transform(self, transform):
+        """
+        Set the transform of the wrapped table.
+
+        Notes:
+            Minibatches that were read with the old transform are discarded
+            and reading starts again from the beginning of the table.
+
+        """
+        self._stop()
+        self.table.transform = transform
+        self.table.reset_generator()
+        self._start()
+
+    def _read(self, minibatches, stop_event):
+        """
+        Read minibatches from the table into a queue until stopped.
+
+        Args:
+            minibatches (queue.Queue): the queue to fill.
+            stop_event (threading.Event): signals the worker to exit.
+
+        Returns:
+            None
+
+        """
+        while not stop_event.is_set():
+            try:
+                with self.lock:
+                    item = self.table.get()
+                    # the next read would overwrite the minibatch
+                    if getattr(self.table, 'reuses_buffer', False):
+                        item = be.copy_tensor(item)
+            except StopIteration:
+                item = _EndOfData()
+            except Exception as error:
+                item = _WorkerError(error)
+            while not stop_event.is_set():
+                try:
+                    minibatches.put(item, timeout=0.1)
+                    break
+                except queue.Full:
+                    pass
+            if isinstance(item, _WorkerError):
+                break
+
+    def _start(self):
+        """
+        Start the worker thread.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        self.queue = queue.Queue(maxsize=self.queue_size)
+        self.stop_event = threading.Event()
+        self.worker = threading.Thread(target=self._read,
+                                       args=(self.queue, self.stop_event),
+                                       daemon=True)
+        self.worker.start()
+
+    def _stop(self):
+        """
+        Stop the worker thread and discard the prefetched minibatches.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        if self.worker is None:
+            return
+        self.stop_event.set()
+        while self.worker.is_alive():
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                pass
+            self.worker.join(timeout=0.01)
+        self.worker = None
+
+    def close(self) -> None:
+        """
+        Stop the worker thread and close the wrapped table.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        self._stop()
+        self.table.close()
+
+    def reset_generator(self) -> None:
+        """
+        Reset the generator.
+
+        Notes:
+            Discards any prefetched minibatches.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        self._stop()
+        self.table.reset_generator()
+        self._start()
+
+    def set_parameters_with_test(self):
+        """
+        Set the batch-dependent parameters with a test call to get.
+
+        Notes:
+            Modifies output_batch_size attribute in place, resets the generator.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        self._stop()
+        self.table.set_parameters_with_test()
+        self._set_table_attributes()
+        self._start()
+
+    def get(self):
+        """
+        Get the next minibatch.
+        Will raise a StopIteration if the end of the data is reached.
+
+        Args:
+            None
+
+        Returns:
+            tensor: the minibatch of data.
+
+        """
+        item = self.queue.get()
+        if isinstance(item, _EndOfData):
+            raise StopIteration
+        if isinstance(item, _WorkerError):
+            # the worker has exited, so restart it for the next call
+            self._stop()
+            self._start()
+            raise item.error
+        return item
+
+    def get_by_index(self, index):
+        """
+        Get the next minibatch by index.
+
+        Args:
+            index (Listable): the index values to select.
+
+        Returns:
+            tensor: the minibatch of data.
+
+        """
+        with self.lock:
+            return self.table.get_by_index(index)
+
+
+def prefetch_batch(data, queue_size=2):
+    """
+    Utility function to create a Batch object that prefetches the
+    minibatches of every table in another Batch.
+
+    Args:
+        data (Batch): the batcher to wrap.
+        queue_size (int): the maximum number of minibatches to read ahead
+            for each table.
+
+    Returns:
+        data (Batch): the prefetching batcher.
+
+    """
+    return batch.Batch({key: PrefetchTable(data.batch[key], queue_size)
+                        for key in data.batch})
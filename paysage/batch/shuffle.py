@@ -1,4 +1,6 @@
 import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 import numpy
 import pandas
 
@@ -42,6 +44,47 @@ class TableStatistics(object):
         return int(self.shape[0] * allowed_mem / self.mem_footprint)
 
 
+def _assemble_chunk(store, chunk_keys, starts, counts, seed):
+    """
+    Read pieces of a set of chunk tables and shuffle them together.
+
+    Args:
+        store (HDFStore): the store with the chunk tables.
+        chunk_keys (List[str]): the keys of the chunk tables.
+        starts (List[int]): the first row to read from each chunk table.
+        counts (List[int]): the number of rows to read from each chunk table.
+        seed (int): the random number seed for the shuffle.
+
+    Returns:
+        DataFrame: the shuffled chunk.
+
+    """
+    chunk_pieces = [store.select(chunk_keys[j], start=starts[j],
+                                 stop=starts[j] + counts[j])
+                    for j in range(len(chunk_keys)) if counts[j] > 0]
+    df_chunk = pandas.concat(chunk_pieces)
+    return df_chunk.sample(frac=1, random_state=seed)
+
+def _assemble_chunk_from_file(filename, chunk_keys, starts, counts, seed):
+    """
+    Read pieces of a set of chunk tables from a file and shuffle them together.
+    Can be used in a worker process.
+
+    Args:
+        filename (str): the filename of the store with the chunk tables.
+        chunk_keys (List[str]): the keys of the chunk tables.
+        starts (List[int]): the first row to read from each chunk table.
+        counts (List[int]): the number of rows to read from each chunk table.
+        seed (int): the random number seed for the shuffle.
+
+    Returns:
+        DataFrame: the shuffled chunk.
+
+    """
+    with pandas.HDFStore(filename, mode='r') as store:
+        return _assemble_chunk(store, chunk_keys, starts, counts, seed)
+
+
 class DataShuffler(object):
     """
     Shuffles data in an HDF5 file.  Memory is managed.
@@ -58,16 +101,27 @@ class DataShuffler(object):
     def __init__(self, filename, shuffled_filename,
                  allowed_mem=1,
                  complevel=5,
-                 seed=137):
+                 seed=137,
+                 num_workers=0):
         """
         Constructor.
 
+        Notes:
+            If num_workers > 0, the chunks of the shuffled table are read
+            and shuffled in worker processes while earlier chunks are
+            written. Up to num_workers + 1 chunks are held in memory at once,
+            so the chunks are made smaller to stay within allowed_mem.
+            The shuffled data is deterministic given the seed, allowed_mem,
+            and num_workers.
+
         Args:
             filename (str): the filename of the data to be shuffled.
             shuffled_filename (str): the filename to write the shuffled data to.
             allowed_mem (float): the allowed memory footprint in GiB.
             complevel (int): the compression level used by pandas.
             seed (int): the random number seed for the shuffler.
+            num_workers (int): the number of worker processes used to
+                reassemble the shuffled tables.
 
         Returns:
             A DataShuffler instance.
@@ -78,6 +132,7 @@ class DataShuffler(object):
         self.seed = seed # should keep this fixed for long-term determinism
         self.complevel = complevel
         self.complib = 'zlib'
+        self.num_workers = num_workers
 
         # get the keys and statistics
         self.store = pandas.HDFStore(filename, mode='r')
@@ -86,12 +141,13 @@ class DataShuffler(object):
                             for k in self.keys}
 
         # choose the smallest chunksize
-        self.chunksize = min([self.table_stats[k].chunksize(self.allowed_mem)
+        chunk_mem = self.allowed_mem / (1 + self.num_workers)
+        self.chunksize = min([self.table_stats[k].chunksize(chunk_mem)
                               for k in self.keys])
 
         # store for chunked data
-        chunk_tempfile = tempfile.NamedTemporaryFile()
-        self.chunk_store = pandas.HDFStore(chunk_tempfile.name, mode='w')
+        self.chunk_tempfile = tempfile.NamedTemporaryFile()
+        self.chunk_store = pandas.HDFStore(self.chunk_tempfile.name, mode='w')
 
         # setup the output file
         self.shuffled_store = pandas.HDFStore(shuffled_filename, mode='w',
@@ -193,34 +249,41 @@ class DataShuffler(object):
 
         """
         # find a streaming map
-        stream_map = numpy.concatenate([[i for _ in range(chunk_counts[i])]
-                                        for i in range(len(chunk_counts))])
+        stream_map = numpy.repeat(numpy.arange(num_chunks), chunk_counts)
         numpy.random.shuffle(stream_map)
 
-        # stream from the chunks into the shuffled store
-        chunk_read_inds = [0 for _ in range(num_chunks)]
-        num_streamed = 0
-        # read data in chunks
-        for i_chunk in range(num_chunks):
-            # get the number to read for each chunk table
-            chunk_inds = stream_map[i_chunk*self.chunksize
-                                    : (i_chunk+1)*self.chunksize]
-            chunk_read_counts = [numpy.sum(chunk_inds == j)
-                                 for j in range(num_chunks)]
-
-            # now read the chunk pieces
-            chunk_pieces = [None for _ in range(num_chunks)]
-            for j in range(num_chunks):
-                num_read = chunk_read_counts[j]
-                chunk_pieces[j] = self.chunk_store.select(chunk_keys[j],
-                                                   start=chunk_read_inds[j],
-                                                   stop=chunk_read_inds[j] + num_read)
-                chunk_read_inds[j] += num_read
-
-            # combine the chunk pieces into a single chunk and shuffle
-            df_chunk = pandas.concat(chunk_pieces)
-            df_chunk = df_chunk.sample(frac=1)
-            num_streamed += len(df_chunk)
-
-            # write the chunk
-            self.shuffled_store.append(key, df_chunk)
+        num_rows = len(stream_map)
+        if num_rows == 0:
+            return
+        num_output_chunks = (num_rows + self.chunksize - 1) // self.chunksize
+        seeds = numpy.random.randint(2**31, size=num_output_chunks)
+
+        def tasks():
+            # count the rows to read from each chunk table for each output
+            # chunk, one output chunk at a time to stay within allowed_mem
+            read_starts = numpy.zeros(num_chunks, dtype=numpy.int64)
+            for i in range(num_output_chunks):
+                read_counts = numpy.bincount(
+                    stream_map[i*self.chunksize:(i+1)*self.chunksize],
+                    minlength=num_chunks)
+                yield (chunk_keys, read_starts.copy(), read_counts, seeds[i])
+                read_starts += read_counts
+
+        if self.num_workers == 0:
+            for task in tasks():
+                self.shuffled_store.append(key,
+                                           _assemble_chunk(self.chunk_store, *task))
+            return
+
+        # read and shuffle in the workers while writing in order
+        self.chunk_store.close()
+        with ProcessPoolExecutor(self.num_workers) as executor:
+            pending = deque()
+            for task in tasks():
+                if len(pending) == self.num_workers:
+                    self.shuffled_store.append(key, pending.popleft().result())
+                pending.append(executor.submit(_assemble_chunk_from_file,
+                                               self.chunk_tempfile.name, *task))
+            while pending:
+                self.shuffled_store.append(key, pending.popleft().result())
+        self.chunk_store.open(mode='a')
@@ -1,3 +1,5 @@
 from .methods import *
 from .sgd import *
 from .layerwise import *
+from .parallel import *
+from .checkpoint import *
@@ -0,0 +1,265 @@
+import os
+import pandas
+
+from .. import backends as be
+from ..models import gradient_util as gu
+from ..models.state import State, PackedState
+
+
+def _flatten_to_frame(grad):
+    """
+    Flatten a gradient into a single column DataFrame.
+
+    Args:
+        grad (Gradient)
+
+    Returns:
+        pandas.DataFrame
+
+    """
+    return pandas.DataFrame(be.to_numpy_array(gu.grad_flatten(grad)))
+
+def _gradient_from_frame(frame, model):
+    """
+    Rebuild a gradient of a model from a single column DataFrame.
+
+    Notes:
+        If the model uses flat parameters the result is a FlatGradient
+        that shares the layout of model.flat_params.
+        Otherwise, the result is a Gradient of views into a single vector.
+
+    Args:
+        frame (pandas.DataFrame)
+        model (BoltzmannMachine)
+
+    Returns:
+        Gradient or FlatGradient
+
+    """
+    vector = be.flatten(be.float_tensor(frame.values))
+    if model.flat_params is not None:
+        return gu.FlatGradient(vector, model.flat_params.layout)
+    grad = gu.FlatGradient(vector, gu.grad_apply(be.shape, gu.zero_grad(model)))
+    return gu.Gradient(grad.layers, grad.weights)
+
+def _beta_sampler_config(beta_sampler):
+    """
+    Get the state of an AutoregressiveGammaSampler.
+
+    Args:
+        beta_sampler (AutoregressiveGammaSampler)
+
+    Returns:
+        dict
+
+    """
+    return {'std': beta_sampler.std,
+            'momentum': getattr(beta_sampler, 'phi', 0.9),
+            'beta': beta_sampler.beta,
+            'has_beta': beta_sampler.has_beta,
+            'beta_shape': getattr(beta_sampler, 'beta_shape', None),
+            'schedule': beta_sampler.schedule}
+
+def _set_beta_sampler_config(beta_sampler, config):
+    """
+    Restore the state of an AutoregressiveGammaSampler.
+
+    Notes:
+        Modifies the beta_sampler in place.
+
+    Args:
+        beta_sampler (AutoregressiveGammaSampler)
+        config (dict): from _beta_sampler_config
+
+    Returns:
+        None
+
+    """
+    beta_sampler.set_std(config['std'], config['momentum'])
+    beta_sampler.schedule = config['schedule']
+    beta_sampler.beta = config['beta']
+    beta_sampler.has_beta = config['has_beta']
+    if config['beta_shape'] is not None:
+        beta_sampler.beta_shape = config['beta_shape']
+
+def _put_state(store, key, state):
+    """
+    Put the tensors of a State into an open HDFStore.
+
+    Args:
+        store (pandas.HDFStore)
+        key (str): the path for the state
+        state (State)
+
+    Returns:
+        None
+
+    """
+    for i, units in enumerate(state):
+        store.put(os.path.join(key, 'units_'+str(i)),
+                  pandas.DataFrame(be.to_numpy_array(units)))
+
+def _get_state(store, key, num_layers):
+    """
+    Get a State from an open HDFStore.
+
+    Args:
+        store (pandas.HDFStore)
+        key (str): the path for the state
+        num_layers (int): the number of layers in the state
+
+    Returns:
+        State
+
+    """
+    return State([be.float_tensor(
+        store.get(os.path.join(key, 'units_'+str(i))).values)
+        for i in range(num_layers)])
+
+
+def save_checkpoint(filename, epoch, model, optimizer, negative_phase,
+                    monitor=None):
+    """
+    Save everything needed to resume training.
+
+    Notes:
+        Performs an IO operation.
+        The checkpoint includes the model parameters, the gradient memory
+        and last step of the optimizer, the position of the stepsize
+        schedule, the state of the negative phase sampler (including the
+        replicas and the swap parity and counts of a ParallelTempering
+        sampler) and its inverse temperature,
+        the metrics in the memory of the monitor, and the state of the
+        random number generators. The packed pool of a PackedPersistentMC
+        sampler is saved packed.
+        The file is written under a temporary name and then renamed,
+        so an interrupted save does not destroy the previous checkpoint.
+
+    Args:
+        filename (str): the name of the checkpoint file.
+        epoch (int): the number of completed epochs.
+        model (BoltzmannMachine)
+        optimizer: an optimizer object
+        negative_phase: a sampler object
+        monitor (optional; ProgressMonitor)
+
+    Returns:
+        None
+
+    """
+    temp_filename = filename + '.tmp'
+    store = pandas.HDFStore(temp_filename, 'w')
+    model.save(store)
+
+    # the gradient memory and the last step of the optimizer
+    memory = getattr(optimizer, 'memory', None)
+    saved_gradients = []
+    for name, grad in [('mean_gradient', getattr(memory, 'mean_gradient', None)),
+                       ('mean_square_gradient',
+                        getattr(memory, 'mean_square_gradient', None)),
+                       ('delta', optimizer.delta or None)]:
+        if grad is not None:
+            store.put(os.path.join('optimizer', name), _flatten_to_frame(grad))
+            saved_gradients.append(name)
+
+    # the state of the negative phase sampler
+    _put_state(store, 'negative_phase/state', negative_phase.state)
+    replicas = getattr(negative_phase, 'replicas', None)
+    if replicas is not None:
+        _put_state(store, 'negative_phase/replicas', replicas)
+    pool = getattr(negative_phase, 'pool', None)
+    if pool is not None:
+        _put_state(store, 'negative_phase/pool', pool.units)
+
+    if monitor is not None:
+        store.put('metrics', pandas.DataFrame(monitor.memory))
+
+    store.put('checkpoint', pandas.DataFrame())
+    attrs = store.get_storer('checkpoint').attrs
+    attrs.epoch = epoch
+    attrs.stepsize = optimizer.stepsize
+    attrs.saved_gradients = saved_gradients
+    attrs.beta_sampler = _beta_sampler_config(negative_phase.beta_sampler)
+    attrs.has_replicas = replicas is not None
+    attrs.swaps = None if replicas is None else \
+        {'swap_offset': negative_phase.swap_offset,
+         'swap_attempts': negative_phase.swap_attempts,
+         'swap_accepts': negative_phase.swap_accepts}
+    attrs.pool = None if pool is None else \
+        {'num_units': pool.num_units, 'packed': pool.packed,
+         'block': negative_phase.block,
+         'block_updated': negative_phase.block_updated}
+    attrs.has_metrics = monitor is not None
+    attrs.rng_state = be.get_rng_state()
+    store.close()
+    os.replace(temp_filename, filename)
+
+def load_checkpoint(filename, model, optimizer, negative_phase, monitor=None):
+    """
+    Restore the training state saved by save_checkpoint.
+
+    Notes:
+        Performs an IO operation.
+        Modifies the model, optimizer, negative_phase and monitor in place.
+        The objects must have the same structure as the ones that were
+        saved (e.g., the same model layers and the same optimizer class).
+        The random number generators are restored last, so that the
+        resumed run draws the same random numbers as an uninterrupted one.
+
+    Args:
+        filename (str): the name of the checkpoint file.
+        model (BoltzmannMachine)
+        optimizer: an optimizer object
+        negative_phase: a sampler object
+        monitor (optional; ProgressMonitor)
+
+    Returns:
+        epoch (int): the number of completed epochs.
+
+    """
+    store = pandas.HDFStore(filename, 'r')
+    model.load(store)
+    attrs = store.get_storer('checkpoint').attrs
+
+    # the gradient memory and the last step of the optimizer
+    optimizer.stepsize = attrs.stepsize
+    gradients = {name: _gradient_from_frame(
+                        store.get(os.path.join('optimizer', name)), model)
+                 for name in attrs.saved_gradients}
+    memory = getattr(optimizer, 'memory', None)
+    if memory is not None:
+        memory.mean_gradient = gradients.get('mean_gradient')
+        memory.mean_square_gradient = gradients.get('mean_square_gradient')
+    optimizer.delta = gradients.get('delta', {})
+
+    # the state of the negative phase sampler
+    pool = getattr(attrs, 'pool', None)
+    if pool is not None:
+        units = [store.get(os.path.join('negative_phase/pool', 'units_'+str(i))).values
+                 for i in range(model.num_layers)]
+        units = [be.from_numpy_array(u) if p else be.float_tensor(u)
+                 for u, p in zip(units, pool['packed'])]
+        negative_phase.set_pool(PackedState(units, pool['num_units'],
+                                            pool['packed']), pool['block'][0])
+        negative_phase.block_updated = pool['block_updated']
+    else:
+        negative_phase.set_state(_get_state(store, 'negative_phase/state',
+                                            model.num_layers))
+    if attrs.has_replicas:
+        replicas = _get_state(store, 'negative_phase/replicas', model.num_layers)
+        for i in range(model.num_layers):
+            negative_phase.replicas[i][:] = replicas[i]
+    swaps = getattr(attrs, 'swaps', None)
+    if swaps is not None:
+        negative_phase.swap_offset = swaps['swap_offset']
+        negative_phase.swap_attempts = list(swaps['swap_attempts'])
+        negative_phase.swap_accepts = list(swaps['swap_accepts'])
+    _set_beta_sampler_config(negative_phase.beta_sampler, attrs.beta_sampler)
+
+    if monitor is not None and attrs.has_metrics:
+        monitor.memory = store.get('metrics').to_dict('records')
+
+    epoch = attrs.epoch
+    be.set_rng_state(attrs.rng_state)
+    store.close()
+    return epoch
@@ -1,4 +1,8 @@
+import tempfile
+import numpy
+
 from .. import backends as be
+from .. import batch as batch_module
 from ..models.state import State
 from .. import layers
 from ..models import BoltzmannMachine
@@ -8,6 +12,21 @@ from . import sgd
 from .. import preprocess as pre
 
 
+def _is_deterministic(transform):
+    """
+    Check if a transform always maps a row of the data to the same output.
+
+    Args:
+        transform (Transformation)
+
+    Returns:
+        bool
+
+    """
+    return getattr(transform, 'deterministic', False) or \
+        getattr(transform, 'function', None) is be.do_nothing
+
+
 class LayerwisePretrain(object):
     """
     Pretrain a model in layerwise fashion using the method from:
@@ -30,6 +49,32 @@ class LayerwisePretrain(object):
         self.model = model
         self.batch = batch
 
+    @staticmethod
+    def _propagate(model, data):
+        """
+        Compute the mean of the last layer of a model given the visible units.
+
+        Args:
+            model (BoltzmannMachine)
+            data (tensor (num_samples, num_visible_units))
+
+        Returns:
+            tensor (num_samples, num_units): the units of the last layer
+
+        """
+        # create a state
+        state = State.from_visible(data, model)
+        # cache the model clamping
+        clamping = model.clamped_sampling
+        # clamp the visible units
+        model.set_clamped_sampling([0])
+        # perform a mean field iteration
+        state = model.mean_field_iteration(1, state)
+        # reset the model clamping
+        model.set_clamped_sampling(clamping)
+        # return the units of the last layer
+        return state[-1]
+
     def _create_transform(self, model, basic_transform):
         """
         Closure that creates a transform function from a model.
@@ -42,20 +87,67 @@ class LayerwisePretrain(object):
 
         """
         def transform(data):
-            # create a state
-            state = State.from_visible(basic_transform.compute(data), model)
-            # cache the model clamping
-            clamping = model.clamped_sampling
-            # clamp the visible units
-            model.set_clamped_sampling([0])
-            # perform a mean field iteration
-            state = model.mean_field_iteration(1, state)
-            # reset the model clamping
-            model.set_clamped_sampling(clamping)
-            # return the units of the last layer
-            return state[-1]
+            return self._propagate(model, basic_transform.compute(data))
         return pre.Transformation(transform)
 
+    def _cache_representation(self, model, data, cache, directory):
+        """
+        Propagate all of the data through a trained submodel once
+        and store the result in a new batch object.
+
+        Notes:
+            Performs an IO operation if cache == 'memmap'.
+            The minibatches of the new batch object have the same size
+            as the (transformed) minibatches of the data.
+            If a table of the data shuffles its rows in each epoch, so does
+            the new table, with a seed drawn from the generator of the table.
+
+        Args:
+            model (BoltzmannMachine): the trained submodel
+            data (Batch): the input to the submodel
+            cache (str): 'memory' or 'memmap'
+            directory (str): the directory for the memory-mapped files
+
+        Returns:
+            Batch
+
+        """
+        tables = {}
+        for key in data.modes:
+            data.reset_generator(key)
+            minibatches = []
+            if cache == 'memmap':
+                stream = tempfile.NamedTemporaryFile(suffix='.dat', dir=directory,
+                                                     delete=False)
+            num_rows = 0
+            while True:
+                try:
+                    v_data = data.get(key)
+                except StopIteration:
+                    break
+                hidden = be.to_numpy_array(self._propagate(model, v_data))
+                num_rows += len(hidden)
+                if cache == 'memmap':
+                    hidden.astype(numpy.float32).tofile(stream)
+                else:
+                    minibatches.append(hidden)
+
+            num_units = model.layers[-1].len
+            if cache == 'memmap':
+                stream.close()
+                tensor = numpy.memmap(stream.name, dtype=numpy.float32, mode='r',
+                                      shape=(num_rows, num_units))
+            else:
+                tensor = numpy.vstack(minibatches)
+            source = data.batch[key]
+            shuffle = getattr(source, 'shuffle', False)
+            seed = source.random.randint(2**31) if shuffle else None
+            tables[key] = batch_module.InMemoryTable(
+                tensor, source.output_batch_size,
+                transform=pre.Transformation(be.float_tensor),
+                shuffle=shuffle, seed=seed)
+        return batch_module.Batch(tables)
+
     def _copy_params_from_submodels(self, submodels):
         """
         Copy the parameters from a list of submodels into a single model.
@@ -77,21 +169,30 @@ class LayerwisePretrain(object):
             self.model.layers[i+1].set_params(submodels[i].layers[1].get_params())
             if (i == 0) or (i == len(submodels)-1):
                 # keep the weights of the zeroth layer and the last layer
-                self.model.connections[i].weights.params.matrix[:] = \
-                    submodels[i].connections[0].weights.W()
+                self.model.connections[i].weights.set_params(
+                    layers.ParamsWeights(submodels[i].connections[0].weights.W()))
             else:
                 # halve the weights of the other layers
-                self.model.connections[i].weights.params.matrix[:] = \
-                    0.5 * submodels[i].connections[0].weights.W()
+                self.model.connections[i].weights.set_params(
+                    layers.ParamsWeights(0.5 * submodels[i].connections[0].weights.W()))
 
     def train(self, optimizer, num_epochs, mcsteps=1, method=methods.pcd,
               beta_std=0.6, init_method="hinton", negative_phase_batch_size=None,
-              verbose=True):
+              verbose=True, cache=None):
         """
         Train the model layerwise.
 
         Notes:
             Updates the model parameters in place.
+            Without a cache, the data are propagated through every trained
+            lower layer for each minibatch, so the cost of pretraining grows
+            quadratically with the depth of the model. The lower layers are
+            frozen while a layer trains, so with a cache their output is
+            computed once per layer and stored, either in memory or in
+            temporary memory-mapped files that are deleted after training.
+            The transforms of the batch are only applied once when the
+            output is stored, so a cache can only be used if they are
+            deterministic (see preprocess.Transformation) or the identity.
 
         Args:
             optimizer: an optimizer object
@@ -105,11 +206,19 @@ class LayerwisePretrain(object):
             negative_phase_batch_size (int; optional): the batch size for the negative phase.
                 If None, matches the positive_phase batch size.
             verbose (bool; optional): print output to stdout
+            cache (str; optional): where to store the propagated data
+                [None, 'memory', 'memmap']. If None, nothing is stored.
 
         Returns:
             None
 
         """
+        assert cache in [None, 'memory', 'memmap'], \
+            "cache must be None, 'memory', or 'memmap'"
+        assert cache is None or all(_is_deterministic(transform) for transform
+                                    in self.batch.get_transforms().values()), \
+            "the transforms must be deterministic to cache the propagated data"
+
         # create the submodels
         submodels = []
         for i in range(self.model.num_layers -1):
@@ -128,34 +237,52 @@ class LayerwisePretrain(object):
         lr_schedule_cache = optimizer.stepsize.copy()
         transform_cache = self.batch.get_transforms()
 
+        # the data for the current submodel
+        data = self.batch
+        directory = tempfile.TemporaryDirectory() if cache == 'memmap' else None
+        directory_name = directory.name if directory is not None else None
+
         for i in range(len(submodels)):
             be.maybe_print('training model {}'.format(i), end="\n\n", verbose=verbose)
 
-            # update the transform
-            basic_transform = self.batch.get_transforms()
-            if i > 0:
+            if i > 0 and cache is not None:
+                # store the output of the previous submodel
+                cached_data = self._cache_representation(submodels[i-1], data,
+                                                         cache, directory_name)
+                if data is not self.batch:
+                    data.close()
+                data = cached_data
+            elif i > 0:
+                # update the transform
+                basic_transform = self.batch.get_transforms()
                 self.batch.set_transforms({key:self._create_transform(submodels[i-1],
                                                basic_transform[key]) for key in basic_transform})
+
+            if i > 0:
                 # set the parameters of the zeroth layer using the
                 # parameters of the first layer of the previous model
                 submodels[i].layers[0].set_params(submodels[i-1].layers[1].get_params())
                 submodels[i].layers[0].set_fixed_params(submodels[i-1].layers[1].get_param_names())
 
             # initialize the submodel
-            submodels[i].initialize(self.batch, method=init_method)
+            submodels[i].initialize(data, method=init_method)
 
             # reset the state of the optimizer
             optimizer.reset()
             optimizer.stepsize = lr_schedule_cache
 
             # set up a sampler
-            trainer = sgd.StochasticGradientDescent(submodels[i], self.batch)
+            trainer = sgd.StochasticGradientDescent(submodels[i], data)
             trainer.train(optimizer, num_epochs, method=method, mcsteps=mcsteps,
                           beta_std=beta_std, verbose=verbose,
                           negative_phase_batch_size=negative_phase_batch_size)
 
-        # reset the transform
+        # reset the transform and remove the cache
         self.batch.set_transforms(transform_cache)
+        if data is not self.batch:
+            data.close()
+        if directory is not None:
+            directory.cleanup()
 
         # update the model
         self._copy_params_from_submodels(submodels)
@@ -1,4 +1,5 @@
-from ..models.state import State
+from ..models.state import State, StateTAP
+from ..profiler import PROFILER
 
 
 def contrastive_divergence(vdata, model, positive_phase, negative_phase):
@@ -31,19 +32,22 @@ def contrastive_divergence(vdata, model, positive_phase, negative_phase):
     target_layer = model.num_layers - 1
 
     # compute the update of the positive phase
-    data_state = State.from_visible(vdata, model)
-    positive_phase.set_state(data_state)
-    positive_phase.update_state()
-    grad_data_state = positive_phase.state_for_grad(target_layer)
+    with PROFILER.timer('positive_phase'):
+        data_state = State.from_visible(vdata, model)
+        positive_phase.set_state(data_state)
+        positive_phase.update_state()
+        grad_data_state = positive_phase.state_for_grad(target_layer)
 
     # CD resets the sampler from the visible data at each iteration
-    model_state = State.from_visible(vdata, model)
-    negative_phase.set_state(model_state)
-    negative_phase.update_state()
-    grad_model_state = negative_phase.state_for_grad(target_layer)
+    with PROFILER.timer('negative_phase'):
+        model_state = State.from_visible(vdata, model)
+        negative_phase.set_state(model_state)
+        negative_phase.update_state()
+        grad_model_state = negative_phase.state_for_grad(target_layer)
 
     # compute the gradient
-    return model.gradient(grad_data_state, grad_model_state)
+    with PROFILER.timer('gradient'):
+        return model.gradient(grad_data_state, grad_model_state)
 
 # alias
 cd = contrastive_divergence
@@ -76,16 +80,19 @@ def persistent_contrastive_divergence(vdata, model, positive_phase, negative_pha
     target_layer = model.num_layers - 1
 
     # compute the update of the positive phase
-    data_state = State.from_visible(vdata, model)
-    positive_phase.set_state(data_state)
-    positive_phase.update_state()
-    grad_data_state = positive_phase.state_for_grad(target_layer)
+    with PROFILER.timer('positive_phase'):
+        data_state = State.from_visible(vdata, model)
+        positive_phase.set_state(data_state)
+        positive_phase.update_state()
+        grad_data_state = positive_phase.state_for_grad(target_layer)
 
     # PCD persists the state of the sampler from the previous iteration
-    negative_phase.update_state()
-    grad_model_state = negative_phase.state_for_grad(target_layer)
+    with PROFILER.timer('negative_phase'):
+        negative_phase.update_state()
+        grad_model_state = negative_phase.state_for_grad(target_layer)
 
-    return model.gradient(grad_data_state, grad_model_state)
+    with PROFILER.timer('gradient'):
+        return model.gradient(grad_data_state, grad_model_state)
 
 # alias
 pcd = persistent_contrastive_divergence
@@ -94,9 +101,38 @@ pcd = persistent_contrastive_divergence
 class TAP(object):
     def __init__(self, use_GD=True, init_lr=0.1, tolerance=0.01, max_iters=25,
                  ratchet=False, decrease_on_neg=0.9, mean_weight=0.9,
-                 mean_square_weight=0.999):
-        #TODO: Fill in this docstring to explain what these arguments mean
+                 mean_square_weight=0.999, warm_start=False,
+                 refresh_interval=None):
         """
+        Create a method for computing the gradient with the TAP approximation.
+
+        Notes:
+            With warm_start, the TAP magnetizations (and, for gradient descent,
+            the ADAM moments) that minimized the free energy on the previous
+            update are used as the seed of the next minimization. The
+            parameters move only slightly between updates, so the minimization
+            from the previous magnetizations converges in fewer iterations than
+            from a random seed.
+
+        Args:
+            use_GD (bool): use gradient descent or use self_consistent iteration
+            init_lr (float): initial learning rate for GD
+            tolerance (float): tolerance for quitting minimization
+            max_iters (int): maximum gradient decsent steps
+            ratchet (bool): don't perform gradient update if not lowering GFE
+            decrease_on_neg (float): factor to multiply lr by if the gradient step
+                fails to lower the GFE
+            mean_weight (float): mean weight parameter for ADAM
+            mean_square_weight (float): mean square weight parameter for ADAM
+                setting to 0.0 turns off adaptive weighting
+            warm_start (bool): seed each minimization from the result of
+                the previous one
+            refresh_interval (int; optional): with warm_start, the number of
+                updates after which the minimization is seeded randomly again.
+                If None, the seed is only random on the first update.
+
+        Returns:
+            TAP
 
         """
         self.use_GD = use_GD
@@ -107,6 +143,57 @@ class TAP(object):
         self.ratchet = ratchet
         self.mean_weight = mean_weight
         self.mean_square_weight = mean_square_weight
+        self.warm_start = warm_start
+        self.refresh_interval = refresh_interval
+        self.reset()
+
+    def reset(self):
+        """
+        Discard the cached magnetizations and ADAM moments, so that the next
+        minimization starts from a random seed.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        self.state = None
+        self.moments = None
+        self.num_updates = 0
+
+    def _warm_state(self, model):
+        """
+        Minimize the TAP free energy starting from the cached magnetizations.
+
+        Notes:
+            Updates the cached magnetizations and ADAM moments in place.
+
+        Args:
+            model (BoltzmannMachine): model to train
+
+        Returns:
+            StateTAP: the minimizing magnetizations
+
+        """
+        if self.refresh_interval is not None and \
+           self.num_updates % self.refresh_interval == 0:
+            self.reset()
+        if self.state is None:
+            self.state = StateTAP.from_model_rand(model)
+            self.moments = ([layer.get_zero_magnetization() for layer in model.layers],
+                            [layer.get_zero_magnetization() for layer in model.layers])
+        self.num_updates += 1
+
+        self.state, _ = model.compute_StateTAP(self.use_GD, self.init_lr,
+                                               self.tolerance, self.max_iters,
+                                               self.ratchet, self.decrease_on_neg,
+                                               self.mean_weight,
+                                               self.mean_square_weight,
+                                               seed=self.state,
+                                               moments=self.moments)
+        return self.state
 
     def tap_update(self, vdata, model, positive_phase, negative_phase=None):
         """
@@ -132,13 +219,20 @@ class TAP(object):
         """
         # compute the positive phase
         target_layer = model.num_layers - 1
-        data_state = State.from_visible(vdata, model)
-        positive_phase.set_state(data_state)
-        positive_phase.update_state()
-
-        grad_data_state = positive_phase.state_for_grad(target_layer)
-
-        return model.TAP_gradient(grad_data_state, self.use_GD,
-                                  self.init_lr, self.tolerance,
-                                  self.max_iters, self.ratchet, self.decrease_on_neg,
-                                  self.mean_weight, self.mean_square_weight)
+        with PROFILER.timer('positive_phase'):
+            data_state = State.from_visible(vdata, model)
+            positive_phase.set_state(data_state)
+            positive_phase.update_state()
+
+            grad_data_state = positive_phase.state_for_grad(target_layer)
+
+        with PROFILER.timer('negative_phase'):
+            tap_state = self._warm_state(model) if self.warm_start else None
+
+        # without a warm start, the TAP minimization happens in here
+        with PROFILER.timer('gradient'):
+            return model.TAP_gradient(grad_data_state, self.use_GD,
+                                      self.init_lr, self.tolerance,
+                                      self.max_iters, self.ratchet, self.decrease_on_neg,
+                                      self.mean_weight, self.mean_square_weight,
+                                      state=tap_state)
@@ -0,0 +1,368 @@
+import time
+import traceback
+import multiprocessing
+import numpy as np
+
+from .. import backends as be
+from .. import metrics as M
+from .. import samplers
+from ..models import gradient_util as gu
+from . import methods
+
+
+class _WorkerError(object):
+    """
+    Container for the traceback of an exception raised in a worker process.
+
+    """
+    def __init__(self, rank, message):
+        self.rank = rank
+        self.message = message
+
+
+class DataParallelSGD(object):
+    """
+    Stochastic gradient descent with minibatches split across processes.
+
+    The parameters of the model are stored in shared memory. Each worker
+    process holds its own samplers, including its own persistent
+    negative phase chains, and computes the gradient of its share of the
+    data. In the synchronous mode, each minibatch is split between the
+    workers and their gradients are averaged through shared memory before
+    a single optimizer step in the main process. In the asynchronous
+    (Hogwild) mode, each worker processes whole minibatches and applies
+    its own optimizer steps to the shared parameters without locking.
+
+    """
+    def __init__(self, model, batch, num_workers=None, asynchronous=False,
+                 fantasy_steps=10):
+        """
+        Create a DataParallelSGD object.
+
+        Notes:
+            The workers are forked, so this only runs on platforms with
+            the fork start method (e.g., Linux).
+            Each worker may also use several threads for its linear algebra,
+            so it is often faster to limit the number of threads
+            (e.g., with OMP_NUM_THREADS) when using many workers.
+
+        Args:
+            model: a model object
+            batch: a batch object
+            num_workers (int; optional): the number of worker processes.
+                If None, uses the number of cpus.
+            asynchronous (bool; optional): whether the workers update the
+                parameters asynchronously (Hogwild) or synchronously.
+            fantasy_steps (int): the number of steps for fantasy particles
+                in the progress monitor.
+
+        Returns:
+            DataParallelSGD
+
+        """
+        self.model = model
+        self.batch = batch
+        self.num_workers = num_workers if num_workers is not None \
+            else multiprocessing.cpu_count()
+        self.asynchronous = asynchronous
+        self.fantasy_steps = fantasy_steps
+        self.monitor = M.ProgressMonitor()
+
+        self.context = multiprocessing.get_context('fork')
+        self.tasks = None
+        self.results = None
+        self.workers = None
+        self.gradients = None
+
+    def _work(self, rank, seed, optimizer, method, sampler_args,
+              neg_batch_size, beta_std, burn_in):
+        """
+        Compute gradients in a worker process until told to stop.
+
+        Notes:
+            Runs in the worker process.
+            Acknowledges each minibatch by putting (rank, batch size)
+            on the results queue.
+
+        Args:
+            rank (int): the index of the worker
+            seed (int): the seed of the random number generator
+            optimizer: an optimizer object (only used if asynchronous)
+            method (fit.methods obj): the method used to approximate the
+                likelihood gradient
+            sampler_args (dict): the keyword arguments for the samplers
+            neg_batch_size (int): the number of persistent chains
+            beta_std (float): the standard deviation of the inverse
+                temperature of the negative phase after the burn in
+            burn_in (int): the number of initial epochs during which
+                the beta_std will be set to 0
+
+        Returns:
+            None
+
+        """
+        try:
+            be.set_seed(seed)
+            positive_phase = samplers.SequentialMC(self.model, clamped=[0],
+                                                   beta_std=0, **sampler_args)
+            negative_phase = samplers.SequentialMC.from_model(
+                self.model, neg_batch_size, beta_std=0, **sampler_args)
+
+            while True:
+                task = self.tasks[rank].get()
+                if task is None:
+                    break
+                (kind, value) = task
+                if kind == 'epoch':
+                    if value > burn_in:
+                        negative_phase.beta_sampler.set_std(beta_std)
+                    if self.asynchronous:
+                        optimizer.update_lr()
+                    continue
+
+                # the parameters were changed by the other processes
+                self.model.mark_parameters_changed()
+                v_data = be.float_tensor(value)
+                grad = method(v_data, self.model, positive_phase, negative_phase)
+                if self.asynchronous:
+                    optimizer.update(self.model, grad)
+                else:
+                    self.gradients[rank][:] = gu.grad_flatten(grad)
+                self.results.put((rank, len(value)))
+        except Exception:
+            self.results.put(_WorkerError(rank, traceback.format_exc()))
+
+    def _start(self, optimizer, method, sampler_args, neg_batch_size,
+               beta_std, burn_in):
+        """
+        Move the parameters into shared memory and fork the workers.
+
+        Notes:
+            Modifies the params attributes of the model layers and weights.
+
+        Args:
+            optimizer: an optimizer object
+            method (fit.methods obj): the method used to approximate the
+                likelihood gradient
+            sampler_args (dict): the keyword arguments for the samplers
+            neg_batch_size (int): the number of persistent chains per worker
+            beta_std (float): the standard deviation of the inverse
+                temperature of the negative phase after the burn in
+            burn_in (int): the number of initial epochs during which
+                the beta_std will be set to 0
+
+        Returns:
+            None
+
+        """
+        num_params = self.model.num_parameters()
+        self.model.use_flat_parameters(be.shared_zeros((num_params,)))
+        self.gradients = be.shared_zeros((self.num_workers, num_params))
+
+        self.tasks = [self.context.Queue() for _ in range(self.num_workers)]
+        self.results = self.context.Queue()
+        # the seeds are drawn from the backend generator, so they are set
+        # by be.set_seed and saved with its state
+        seeds = be.rand_int(0, 2**31, (self.num_workers,))
+        self.workers = [self.context.Process(target=self._work,
+                                             args=(rank, int(seeds[rank]),
+                                                   optimizer, method,
+                                                   sampler_args, neg_batch_size,
+                                                   beta_std, burn_in),
+                                             daemon=True)
+                        for rank in range(self.num_workers)]
+        for worker in self.workers:
+            worker.start()
+
+    def _stop(self):
+        """
+        Stop the workers.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        if self.workers is None:
+            return
+        for rank in range(self.num_workers):
+            self.tasks[rank].put(None)
+        for worker in self.workers:
+            worker.join()
+        self.workers = None
+        self.tasks = None
+        self.results = None
+
+    def _wait(self, num_tasks):
+        """
+        Wait for the workers to finish a number of minibatches.
+
+        Args:
+            num_tasks (int): the number of acknowledgements to wait for
+
+        Returns:
+            List[(int, int)]: the rank and batch size of each minibatch
+
+        """
+        done = []
+        for _ in range(num_tasks):
+            result = self.results.get()
+            if isinstance(result, _WorkerError):
+                raise RuntimeError('Worker {} failed:\n{}'.format(
+                    result.rank, result.message))
+            done.append(result)
+        return done
+
+    def _synchronous_step(self, optimizer, v_data):
+        """
+        Split a minibatch across the workers and take a single optimizer
+        step with the average of their gradients.
+
+        Args:
+            optimizer: an optimizer object
+            v_data (tensor (batch_size, num_units)): a minibatch
+
+        Returns:
+            None
+
+        """
+        # split the rows as evenly as possible between the workers
+        batch_size = be.shape(v_data)[0]
+        part_size, remainder = divmod(batch_size, self.num_workers)
+        num_parts = 0
+        start = 0
+        for rank in range(self.num_workers):
+            stop = start + part_size + (1 if rank < remainder else 0)
+            if stop > start:
+                self.tasks[rank].put(('batch', be.to_numpy_array(v_data[start:stop])))
+                num_parts += 1
+            start = stop
+
+        weights = [0.0 for _ in range(self.num_workers)]
+        for rank, size in self._wait(num_parts):
+            weights[rank] = size / batch_size
+        vector = be.dot(be.transpose(self.gradients), be.float_tensor(weights))
+        optimizer.update(self.model,
+            gu.FlatGradient(vector, self.model.flat_params.layout))
+
+    def _asynchronous_epoch(self):
+        """
+        Hand out the minibatches of an epoch to the workers as they
+        become free, and wait for all of them to be processed.
+
+        Notes:
+            At most two minibatches per worker are queued at any time.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        free = list(range(self.num_workers)) * 2
+        num_tasks = 0
+        while True:
+            try:
+                v_data = self.batch.get(mode='train')
+            except StopIteration:
+                break
+            if not free:
+                free += [rank for rank, _ in self._wait(1)]
+                num_tasks -= 1
+            self.tasks[free.pop(0)].put(('batch', be.to_numpy_array(v_data)))
+            num_tasks += 1
+        self._wait(num_tasks)
+
+    def train(self, optimizer, num_epochs, mcsteps=1, update_method='markov_chain',
+              method=methods.pcd, beta_std=0.6, negative_phase_batch_size=None,
+              verbose=True, burn_in=0, inplace_sampling=False):
+        """
+        Train the model.
+
+        Notes:
+            Updates the model parameters in place.
+            The model parameters are moved into shared memory
+            (see BoltzmannMachine.use_flat_parameters).
+            In the asynchronous mode, each worker has its own copy of the
+            optimizer and the convergence criterion is not checked.
+
+        Args:
+            optimizer: an optimizer object
+            num_epochs (int): the number of epochs
+            mcsteps (int; optional): the number of Monte Carlo steps per gradient
+            update_method (str; optional): the method used to update the state
+                [markov_chain, deterministic_iteration, mean_field_iteration]
+            method (fit.methods obj; optional): the method used to approximate the likelihood
+                               gradient [cd, pcd, tap]
+            beta_std (float; optional): the standard deviation of the inverse
+                temperature of the SequentialMC sampler
+            negative_phase_batch_size (int; optional): the total batch size
+                for the negative phase, split evenly between the workers.
+                If None, matches the positive_phase batch size.
+            verbose (bool; optional): print output to stdout
+            burn_in (int; optional): the number of initial epochs during which
+                the beta_std will be set to 0
+            inplace_sampling (bool; optional): whether the samplers update
+                their states in place using preallocated buffers
+
+        Returns:
+            None
+
+        """
+        neg_batch_size = negative_phase_batch_size \
+            if negative_phase_batch_size is not None else self.batch.output_batch_size
+        sampler_args = {'updater': update_method,
+                        'mcsteps': mcsteps,
+                        'inplace': inplace_sampling}
+
+        be.maybe_print('Before training:', verbose=verbose)
+        if self.monitor is not None:
+            self.monitor.epoch_update(self.batch, self.model,
+                                      fantasy_steps=self.fantasy_steps,
+                                      store=False, show=verbose)
+
+        self._start(optimizer, method, sampler_args,
+                    max(1, neg_batch_size // self.num_workers), beta_std, burn_in)
+        try:
+            for epoch in range(1, 1+num_epochs):
+                time_last = time.time()
+
+                for rank in range(self.num_workers):
+                    self.tasks[rank].put(('epoch', epoch))
+                optimizer.update_lr()
+
+                if self.asynchronous:
+                    self._asynchronous_epoch()
+                    self.model.mark_parameters_changed()
+                else:
+                    while True:
+                        try:
+                            v_data = self.batch.get(mode='train')
+                        except StopIteration:
+                            break
+                        self._synchronous_step(optimizer, v_data)
+
+                # end of epoch processing
+                time_now = time.time()
+                iteration_time = time_now - time_last
+                time_last = time_now
+                be.maybe_print('End of epoch {}: '.format(epoch), verbose=verbose)
+                be.maybe_print('Time elapsed {}s'.format(np.around(iteration_time, 3)),
+                               verbose=verbose)
+
+                if self.monitor is not None:
+                    self.monitor.epoch_update(self.batch, self.model,
+                                              fantasy_steps=self.fantasy_steps,
+                                              store=True, show=verbose)
+
+                # convergence check should be part of optimizer
+                if not self.asynchronous and optimizer.check_convergence():
+                    be.maybe_print('Convergence criterion reached', verbose=verbose)
+                    break
+        finally:
+            self._stop()
+
+        return None
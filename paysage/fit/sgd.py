@@ -4,7 +4,9 @@ import numpy as np
 from .. import backends as be
 from .. import metrics as M
 from .. import samplers
+from ..profiler import PROFILER
 from . import methods
+from . import checkpoint
 
 class StochasticGradientDescent(object):
     """Stochastic gradient descent with minibatches"""
@@ -29,12 +31,23 @@ class StochasticGradientDescent(object):
 
     def train(self, optimizer, num_epochs, mcsteps=1, update_method='markov_chain',
               method=methods.pcd, beta_std=0.6, negative_phase_batch_size=None,
-              verbose=True, burn_in=0):
+              verbose=True, burn_in=0, inplace_sampling=False,
+              negative_phase_sampler=None, profile=False,
+              checkpoint_filename=None, checkpoint_period=1, resume_from=None):
         """
         Train the model.
 
         Notes:
             Updates the model parameters in place.
+            If profile is True, the time spent reading data, sampling the
+            positive and negative phases, computing the gradient, taking
+            the optimizer step (which includes enforcing the constraints)
+            and computing the metrics is recorded with the PROFILER.
+            The summary of each epoch is stored in the monitor memory
+            along with the metrics.
+            If resume_from is given, training restarts from a checkpoint
+            written with checkpoint_filename, after the epochs that the
+            checkpoint had completed. The num_epochs includes those epochs.
 
         Args:
             optimizer: an optimizer object
@@ -51,6 +64,17 @@ class StochasticGradientDescent(object):
             verbose (bool; optional): print output to stdout
             burn_in (int; optional): the number of initial epochs during which
                 the beta_std will be set to 0
+            inplace_sampling (bool; optional): whether the samplers update
+                their states in place using preallocated buffers
+            negative_phase_sampler (optional): a sampler to use for the
+                negative phase (e.g., samplers.ParallelTempering).
+                If None, a SequentialMC sampler is created.
+            profile (bool; optional): record the time spent in each phase
+            checkpoint_filename (str; optional): the file to save a training
+                checkpoint to (see fit.save_checkpoint).
+            checkpoint_period (int; optional): the number of epochs
+                between checkpoints.
+            resume_from (str; optional): the checkpoint file to resume from.
 
         Returns:
             None
@@ -64,57 +88,91 @@ class StochasticGradientDescent(object):
                                                           updater=update_method,
                                                           clamped=[0],
                                                           beta_std=0,
-                                                          mcsteps=mcsteps)
+                                                          mcsteps=mcsteps,
+                                                          inplace=inplace_sampling)
 
-        negative_phase = samplers.SequentialMC.from_model(self.model,
+        if negative_phase_sampler is None:
+            negative_phase = samplers.SequentialMC.from_model(self.model,
                                                           neg_batch_size,
                                                           updater=update_method,
                                                           beta_std=0,
-                                                          mcsteps=mcsteps)
-
-        be.maybe_print('Before training:', verbose=verbose)
-        if self.monitor is not None:
-            self.monitor.epoch_update(self.batch, self.model,
-                                      fantasy_steps=self.fantasy_steps,
-                                      store=False, show=verbose)
-
-        for epoch in range(1, 1+num_epochs):
-            time_last = time.time()
-
-            if epoch > burn_in:
-                 negative_phase.beta_sampler.set_std(beta_std)
-
-            optimizer.update_lr()
-
-            while True:
-                try:
-                    v_data = self.batch.get(mode='train')
-                except StopIteration:
-                    break
-
-                optimizer.update(self.model,
-                    method(v_data, self.model, positive_phase, negative_phase)
-                )
-
-            # end of epoch processing
-            time_now = time.time()
-            iteration_time = time_now - time_last
-            time_last = time_now
-            be.maybe_print('End of epoch {}: '.format(epoch), verbose=verbose)
-            be.maybe_print('Time elapsed {}s'.format(np.around(iteration_time, 3)),
+                                                          mcsteps=mcsteps,
+                                                          inplace=inplace_sampling)
+        else:
+            negative_phase = negative_phase_sampler
+
+        completed_epochs = 0
+        if resume_from is not None:
+            completed_epochs = checkpoint.load_checkpoint(resume_from, self.model,
+                                                          optimizer, negative_phase,
+                                                          self.monitor)
+            be.maybe_print('Resuming after epoch {}'.format(completed_epochs),
                            verbose=verbose)
-
+        else:
+            be.maybe_print('Before training:', verbose=verbose)
             if self.monitor is not None:
                 self.monitor.epoch_update(self.batch, self.model,
                                           fantasy_steps=self.fantasy_steps,
-                                          store=True, show=verbose)
-
-            # convergence check should be part of optimizer
-            is_converged = optimizer.check_convergence()
-            if is_converged:
-                be.maybe_print('Convergence criterion reached', verbose=verbose)
-                break
-
+                                          store=False, show=verbose)
+
+        if profile:
+            PROFILER.enable()
+
+        try:
+            for epoch in range(1 + completed_epochs, 1+num_epochs):
+                time_last = time.time()
+                PROFILER.reset()
+
+                if epoch > burn_in:
+                     negative_phase.beta_sampler.set_std(beta_std)
+
+                optimizer.update_lr()
+
+                while True:
+                    try:
+                        v_data = self.batch.get(mode='train')
+                    except StopIteration:
+                        break
+
+                    grad = method(v_data, self.model, positive_phase, negative_phase)
+                    with PROFILER.timer('optimizer'):
+                        optimizer.update(self.model, grad)
+
+                # end of epoch processing
+                time_now = time.time()
+                iteration_time = time_now - time_last
+                time_last = time_now
+                be.maybe_print('End of epoch {}: '.format(epoch), verbose=verbose)
+                be.maybe_print('Time elapsed {}s'.format(np.around(iteration_time, 3)),
+                               verbose=verbose)
+
+                if self.monitor is not None:
+                    with PROFILER.timer('metrics'):
+                        self.monitor.epoch_update(self.batch, self.model,
+                                                  fantasy_steps=self.fantasy_steps,
+                                                  store=True, show=verbose)
+
+                if profile:
+                    summary = PROFILER.summary()
+                    if verbose:
+                        for key in summary:
+                            print("-{0}: {1}".format(key, np.around(summary[key], 3)))
+                        print("")
+                    if self.monitor is not None:
+                        self.monitor.memory[-1].update(summary)
+
+                if checkpoint_filename is not None and epoch % checkpoint_period == 0:
+                    checkpoint.save_checkpoint(checkpoint_filename, epoch, self.model,
+                                               optimizer, negative_phase, self.monitor)
+
+                # convergence check should be part of optimizer
+                is_converged = optimizer.check_convergence()
+                if is_converged:
+                    be.maybe_print('Convergence criterion reached', verbose=verbose)
+                    break
+        finally:
+            if profile:
+                PROFILER.disable()
         return None
 
 # alias
@@ -194,11 +194,15 @@ class BernoulliLayer(Layer):
         """
         The TAP-0 Gibbs free energy term associated strictly with this layer
 
+        Notes:
+            If the magnetization has shape (num_samples, num_units),
+            the term is computed for each sample.
+
         Args:
             cumulants (CumulantsTAP): magnetization of the layer
 
         Returns:
-            (float): 0th order term of Gibbs free energy
+            (float or tensor (num_samples,)): 0th order term of Gibbs free energy
         """
         # this quadratic approximation is 2x faster:
         #a = be.float_scalar(1.06*2.77258872224)
@@ -206,6 +210,10 @@ class BernoulliLayer(Layer):
         #return be.tsum(be.add(u, a * be.square(be.subtract(0.5, cumulants.mean)))) - \
         #       be.dot(self.params.loc, cumulants.mean)
         alias = 1.0-cumulants.mean
+        if be.ndim(cumulants.mean) == 2:
+            return be.tsum(be.multiply(cumulants.mean, be.log(cumulants.mean)) +
+                           be.multiply(alias, be.log(alias)), axis=1) - \
+                   be.dot(cumulants.mean, self.params.loc)
         return be.dot(cumulants.mean, be.log(cumulants.mean)) + \
                be.dot(alias, be.log(alias)) - \
                be.dot(self.params.loc, cumulants.mean)
@@ -503,6 +511,132 @@ class BernoulliLayer(Layer):
         r = self.rand(be.shape(p))
         return be.cast_float(r < p)
 
+    def rescale_(self, observations, out):
+        """
+        Rescale the observations and store the result in out.
+        Rescale is trivial for the Bernoulli layer.
+
+        Notes:
+            Modifies out in place.
+
+        Args:
+            observations (tensor (num_samples, num_units)):
+                Values of the observed units.
+            out (tensor (num_samples, num_units)): the output tensor.
+
+        Returns:
+            None
+
+        """
+        out[:] = observations
+        if self.center:
+            be.subtract_(self.get_center(), out)
+
+    def conditional_params_(self, scaled_units, weights, buffers, beta=None):
+        """
+        Compute the parameters of the layer conditioned on the state
+        of the connected layers and store them in buffers.field.
+
+        Notes:
+            Modifies buffers.field and buffers.product in place.
+
+        Args:
+            scaled_units list[tensor (num_samples, num_connected_units)]:
+                The rescaled values of the connected units.
+            weights list[tensor (num_connected_units, num_units)]:
+                The weights connecting the layers.
+            buffers (SamplingBuffers): preallocated buffers for the layer.
+            beta (tensor (num_samples, 1), optional):
+                Inverse temperatures.
+
+        Returns:
+            None
+
+        """
+        self._conditional_field_(scaled_units, weights, buffers)
+        be.add_(self.params.loc, buffers.field)
+        if beta is not None:
+            be.multiply_(beta, buffers.field)
+
+    def conditional_mode_(self, scaled_units, weights, buffers, out, beta=None):
+        """
+        Compute the mode of the distribution conditioned on the state
+        of the connected layers and store it in out.
+
+        Notes:
+            Modifies out and buffers in place.
+
+        Args:
+            scaled_units list[tensor (num_samples, num_connected_units)]:
+                The rescaled values of the connected units.
+            weights list[tensor (num_connected_units, num_units)]:
+                The weights connecting the layers.
+            buffers (SamplingBuffers): preallocated buffers for the layer.
+            out (tensor (num_samples, num_units)): the output tensor.
+            beta (tensor (num_samples, 1), optional):
+                Inverse temperatures.
+
+        Returns:
+            None
+
+        """
+        self.conditional_params_(scaled_units, weights, buffers, beta)
+        be.greater_(buffers.field, 0.0, out)
+
+    def conditional_mean_(self, scaled_units, weights, buffers, out, beta=None):
+        """
+        Compute the mean of the distribution conditioned on the state
+        of the connected layers and store it in out.
+
+        Notes:
+            Modifies out and buffers in place.
+
+        Args:
+            scaled_units list[tensor (num_samples, num_connected_units)]:
+                The rescaled values of the connected units.
+            weights list[tensor (num_connected_units, num_units)]:
+                The weights connecting the layers.
+            buffers (SamplingBuffers): preallocated buffers for the layer.
+            out (tensor (num_samples, num_units)): the output tensor.
+            beta (tensor (num_samples, 1), optional):
+                Inverse temperatures.
+
+        Returns:
+            None
+
+        """
+        self.conditional_params_(scaled_units, weights, buffers, beta)
+        be.expit_(buffers.field)
+        out[:] = buffers.field
+
+    def conditional_sample_(self, scaled_units, weights, buffers, out, beta=None):
+        """
+        Draw a random sample from the disribution conditioned on the state
+        of the connected layers and store it in out.
+
+        Notes:
+            Modifies out and buffers in place.
+            The bias, temperature, sigmoid and threshold are applied
+            to the field in a single fused pass.
+
+        Args:
+            scaled_units list[tensor (num_samples, num_connected_units)]:
+                The rescaled values of the connected units.
+            weights list[tensor (num_connected_units, num_units)]:
+                The weights connecting the layers.
+            buffers (SamplingBuffers): preallocated buffers for the layer.
+            out (tensor (num_samples, num_units)): the output tensor.
+            beta (tensor (num_samples, 1), optional):
+                Inverse temperatures.
+
+        Returns:
+            None
+
+        """
+        self._conditional_field_(scaled_units, weights, buffers)
+        be.rand_bernoulli_(buffers.field, self.params.loc, beta,
+                           buffers.random, out)
+
     def random(self, array_or_shape):
         """
         Generate a random sample with the same type as the layer.
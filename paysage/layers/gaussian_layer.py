@@ -217,16 +217,23 @@ class GaussianLayer(Layer):
         """
         The TAP-0 Gibbs free energy term associated strictly with this layer
 
+        Notes:
+            If the magnetization has shape (num_samples, num_units),
+            the term is computed for each sample.
+
         Args:
             cumulants (CumulantsTAP): magnetization of the layer
 
         Returns:
-            (float): 0th order term of Gibbs free energy
+            (float or tensor (num_samples,)): 0th order term of Gibbs free energy
         """
         scale = be.exp(self.params.log_var)
-        return  be.tsum(-0.5*be.log(2.0*math.pi*cumulants.variance) + \
-                be.divide(2.0*scale, be.square(be.subtract(cumulants.mean, self.params.loc)) + \
-                          cumulants.variance - scale))
+        entropy = -0.5*be.log(2.0*math.pi*cumulants.variance) + \
+                  be.divide(2.0*scale, be.square(be.subtract(cumulants.mean, self.params.loc)) + \
+                            cumulants.variance - scale)
+        if be.ndim(cumulants.mean) == 2:
+            return be.tsum(entropy, axis=1)
+        return be.tsum(entropy)
 
     def TAP_magnetization_grad(self, cumulants,
                                connected_cumulants, rescaled_connected_weights,
@@ -587,6 +594,137 @@ class GaussianLayer(Layer):
         r = self.rand(be.shape(mean))
         return mean + be.sqrt(var)*r
 
+    def rescale_(self, observations, out):
+        """
+        Scale the observations by the variance of the layer
+        and store the result in out.
+
+        v'_i = v_i / var_i
+
+        Notes:
+            Modifies out in place.
+
+        Args:
+            observations (tensor (num_samples, num_units)):
+                Values of the observed units.
+            out (tensor (num_samples, num_units)): the output tensor.
+
+        Returns:
+            None
+
+        """
+        out[:] = observations
+        if self.center:
+            be.subtract_(self.get_center(), out)
+        be.divide_(be.exp(self.params.log_var), out)
+
+    def conditional_params_(self, scaled_units, weights, buffers, beta=None):
+        """
+        Compute the conditional mean of the layer given the state
+        of the connected layers and store it in buffers.field.
+
+        Notes:
+            Modifies buffers.field and buffers.product in place.
+            The conditional variance does not depend on the connected
+            layers and is not stored.
+
+        Args:
+            scaled_units list[tensor (num_samples, num_connected_units)]:
+                The rescaled values of the connected units.
+            weights list[tensor (num_connected_units, num_units)]:
+                The weights connecting the layers.
+            buffers (SamplingBuffers): preallocated buffers for the layer.
+            beta (tensor (num_samples, 1), optional):
+                Inverse temperatures (unused for the mean).
+
+        Returns:
+            None
+
+        """
+        self._conditional_field_(scaled_units, weights, buffers)
+        be.add_(self.params.loc, buffers.field)
+
+    def conditional_mode_(self, scaled_units, weights, buffers, out, beta=None):
+        """
+        Compute the mode of the distribution conditioned on the state
+        of the connected layers and store it in out.
+        For a Gaussian layer, the mode equals the mean.
+
+        Notes:
+            Modifies out and buffers in place.
+
+        Args:
+            scaled_units list[tensor (num_samples, num_connected_units)]:
+                The rescaled values of the connected units.
+            weights list[tensor (num_connected_units, num_units)]:
+                The weights connecting the layers.
+            buffers (SamplingBuffers): preallocated buffers for the layer.
+            out (tensor (num_samples, num_units)): the output tensor.
+            beta (tensor (num_samples, 1), optional):
+                Inverse temperatures.
+
+        Returns:
+            None
+
+        """
+        self.conditional_params_(scaled_units, weights, buffers, beta)
+        out[:] = buffers.field
+
+    def conditional_mean_(self, scaled_units, weights, buffers, out, beta=None):
+        """
+        Compute the mean of the distribution conditioned on the state
+        of the connected layers and store it in out.
+
+        Notes:
+            Modifies out and buffers in place.
+
+        Args:
+            scaled_units list[tensor (num_samples, num_connected_units)]:
+                The rescaled values of the connected units.
+            weights list[tensor (num_connected_units, num_units)]:
+                The weights connecting the layers.
+            buffers (SamplingBuffers): preallocated buffers for the layer.
+            out (tensor (num_samples, num_units)): the output tensor.
+            beta (tensor (num_samples, 1), optional):
+                Inverse temperatures.
+
+        Returns:
+            None
+
+        """
+        self.conditional_params_(scaled_units, weights, buffers, beta)
+        out[:] = buffers.field
+
+    def conditional_sample_(self, scaled_units, weights, buffers, out, beta=None):
+        """
+        Draw a random sample from the disribution conditioned on the state
+        of the connected layers and store it in out.
+
+        Notes:
+            Modifies out and buffers in place.
+
+        Args:
+            scaled_units list[tensor (num_samples, num_connected_units)]:
+                The rescaled values of the connected units.
+            weights list[tensor (num_connected_units, num_units)]:
+                The weights connecting the layers.
+            buffers (SamplingBuffers): preallocated buffers for the layer.
+            out (tensor (num_samples, num_units)): the output tensor.
+            beta (tensor (num_samples, 1), optional):
+                Inverse temperatures.
+
+        Returns:
+            None
+
+        """
+        self.conditional_params_(scaled_units, weights, buffers, beta)
+        be.randn_(buffers.random)
+        be.multiply_(be.sqrt(be.exp(self.params.log_var)), buffers.random)
+        if beta is not None:
+            be.divide_(be.sqrt(beta), buffers.random)
+        be.add_(buffers.random, buffers.field)
+        out[:] = buffers.field
+
     def random(self, array_or_shape):
         """
         Generate a random sample with the same type as the layer.
@@ -5,6 +5,7 @@ import pandas
 from .. import penalties
 from .. import constraints
 from .. import backends as be
+from ..profiler import timed
 from .. import math_utils as mu
 
 # CumulantsTAP type is common to all layers
@@ -15,6 +16,13 @@ mean and variance are tensors of shape (num_samples>1, num_units) \
 or (num_units) in which num_samples is some sampling multiplicity \
 used in the tap calculations, not the SGD batch size."
 
+# SamplingBuffers type is common to all layers
+SamplingBuffers = namedtuple("SamplingBuffers",
+                             ["field", "product", "random", "rescaled"])
+SamplingBuffers.__doc__ += \
+"\nNote: each buffer is a tensor of shape (num_samples, num_units) that \
+is allocated once and overwritten by the in-place sampling methods."
+
 # Params type must be redefined for all Layers
 ParamsLayer = namedtuple("Params", [])
 
@@ -39,6 +47,8 @@ class Layer(object):
         """
         # these attributes are immutable (their keys don't change)
         self.params = ParamsLayer()
+        # counts the changes to the params, used to invalidate cached copies
+        self.version = 0
         # these attributes are mutable (their keys do change)
         self.penalties = OrderedDict()
         self.constraints = OrderedDict()
@@ -126,6 +136,7 @@ class Layer(object):
 
         Notes:
             Modifies layer.params in place.
+            Increments layer.version.
             Note: expects a length=1 list
 
         Args:
@@ -137,6 +148,7 @@ class Layer(object):
         """
         for i in self._get_trainable_indices():
             self.params[i][:] = new_params[0][i]
+        self.version += 1
 
     def get_param_names(self):
         """
@@ -309,6 +321,7 @@ class Layer(object):
         """
         self.constraints.update(constraint)
 
+    @timed('constraints')
     def enforce_constraints(self):
         """
         Apply the contraints to the layer parameters.
@@ -400,3 +413,144 @@ class Layer(object):
         """
         self.set_params([be.mapzip(be.subtract, deltas[0], self.params)])
         self.enforce_constraints()
+
+    #
+    # Methods for in-place sampling
+    #
+
+    def get_sampling_buffers(self, num_samples):
+        """
+        Allocate the buffers used by the in-place sampling methods.
+
+        Args:
+            num_samples (int): the number of samples in a batch
+
+        Returns:
+            buffers (SamplingBuffers)
+
+        """
+        return SamplingBuffers(*[be.zeros((num_samples, self.len))
+                                 for _ in SamplingBuffers._fields])
+
+    def _conditional_field_(self, scaled_units, weights, buffers):
+        """
+        Accumulate the field from the connected layers into buffers.field.
+
+        field = \sum_i scaled_units[i] * weights[i]
+
+        Notes:
+            Modifies buffers.field and buffers.product in place.
+
+        Args:
+            scaled_units list[tensor (num_samples, num_connected_units)]:
+                The rescaled values of the connected units.
+            weights list[tensor, (num_connected_units, num_units)]:
+                The weights connecting the layers.
+            buffers (SamplingBuffers): preallocated buffers for the layer.
+
+        Returns:
+            None
+
+        """
+        assert(len(scaled_units) == len(weights))
+        be.dot_(scaled_units[0], weights[0], buffers.field)
+        for i in range(1, len(weights)):
+            be.dot_(scaled_units[i], weights[i], buffers.product)
+            be.add_(buffers.product, buffers.field)
+
+    def rescale_(self, observations, out):
+        """
+        Rescale the observations and store the result in out.
+
+        Notes:
+            Modifies out in place.
+            Layers with a non-trivial scale should override this method.
+
+        Args:
+            observations (tensor (num_samples, num_units)):
+                Values of the observed units.
+            out (tensor (num_samples, num_units)): the output tensor.
+
+        Returns:
+            None
+
+        """
+        out[:] = self.rescale(observations)
+
+    def conditional_mode_(self, scaled_units, weights, buffers, out, beta=None):
+        """
+        Compute the mode of the distribution conditioned on the state
+        of the connected layers and store it in out.
+
+        Notes:
+            Modifies out in place.
+            This generic version allocates the result before copying it;
+            layers override it to use the buffers instead.
+
+        Args:
+            scaled_units list[tensor (num_samples, num_connected_units)]:
+                The rescaled values of the connected units.
+            weights list[tensor (num_connected_units, num_units)]:
+                The weights connecting the layers.
+            buffers (SamplingBuffers): preallocated buffers for the layer.
+            out (tensor (num_samples, num_units)): the output tensor.
+            beta (tensor (num_samples, 1), optional):
+                Inverse temperatures.
+
+        Returns:
+            None
+
+        """
+        out[:] = self.conditional_mode(scaled_units, weights, beta)
+
+    def conditional_mean_(self, scaled_units, weights, buffers, out, beta=None):
+        """
+        Compute the mean of the distribution conditioned on the state
+        of the connected layers and store it in out.
+
+        Notes:
+            Modifies out in place.
+            This generic version allocates the result before copying it;
+            layers override it to use the buffers instead.
+
+        Args:
+            scaled_units list[tensor (num_samples, num_connected_units)]:
+                The rescaled values of the connected units.
+            weights list[tensor (num_connected_units, num_units)]:
+                The weights connecting the layers.
+            buffers (SamplingBuffers): preallocated buffers for the layer.
+            out (tensor (num_samples, num_units)): the output tensor.
+            beta (tensor (num_samples, 1), optional):
+                Inverse temperatures.
+
+        Returns:
+            None
+
+        """
+        out[:] = self.conditional_mean(scaled_units, weights, beta)
+
+    def conditional_sample_(self, scaled_units, weights, buffers, out, beta=None):
+        """
+        Draw a random sample from the disribution conditioned on the state
+        of the connected layers and store it in out.
+
+        Notes:
+            Modifies out in place.
+            This generic version allocates the result before copying it;
+            layers override it to use the buffers instead.
+
+        Args:
+            scaled_units list[tensor (num_samples, num_connected_units)]:
+                The rescaled values of the connected units.
+            weights list[tensor (num_connected_units, num_units)]:
+                The weights connecting the layers.
+            buffers (SamplingBuffers): preallocated buffers for the layer.
+            out (tensor (num_samples, num_units)): the output tensor.
+            beta (tensor (num_samples, 1), optional):
+                Inverse temperatures.
+
+        Returns:
+            None
+
+        """
+        out[:] = self.conditional_sample(scaled_units, weights, beta)
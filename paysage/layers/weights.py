@@ -5,6 +5,7 @@ import pandas
 from .. import penalties
 from .. import constraints
 from .. import backends as be
+from ..profiler import timed
 
 
 def weights_from_config(config):
@@ -48,6 +49,8 @@ class Weights(object):
         # these attributes are immutable (their keys don't change)
         self.shape = shape
         self.params = ParamsWeights(be.zeros(shape))
+        # counts the changes to the params, used to invalidate cached copies
+        self.version = 0
 
         # these attributes are mutable (their keys do change)
         self.penalties = OrderedDict()
@@ -104,6 +107,7 @@ class Weights(object):
 
         Notes:
             Modifies layer.params in place.
+            Increments layer.version.
 
         Args:
             new_params (namedtuple)
@@ -114,6 +118,7 @@ class Weights(object):
         """
         for i in self._get_trainable_indices():
             self.params[i][:] = new_params[i]
+        self.version += 1
 
     def get_param_names(self):
         """
@@ -209,6 +214,7 @@ class Weights(object):
                 store.get(os.path.join(key, 'parameters', 'key'+str(i))).as_matrix()
             )) # collapse trivial dimensions to a vector
         self.params = self.params.__class__(*params)
+        self.version += 1
 
     def add_constraint(self, constraint):
         """
@@ -226,6 +232,7 @@ class Weights(object):
         """
         self.constraints.update(constraint)
 
+    @timed('constraints')
     def enforce_constraints(self):
         """
         Apply the contraints to the layer parameters.
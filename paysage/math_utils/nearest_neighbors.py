@@ -1,5 +1,8 @@
 from paysage import backends as be
 
+# the default maximum number of pairwise distances held in memory at once
+MAX_DISTANCES = 2**24
+
 def pdist(x: be.Tensor, y: be.Tensor) -> be.Tensor:
     """
     Compute the pairwise distance matrix between the rows of x and y.
@@ -18,67 +21,130 @@ def pdist(x: be.Tensor, y: be.Tensor) -> be.Tensor:
     squared = be.add(be.unsqueeze(y_mag, axis=0), be.add(be.unsqueeze(x_mag, axis=1), -2*inner))
     return be.sqrt(be.clip(squared, a_min=0))
 
-def find_k_nearest_neighbors(x: be.Tensor, y: be.Tensor, k: int, callbacks=None) \
+def _k_smallest_distances(x: be.Tensor, y: be.Tensor, k: int,
+                          max_distances: int = MAX_DISTANCES) \
+                          -> be.Tuple[be.Tensor, be.Tensor]:
+    """
+    For each row in x, find the k nearest rows in y.
+
+    Notes:
+        The distances are computed for blocks of rows of y so that at most
+        about max_distances pairwise distances are held in memory.
+        A running set of the k nearest rows is merged with each block
+        using a selection of the kth smallest distance rather than a sort.
+        Ties are broken in favor of the smaller index in y.
+
+    Args:
+        x (tensor (num_samples_x, num_units))
+        y (tensor (num_samples_y, num_units))
+        k (int > 0)
+        max_distances (int > 0): the number of distances to compute at once
+
+    Returns:
+        indices (long_tensor (num_samples_x, k)),
+        distances (float_tensor (num_samples_x, k)),
+        ordered by index in y (not by distance)
+
+    """
+    num_x = len(x)
+    num_y = len(y)
+    chunk_size = max(k, max_distances // max(1, num_x))
+
+    neighbors = None
+    neighbor_dist = None
+    for start in range(0, num_y, chunk_size):
+        stop = min(num_y, start + chunk_size)
+        dist = pdist(x, y[start:stop])
+        index = be.broadcast(be.trange(start, stop, dtype=be.Long), dist)
+
+        # the columns stay ordered by index in y
+        if neighbors is not None:
+            dist = be.hstack([neighbor_dist, dist])
+            index = be.hstack([neighbors, index])
+
+        num_kept = min(k, be.shape(dist)[1])
+        threshold = be.unsqueeze(be.kth_smallest(dist, num_kept, axis=1), axis=1)
+        below = be.lesser(dist, threshold)
+        tied = be.equal(dist, threshold)
+
+        # keep the tied distances with the smallest indices
+        num_tied = num_kept - be.tsum(be.cast_float(below), axis=1, keepdims=True)
+        keep = be.logical_or(below, be.logical_and(tied,
+            be.lesser_equal(be.cumsum(be.cast_float(tied), axis=1), num_tied)))
+
+        neighbor_dist = be.reshape(dist[keep], (num_x, num_kept))
+        neighbors = be.reshape(index[keep], (num_x, num_kept))
+
+    return neighbors, neighbor_dist
+
+def find_k_nearest_neighbors(x: be.Tensor, y: be.Tensor, k: int, callbacks=None,
+                             max_distances: int = MAX_DISTANCES) \
                                     -> be.Tuple[be.Tensor, be.Tensor]:
     """
     For each row in x, find the kth nearest row in y.
     The algorithm actually computes all K <= k neighbors.
     Callbacks can be used to learn from this sequence.
 
+    Notes:
+        The distances are computed in memory-bounded blocks of rows of y,
+        see max_distances.
+
     Args:
         x (tensor (num_samples_x, num_units))
         y (tensor (num_samples_y, num_units))
         k (int > 0)
         callbacks (optional; List[callable]): a list of functions with signature
             func(neighbor_indices, neighbor_distances) -> None
+        max_distances (optional; int > 0): the maximum number of pairwise
+            distances to compute at once
 
     Returns:
         indices (long_tensor (num_samples_x,)),
         distances (float_tensor (num_samples_x))
 
     """
-    index = be.trange(0, len(x), dtype=be.Long)
-    dist = pdist(x, y)
-    max_dist = be.tmax(dist)
-    for _ in range(k):
-        neighbors = be.argmin(dist, axis=1)
-        neighbor_dist = dist[index, neighbors]
-        dist[index, neighbors] = max_dist
-        if callbacks is not None:
-            for func in callbacks:
-                func(neighbors, neighbor_dist)
-    return neighbors, neighbor_dist
+    neighbors, neighbor_dist = find_nearest_neighbors(x, y, k, callbacks,
+                                                      max_distances)
+    return neighbors[-1], neighbor_dist[-1]
 
-def find_nearest_neighbors(x: be.Tensor, y: be.Tensor, k: int, callbacks=None) \
+def find_nearest_neighbors(x: be.Tensor, y: be.Tensor, k: int, callbacks=None,
+                           max_distances: int = MAX_DISTANCES) \
                                 -> be.Tuple[be.Tensor, be.Tensor]:
     """
     For each row in x, find the nearest row in y for each j <= k
     The algorithm actually computes all K <= k neighbors.
     Callbacks can be used to learn from this sequence.
 
+    Notes:
+        The distances are computed in memory-bounded blocks of rows of y,
+        see max_distances.
+
     Args:
         x (tensor (num_samples_x, num_units))
         y (tensor (num_samples_y, num_units))
         k (int > 0)
         callbacks (optional; List[callable]): a list of functions with signature
             func(neighbor_indices, neighbor_distances) -> None
+        max_distances (optional; int > 0): the maximum number of pairwise
+            distances to compute at once
 
     Returns:
         indices long_tensor (j, num_samples_x),
         distances float_tensor (j, num_samples_x)
 
     """
+    candidates, candidate_dist = _k_smallest_distances(x, y, k, max_distances)
     index = be.trange(0, len(x), dtype=be.Long)
-    dist = pdist(x, y)
-    max_dist = be.tmax(dist)
-    #NOTE: big memory allocation here
+
+    # order the k candidates by distance, breaking ties by index
     num_samples = len(x)
     neighbor_dist = be.zeros((k, num_samples))
     neighbors = be.zeros((k, num_samples), dtype=be.Long)
     for j in range(k):
-        neighbors[j,:] = be.argmin(dist, axis=1)
-        neighbor_dist[j,:] = dist[index, neighbors[j,:]]
-        dist[index, neighbors[j,:]] = max_dist
+        nearest = be.argmin(candidate_dist, axis=1)
+        neighbors[j,:] = candidates[index, nearest]
+        neighbor_dist[j,:] = candidate_dist[index, nearest]
+        candidate_dist[index, nearest] = float("inf")
         if callbacks is not None:
             for func in callbacks:
                 func(neighbors[j,:], neighbor_dist[j,:])
@@ -2,6 +2,7 @@ from math import sqrt, log
 
 from .. import math_utils
 from .. import backends as be
+from .. import samplers
 
 # ----- CLASSES ----- #
 
@@ -174,7 +175,8 @@ class KLDivergence(object):
     We provide the option to remove dependence on dimension, true by default.
 
     """
-    def __init__(self, k=5, name='KLDivergence', divide_dimension=True):
+    def __init__(self, k=5, name='KLDivergence', divide_dimension=True,
+                 max_distances=math_utils.MAX_DISTANCES):
         """
         Create KLDivergence object.
 
@@ -183,6 +185,8 @@ class KLDivergence(object):
             name (str; optional): metric name
             divide_dimension (bool; optional): whether to divide the divergence
                 by the number of dimensions
+            max_distances (int; optional): the maximum number of pairwise
+                distances to hold in memory for the nearest neighbor search
 
         Returns:
             KLDivergence object
@@ -192,6 +196,7 @@ class KLDivergence(object):
         self.k = k
         self.name = name
         self.divide_dim = divide_dimension
+        self.max_distances = max_distances
 
     def reset(self) -> None:
         """
@@ -207,7 +212,8 @@ class KLDivergence(object):
         self.calc.reset()
 
     @classmethod
-    def klpq(cls, x, y, k, divide_dim):
+    def klpq(cls, x, y, k, divide_dim,
+             max_distances=math_utils.MAX_DISTANCES):
         """
         Compute the forward KL divergence.
 
@@ -215,6 +221,8 @@ class KLDivergence(object):
             x (tensor ~ (num_samples_x, num_units))
             y (tensor ~ (num_samples_y, num_units))
             k (int)
+            divide_dim (bool)
+            max_distances (int; optional)
 
         Returns:
             float
@@ -223,8 +231,10 @@ class KLDivergence(object):
         n = len(x)
         m = len(y)
 
-        _, x_dist = math_utils.find_k_nearest_neighbors(x, x, k+1)
-        _, y_dist = math_utils.find_k_nearest_neighbors(x, y, k)
+        _, x_dist = math_utils.find_k_nearest_neighbors(x, x, k+1,
+                                        max_distances=max_distances)
+        _, y_dist = math_utils.find_k_nearest_neighbors(x, y, k,
+                                        max_distances=max_distances)
 
         be.clip_(x_dist, a_min = be.EPSILON)
         be.clip_(y_dist, a_min = be.EPSILON)
@@ -249,7 +259,7 @@ class KLDivergence(object):
 
         """
         klpq = self.klpq(assessment.data_state[0], assessment.model_state[0],
-                         self.k, self.divide_dim)
+                         self.k, self.divide_dim, self.max_distances)
         self.calc.update(be.float_tensor([klpq]))
 
     def value(self) -> float:
@@ -283,7 +293,8 @@ class ReverseKLDivergence(object):
 
     We provide the option to divide out the dimension.
     """
-    def __init__(self, k=5, name='ReverseKLDivergence', divide_dimension=True):
+    def __init__(self, k=5, name='ReverseKLDivergence', divide_dimension=True,
+                 max_distances=math_utils.MAX_DISTANCES):
         """
         Create ReverseKLDivergence object.
 
@@ -292,6 +303,8 @@ class ReverseKLDivergence(object):
             name (str; optional): metric name
             divide_dimension (bool; optional): whether to divide the divergence
                 by the number of dimensions
+            max_distances (int; optional): the maximum number of pairwise
+                distances to hold in memory for the nearest neighbor search
 
         Returns:
             ReverseKLDivergence object
@@ -301,6 +314,7 @@ class ReverseKLDivergence(object):
         self.k = k
         self.name = name
         self.divide_dim = divide_dimension
+        self.max_distances = max_distances
 
     def reset(self) -> None:
         """
@@ -316,7 +330,8 @@ class ReverseKLDivergence(object):
         self.calc.reset()
 
     @classmethod
-    def klqp(cls, y, x, k, divide_dim):
+    def klqp(cls, y, x, k, divide_dim,
+             max_distances=math_utils.MAX_DISTANCES):
         """
         Compute the KL divergence.
 
@@ -331,8 +346,10 @@ class ReverseKLDivergence(object):
         n = len(x)
         m = len(y)
 
-        _, x_dist = math_utils.find_k_nearest_neighbors(x, x, k+1)
-        _, y_dist = math_utils.find_k_nearest_neighbors(x, y, k)
+        _, x_dist = math_utils.find_k_nearest_neighbors(x, x, k+1,
+                                        max_distances=max_distances)
+        _, y_dist = math_utils.find_k_nearest_neighbors(x, y, k,
+                                        max_distances=max_distances)
 
         be.clip_(x_dist, a_min = be.EPSILON)
         be.clip_(y_dist, a_min = be.EPSILON)
@@ -358,7 +375,7 @@ class ReverseKLDivergence(object):
 
         """
         klqp = self.klqp(assessment.data_state[0], assessment.model_state[0],
-                        self.k, self.divide_dim)
+                        self.k, self.divide_dim, self.max_distances)
         self.calc.update(be.float_tensor([klqp]))
 
     def value(self) -> float:
@@ -392,7 +409,8 @@ class JensenShannonDivergence(object):
 
     We provide the option to divide out by the dimension of the dataset.
     """
-    def __init__(self, k=5, name='JensenShannonDivergence', divide_dimension=True):
+    def __init__(self, k=5, name='JensenShannonDivergence', divide_dimension=True,
+                 max_distances=math_utils.MAX_DISTANCES):
         """
         Create JensenShannonKLDivergence object.
 
@@ -401,6 +419,8 @@ class JensenShannonDivergence(object):
             name (str; optional): metric name
             divide_dimension (bool; optional): whether to divide the divergence
                 by the number of dimensions
+            max_distances (int; optional): the maximum number of pairwise
+                distances to hold in memory for the nearest neighbor search
 
         Returns:
             JensenShannonDivergence object
@@ -410,6 +430,7 @@ class JensenShannonDivergence(object):
         self.k = k
         self.name = name
         self.divide_dim = divide_dimension
+        self.max_distances = max_distances
 
     def reset(self) -> None:
         """
@@ -445,8 +466,10 @@ class JensenShannonDivergence(object):
         else:
             d = be.shape(x)[1] # the dimension of the space
 
-        _, x_dist = math_utils.find_k_nearest_neighbors(x, x, self.k+1)
-        _, y_dist = math_utils.find_k_nearest_neighbors(x, y, self.k)
+        _, x_dist = math_utils.find_k_nearest_neighbors(x, x, self.k+1,
+                                        max_distances=self.max_distances)
+        _, y_dist = math_utils.find_k_nearest_neighbors(x, y, self.k,
+                                        max_distances=self.max_distances)
 
         be.clip_(x_dist, a_min = be.EPSILON)
         be.clip_(y_dist, a_min = be.EPSILON)
@@ -458,8 +481,10 @@ class JensenShannonDivergence(object):
 
         n = len(y)
         m = len(x)
-        _, x_dist = math_utils.find_k_nearest_neighbors(y, y, self.k+1)
-        _, y_dist = math_utils.find_k_nearest_neighbors(y, x, self.k)
+        _, x_dist = math_utils.find_k_nearest_neighbors(y, y, self.k+1,
+                                        max_distances=self.max_distances)
+        _, y_dist = math_utils.find_k_nearest_neighbors(y, x, self.k,
+                                        max_distances=self.max_distances)
 
         be.clip_(x_dist, a_min = be.EPSILON)
         be.clip_(y_dist, a_min = be.EPSILON)
@@ -858,6 +883,9 @@ class TAPFreeEnergy(object):
         """
         Update the estimate for the TAP free energy.
 
+        Notes:
+            The minimizations from all of the random seeds are run together.
+
         Args:
             assessment (ModelAssessment): uses model
 
@@ -865,9 +893,8 @@ class TAPFreeEnergy(object):
             None
 
         """
-        for _ in range(self.num_samples):
-            _, fe = assessment.model.compute_StateTAP()
-            self.calc.update(be.float_tensor([fe]))
+        _, fe = assessment.model.compute_StateTAP(num_seeds=self.num_samples)
+        self.calc.update(fe)
 
     def value(self) -> float:
         """
@@ -931,15 +958,14 @@ class TAPLogLikelihood(object):
         state = assessment.data_state
         rbm = assessment.model
         stepsize = be.shape(state[0])[0]
-        for _ in range(self.num_samples):
-            _, TAP_fe = rbm.compute_StateTAP()
-            vis = -be.tsum(rbm.layers[0].energy(state[0]))
-            c_params = rbm.layers[1].conditional_params(
-                rbm._connected_rescaled_units(1, state),
-                rbm._connected_weights(1))
-            marginal_fe = vis + be.tsum(
-                 rbm.layers[1].log_partition_function(c_params, be.zeros_like(c_params)))
-            self.calc.update(be.float_tensor([TAP_fe + marginal_fe/stepsize]))
+        _, TAP_fe = rbm.compute_StateTAP(num_seeds=self.num_samples)
+        vis = -be.tsum(rbm.layers[0].energy(state[0]))
+        c_params = rbm.layers[1].conditional_params(
+            rbm._connected_rescaled_units(1, state),
+            rbm._connected_weights(1))
+        marginal_fe = vis + be.tsum(
+             rbm.layers[1].log_partition_function(c_params, be.zeros_like(c_params)))
+        self.calc.update(TAP_fe + marginal_fe/stepsize)
 
     def value(self) -> float:
         """
@@ -955,3 +981,178 @@ class TAPLogLikelihood(object):
         if self.calc.num:
             return self.calc.mean
         return None
+
+
+class ExactLogLikelihood(object):
+    """
+    Compute the exact log likelihood of the data for a small two-layer model
+    of Bernoulli layers by enumerating the states of one of the layers.
+    Useful as a ground truth for the TAP estimates.
+
+    """
+    def __init__(self, name='ExactLogLikelihood', index=None,
+                 max_elements=2**22, num_workers=0):
+        """
+        Create ExactLogLikelihood object.
+
+        Args:
+            name (str; optional): metric name
+            index (int; optional): the index of the layer to enumerate.
+                If None, the layer with the fewest units is chosen.
+            max_elements (int; optional): the largest number of elements in
+                the tensors of an enumeration chunk.
+            num_workers (int; optional): the number of worker processes
+                used for the enumeration.
+
+        Returns:
+            None
+
+        """
+        self.calc = math_utils.MeanCalculator()
+        self.index = index
+        self.max_elements = max_elements
+        self.num_workers = num_workers
+        self.log_Z = None
+        self.name = name
+
+    def reset(self) -> None:
+        """
+        Reset the metric to its initial state.
+
+        Notes:
+            The log partition function is recomputed on the next update.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        self.calc.reset()
+        self.log_Z = None
+
+    def update(self, assessment) -> None:
+        """
+        Update the estimate for the average log likelihood of the data.
+
+        Notes:
+            The log partition function is computed on the first update after
+            a reset and is stored in the log_Z attribute.
+
+        Args:
+            assessment (ModelAssessment): uses model and data_state
+
+        Returns:
+            None
+
+        """
+        rbm = assessment.model
+        if self.log_Z is None:
+            self.log_Z = rbm.exact_log_partition_function(
+                index=self.index, max_elements=self.max_elements,
+                num_workers=self.num_workers)
+        self.calc.update(rbm.exact_log_likelihood(
+            assessment.data_state.get_visible(), log_Z=self.log_Z))
+
+    def value(self) -> float:
+        """
+        Get the average exact log likelihood.
+
+        Args:
+            None
+
+        Returns:
+            the average log likelihood (float)
+
+        """
+        if self.calc.num:
+            return self.calc.mean
+        return None
+
+
+class AISLogLikelihood(object):
+    """
+    Compute the log likelihood of the data for a two-layer model of
+    Bernoulli layers using an annealed importance sampling estimate of
+    the log partition function.
+
+    """
+    def __init__(self, name='AISLogLikelihood', num_chains=1000,
+                 num_steps=1000, schedule=None, chunk_size=None):
+        """
+        Create AISLogLikelihood object.
+
+        Args:
+            name (str; optional): metric name
+            num_chains (int; optional): the number of annealing chains
+            num_steps (int; optional): the number of annealing steps
+            schedule (Schedule; optional): the schedule of the inverse
+                temperatures
+            chunk_size (int; optional): the largest number of chains to
+                run at once
+
+        Returns:
+            None
+
+        """
+        self.calc = math_utils.MeanCalculator()
+        self.num_chains = num_chains
+        self.num_steps = num_steps
+        self.schedule = schedule
+        self.chunk_size = chunk_size
+        self.log_Z = None
+        self.name = name
+
+    def reset(self) -> None:
+        """
+        Reset the metric to its initial state.
+
+        Notes:
+            The log partition function is re-estimated on the next update.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        self.calc.reset()
+        self.log_Z = None
+
+    def update(self, assessment) -> None:
+        """
+        Update the estimate for the average log likelihood of the data.
+
+        Notes:
+            The log partition function is estimated on the first update after
+            a reset and is stored in the log_Z attribute.
+
+        Args:
+            assessment (ModelAssessment): uses model and data_state
+
+        Returns:
+            None
+
+        """
+        rbm = assessment.model
+        if self.log_Z is None:
+            self.log_Z = samplers.AnnealedImportanceSampler(
+                rbm, num_chains=self.num_chains, num_steps=self.num_steps,
+                schedule=self.schedule, chunk_size=self.chunk_size).run()
+        self.calc.update(
+            rbm.log_marginal(0, assessment.data_state.get_visible()) - self.log_Z)
+
+    def value(self) -> float:
+        """
+        Get the average AIS log likelihood.
+
+        Args:
+            None
+
+        Returns:
+            the average log likelihood (float)
+
+        """
+        if self.calc.num:
+            return self.calc.mean
+        return None
@@ -9,29 +9,37 @@ from ..models.state import State
 class ModelAssessment(object):
 
     def __init__(self, data, model, fantasy_steps=10,
-                 num_fantasy_particles=None, beta_std=0):
+                 num_fantasy_particles=None, beta_std=0, model_state=None):
         """
         Create a ModelAssessment object.
 
+        Notes:
+            If a model_state is provided, it is used as the fantasy particles
+            and no new particles are generated.
+
         Args:
             data (tensor ~ (num_samples, num_units))
             model (BoltzmannMachine)
             fantasy_steps (int; optional)
             num_fantasy_particles (int; optional)
             beta_std (float; optional)
+            model_state (State; optional): precomputed fantasy particles
 
         """
         self.model = model
 
         self.data_state = State.from_visible(data, model)
 
-        # generate some fantasy particles from the model
-        npart = self.data_state.batch_size() if num_fantasy_particles is None \
-        else num_fantasy_particles
-        self.model_state = SequentialMC.generate_fantasy_state(model,
-                                                               npart,
-                                                               fantasy_steps,
-                                                               beta_std=beta_std)
+        if model_state is not None:
+            self.model_state = model_state
+        else:
+            # generate some fantasy particles from the model
+            npart = self.data_state.batch_size() if num_fantasy_particles is None \
+            else num_fantasy_particles
+            self.model_state = SequentialMC.generate_fantasy_state(model,
+                                                                   npart,
+                                                                   fantasy_steps,
+                                                                   beta_std=beta_std)
 
         # compute reconstructions
         self.reconstructions = model.compute_reconstructions(data)
@@ -8,6 +8,8 @@ from . import plotting
 from .model_assessment import ModelAssessment
 
 from .. import backends as be
+from ..samplers import SequentialMC
+from ..models.state import State
 
 class ProgressMonitor(object):
     """
@@ -21,13 +23,27 @@ class ProgressMonitor(object):
                                             M.WeightSparsity(),
                                             M.WeightSquare(),
                                             M.KLDivergence(),
-                                            M.ReverseKLDivergence()]
-                 ):
+                                            M.ReverseKLDivergence()],
+                 fantasy_pool_size=None, fantasy_pool_steps=None):
         """
         Create a progress monitor.
 
+        Notes:
+            By default, a new set of fantasy particles is generated from
+            scratch for every validation minibatch.
+            If fantasy_pool_size is set, a single pool of fantasy particles
+            is kept for the lifetime of the monitor. The pool is advanced
+            once per epoch and sliced across the validation minibatches, so
+            the cost of monitoring does not grow with the size of the
+            validation set.
+
         Args:
             metrics (list[metric object]): list of metrics objects to compute with
+            fantasy_pool_size (int; optional): the number of particles in the
+                shared fantasy pool. If None, no pool is used.
+            fantasy_pool_steps (int; optional): the number of Monte Carlo steps
+                used to advance the pool each epoch. If None, the fantasy_steps
+                passed to epoch_update is used.
 
         Returns:
             ProgressMonitor
@@ -35,6 +51,11 @@ class ProgressMonitor(object):
         """
         self.generator_metrics = generator_metrics
 
+        self.fantasy_pool_size = fantasy_pool_size
+        self.fantasy_pool_steps = fantasy_pool_steps
+        self.fantasy_pool = None
+        self.fantasy_pool_position = 0
+
         self.metdict = {}
         self.memory = []
         self.save_conditions = []
@@ -57,6 +78,72 @@ class ProgressMonitor(object):
             metric.reset()
 
 
+    def reset_fantasy_pool(self):
+        """
+        Discard the shared pool of fantasy particles.
+
+        Notes:
+            Modifies the fantasy_pool attribute in place!
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        self.fantasy_pool = None
+        self.fantasy_pool_position = 0
+
+    def update_fantasy_pool(self, generator, fantasy_steps=10):
+        """
+        Advance the shared pool of fantasy particles.
+
+        Notes:
+            Modifies the fantasy_pool attribute in place!
+            The pool is created from the model envelope on the first call
+            (or if the generator changes) and is advanced from its previous
+            state afterwards.
+
+        Args:
+            generator (paysage.models model): generative model
+            fantasy_steps (int): the number of Monte Carlo steps to use if
+                fantasy_pool_steps is None
+
+        Returns:
+            None
+
+        """
+        steps = fantasy_steps if self.fantasy_pool_steps is None \
+            else self.fantasy_pool_steps
+        if self.fantasy_pool is None or self.fantasy_pool.model is not generator:
+            self.fantasy_pool = SequentialMC.from_model(generator,
+                                                        self.fantasy_pool_size,
+                                                        beta_std=0)
+        self.fantasy_pool.update_state(steps)
+        self.fantasy_pool_position = 0
+
+    def get_fantasy_particles(self, num_samples):
+        """
+        Get the next slice of particles from the shared fantasy pool.
+
+        Notes:
+            Modifies the fantasy_pool_position attribute in place!
+            The slices wrap around the end of the pool.
+
+        Args:
+            num_samples (int): the number of fantasy particles
+
+        Returns:
+            State
+
+        """
+        size = self.fantasy_pool_size
+        start = self.fantasy_pool_position
+        index = be.long_tensor([(start + i) % size for i in range(num_samples)])
+        self.fantasy_pool_position = (start + num_samples) % size
+        return State.from_state(self.fantasy_pool.state, index)
+
     def batch_update(self, assessment):
         """
         Update the metrics on a batch.
@@ -114,6 +201,7 @@ class ProgressMonitor(object):
             batch (paysage.batch object): data batcher
             generator (paysage.models model): generative model
             fantasy_steps (int): num steps to sample generator for fantasy particles
+                (or to advance the shared fantasy pool, if there is one)
             store (bool): if true, store the metrics in a list
                 and check if the model should be saved
             show (bool): if true, print the metrics to the screen
@@ -124,6 +212,10 @@ class ProgressMonitor(object):
             metdict (dict): an ordered dictionary with the metrics
 
         """
+        use_pool = self.fantasy_pool_size is not None
+        if use_pool:
+            self.update_fantasy_pool(generator, fantasy_steps)
+
         # update the generator and classifier metrics
         batch.reset_generator(mode='validate')
         while True:
@@ -132,8 +224,14 @@ class ProgressMonitor(object):
             except StopIteration:
                 break
 
+            if use_pool:
+                model_state = self.get_fantasy_particles(be.shape(v_data)[0])
+            else:
+                model_state = None
+
             assessment = ModelAssessment(v_data, generator,
-                                         fantasy_steps=fantasy_steps)
+                                         fantasy_steps=fantasy_steps,
+                                         model_state=model_state)
 
             self.batch_update(assessment)
 
@@ -1,4 +1,6 @@
 import os, pandas, operator
+import numpy
+from concurrent.futures import ProcessPoolExecutor
 from cytoolz import partial
 from typing import List
 
@@ -8,6 +10,12 @@ from . import initialize as init
 from . import gradient_util as gu
 from . import graph as mg
 from . import state as ms
+from ..profiler import timed
+
+# the largest number of units that can be enumerated exactly
+MAX_ENUMERATED_UNITS = 32
+# the largest number of elements in the tensors of an enumeration chunk
+MAX_ENUMERATION_ELEMENTS = 2**22
 
 class BoltzmannMachine(object):
     """
@@ -40,6 +48,9 @@ class BoltzmannMachine(object):
         self.num_layers = len(self.layers)
         self.clamped_sampling = []
         self.multipliers = [None for _ in range(self.num_layers)]
+        self._sampling_plan = None
+        self._rescaled_weights = None
+        self.flat_params = None
 
         # set the weights
         self.connections = conn_list if conn_list is not None else self._default_connections()
@@ -185,15 +196,37 @@ class BoltzmannMachine(object):
         # create the model from the config
         config = store.get_storer('model').attrs.config
         model = cls.from_config(config)
+        model.load(store)
+        return model
+
+    def load(self, store: pandas.HDFStore) -> None:
+        """
+        Load the parameters of a saved model from an open HDFStore.
+
+        Notes:
+            Performs an IO operation.
+            Modifies the parameters of the model in place.
+            The saved model must have the same structure as this one.
+            If the model uses flat parameters, the loaded parameters are
+            copied into the existing flat vector.
+
+        Args:
+            store (pandas.HDFStore)
+
+        Returns:
+            None
+
+        """
         # load the layer parameters
-        for i in range(len(model.layers)):
+        for i in range(len(self.layers)):
             key = os.path.join('layers', 'layers_'+str(i))
-            model.layers[i].load_params(store, key)
+            self.layers[i].load_params(store, key)
         # load the weights
-        for i in range(len(model.connections)):
+        for i in range(len(self.connections)):
             key = os.path.join('connections', 'weights_'+str(i))
-            model.connections[i].weights.load_params(store, key)
-        return model
+            self.connections[i].weights.load_params(store, key)
+        if self.flat_params is not None:
+            self.use_flat_parameters(self.flat_params.vector)
 
     def copy(self):
         """
@@ -347,36 +380,136 @@ class BoltzmannMachine(object):
         for conn in self.connections:
             conn.weights.enforce_constraints()
 
-    def _alternating_update_(self, func_name: str, state: ms.State, beta=None) -> None:
+    def get_sampling_plan(self) -> mg.SamplingPlan:
+        """
+        Get the plan used for Gibbs sweeps through the model.
+
+        Notes:
+            The plan is rebuilt if the connections of the model change.
+            It does not depend on the values of the parameters.
+
+        Args:
+            None
+
+        Returns:
+            SamplingPlan
+
+        """
+        if self._sampling_plan is None or \
+            not self._sampling_plan.is_current(self.connections):
+            self._sampling_plan = mg.SamplingPlan(self.layers, self.connections)
+        return self._sampling_plan
+
+    def get_sampling_buffers(self, num_samples: int) -> List:
+        """
+        Allocate the buffers used for in-place sampling.
+
+        Args:
+            num_samples (int): the number of samples in a batch
+
+        Returns:
+            List[SamplingBuffers]: the sampling buffers of each layer
+
+        """
+        return [layer.get_sampling_buffers(num_samples) for layer in self.layers]
+
+    def _rescale_state_(self, state: ms.State, buffers: List) -> None:
+        """
+        Store the rescaled units of every layer in the sampling buffers.
+
+        Notes:
+            Modifies buffers[i].rescaled in place.
+
+        Args:
+            state (State object): the state of each layer
+            buffers (List[SamplingBuffers]): the sampling buffers of each layer
+
+        Returns:
+            None
+
+        """
+        for i in range(self.num_layers):
+            self.layers[i].rescale_(state[i], buffers[i].rescaled)
+
+    def _alternating_update_(self, func_name: str, state: ms.State, beta=None,
+                             buffers=None) -> None:
         """
         Performs a single Gibbs sampling update in alternating layers.
 
         Notes:
             Changes state in place.
+            If buffers are provided, the in-place layer function
+            (func_name + '_') writes directly into the tensors of the state
+            and the rescaled units are kept up to date in the buffers.
 
         Args:
             func_name (str, function name): layer function name to apply to the
                 units to sample
             state (State object): the state of each layer
             beta (optional, tensor (batch_size, 1)): Inverse temperatures
+            buffers (optional, List[SamplingBuffers]): the sampling buffers
+                of each layer
 
         Returns:
             None
 
         """
-        # define even and odd sampling sets to alternate between, including
-        # only layers that can be sampled
-        (odd_layers, even_layers) = (range(1, self.num_layers, 2),
-                                     range(0, self.num_layers, 2))
-        layer_order = [i for i in list(odd_layers) + list(even_layers)
-                       if i in self.get_sampled()]
+        plan = self.get_sampling_plan()
 
-        for i in layer_order:
-            func = getattr(self.layers[i], func_name)
-            state[i] = func(
-                self._connected_rescaled_units(i, state),
-                self._connected_weights(i),
-                beta=beta)
+        if buffers is None:
+            for i in plan.layer_schedule(self.clamped_sampling):
+                func = getattr(self.layers[i], func_name)
+                units = [be.maybe_a(self.multipliers[j] if m else None,
+                                    self.layers[j].rescale(state[j]),
+                                    operator.mul)
+                         for j, m in zip(plan.connected_indices[i],
+                                         plan.multiplied[i])]
+                state[i] = func(units, plan.connected_weights(i), beta=beta)
+        else:
+            for i in plan.layer_schedule(self.clamped_sampling):
+                func = getattr(self.layers[i], func_name + '_')
+                units = [be.maybe_a(self.multipliers[j] if m else None,
+                                    buffers[j].rescaled,
+                                    operator.mul)
+                         for j, m in zip(plan.connected_indices[i],
+                                         plan.multiplied[i])]
+                func(units, plan.connected_weights(i), buffers[i], state[i],
+                     beta=beta)
+                self.layers[i].rescale_(state[i], buffers[i].rescaled)
+
+    def _iterate_(self, func_name: str, n: int, state: ms.State, beta=None,
+                  callbacks=None, buffers=None) -> None:
+        """
+        Perform multiple in-place updates in alternating layers.
+
+        Notes:
+            Changes state in place.
+            The buffers are allocated once if they are not provided.
+
+        Args:
+            func_name (str, function name): layer function name to apply to the
+                units to sample
+            n (int): number of steps.
+            state (State object): the state of each layer
+            beta (optional, tensor (batch_size, 1)): Inverse temperatures
+            callbacks(optional, List[callable]): list of functions to call
+                at each step; signature func(State)
+            buffers (optional, List[SamplingBuffers]): the sampling buffers
+                of each layer
+
+        Returns:
+            None
+
+        """
+        if buffers is None:
+            buffers = self.get_sampling_buffers(state.batch_size())
+        self._rescale_state_(state, buffers)
+        for _ in range(n):
+            self._alternating_update_(func_name, state, beta=beta,
+                                      buffers=buffers)
+            if callbacks is not None:
+                for func in callbacks:
+                    func(state)
 
     def markov_chain(self, n: int, state: ms.State, beta=None,
                      callbacks=None) -> ms.State:
@@ -469,6 +602,90 @@ class BoltzmannMachine(object):
                     func(new_state)
         return new_state
 
+    def markov_chain_(self, n: int, state: ms.State, beta=None,
+                      callbacks=None, buffers=None) -> None:
+        """
+        Perform multiple Gibbs sampling steps in alternating layers
+        without allocating new tensors.
+
+        Notes:
+            Changes state in place.
+            Samples layers according to the conditional probability
+            on adjacent layers,
+            x_i ~ P(x_i | x_(i-1), x_(i+1) )
+
+        Args:
+            n (int): number of steps.
+            state (State object): the state of each layer
+            beta (optional, tensor (batch_size, 1)): Inverse temperatures
+            callbacks(optional, List[callable]): list of functions to call
+                at each step; signature func(State)
+            buffers (optional, List[SamplingBuffers]): preallocated buffers
+                from get_sampling_buffers
+
+        Returns:
+            None
+
+        """
+        self._iterate_('conditional_sample', n, state, beta=beta,
+                       callbacks=callbacks, buffers=buffers)
+
+    def mean_field_iteration_(self, n: int, state: ms.State, beta=None,
+                              callbacks=None, buffers=None) -> None:
+        """
+        Perform multiple mean-field updates in alternating layers
+        without allocating new tensors.
+
+        Notes:
+            Changes state in place.
+            Sets the expectation of layer units
+            conditioned on adjacent layers,
+            x_i = E[x_i | x_(i-1), x_(i+1) ]
+
+        Args:
+            n (int): number of steps.
+            state (State object): the state of each layer
+            beta (optional, tensor (batch_size, 1)): Inverse temperatures
+            callbacks (optional, List[callable]): list of functions to call
+                at each step; signature func(State)
+            buffers (optional, List[SamplingBuffers]): preallocated buffers
+                from get_sampling_buffers
+
+        Returns:
+            None
+
+        """
+        self._iterate_('conditional_mean', n, state, beta=beta,
+                       callbacks=callbacks, buffers=buffers)
+
+    def deterministic_iteration_(self, n: int, state: ms.State, beta=None,
+                                 callbacks=None, buffers=None) -> None:
+        """
+        Perform multiple deterministic (maximum probability) updates
+        in alternating layers without allocating new tensors.
+
+        Notes:
+            Changes state in place.
+            Sets the layer units that maximize the probability
+            conditioned on adjacent layers,
+            x_i = argmax P(x_i | x_(i-1), x_(i+1))
+
+        Args:
+            n (int): number of steps.
+            state (State object): the state of each layer
+            beta (optional, tensor (batch_size, 1)): Inverse temperatures
+            callbacks (optional, List[callable]): list of functions to call
+                at each step; signature func(State)
+            buffers (optional, List[SamplingBuffers]): preallocated buffers
+                from get_sampling_buffers
+
+        Returns:
+            None
+
+        """
+        self._iterate_('conditional_mode', n, state, beta=beta,
+                       callbacks=callbacks, buffers=buffers)
+
     def compute_reconstructions(self, visible, method='markov_chain'):
         """
         Compute the reconstructions of a visible tensor.
@@ -555,8 +772,73 @@ class BoltzmannMachine(object):
                                  weighting_function=data_weighting_function)
         self.exclusive_gradient_(grad, model_state, be.subtract, penalize=False,
                                  weighting_function=model_weighting_function)
+        if self.flat_params is not None:
+            return gu.FlatGradient.from_gradient(grad, self.flat_params.layout)
         return grad
 
+    def use_flat_parameters(self, vector=None):
+        """
+        Store all of the model parameters in a single contiguous vector.
+
+        Notes:
+            Modifies the params attributes of the layers and weights in place!
+            The params of each layer and weight are replaced by namedtuples
+            of views into the flat_params.vector attribute.
+            Afterwards, the gradient method returns FlatGradient objects,
+            so that the optimizers and parameter_update operate on a single
+            vector rather than on each tensor separately.
+            Call again after loading parameters from a file.
+
+        Args:
+            vector (optional; tensor (num_parameters,)): a preallocated
+                vector (e.g., in shared memory) to store the parameters in.
+                If None, a new vector is allocated.
+
+        Returns:
+            None
+
+        """
+        params = gu.Gradient(
+            [layer.get_params() for layer in self.layers],
+            [[conn.weights.params] for conn in self.connections]
+            )
+        if vector is None:
+            self.flat_params = gu.FlatGradient.from_gradient(params)
+        else:
+            vector[:] = gu.grad_flatten(params)
+            self.flat_params = gu.FlatGradient(vector,
+                                               gu.grad_apply(be.shape, params))
+        for i in range(self.num_layers):
+            self.layers[i].params = self.flat_params.layers[i][0]
+        for i in range(self.num_connections):
+            self.connections[i].weights.params = self.flat_params.weights[i][0]
+        self.mark_parameters_changed()
+
+    def mark_parameters_changed(self):
+        """
+        Mark the parameters of the model as changed.
+
+        Notes:
+            Increments the versions of the layers and weights, so that the
+            values the model memoizes for the current parameters (e.g., the
+            rescaled weights used by the TAP methods) are recomputed.
+            set_params, parameter_update and load_params do this already.
+            Call it after writing to the parameters directly
+            (e.g., layer.params.loc[:] = ...), or after the parameters
+            were changed by another process through shared memory.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        for layer in self.layers:
+            layer.version += 1
+        for conn in self.connections:
+            conn.weights.version += 1
+
     def parameter_update(self, deltas):
         """
         Update the model parameters.
@@ -571,11 +853,42 @@ class BoltzmannMachine(object):
             None
 
         """
+        if self.flat_params is not None and gu.is_flat(self.flat_params, deltas):
+            self._flat_parameter_update(deltas)
+            return
         for layer_index in range(self.num_layers):
             self.layers[layer_index].parameter_step(deltas.layers[layer_index])
         for conn_index in range(self.num_connections):
             self.connections[conn_index].weights.parameter_step(deltas.weights[conn_index])
 
+    def _flat_parameter_update(self, deltas):
+        """
+        Update the model parameters stored in a single vector.
+
+        Notes:
+            Modifies the model parameters in place.
+            Fixed parameters are restored after the update.
+
+        Args:
+            deltas (FlatGradient)
+
+        Returns:
+            None
+
+        """
+        fixed = [(param, be.copy_tensor(param))
+                 for obj in self.layers + [c.weights for c in self.connections]
+                 for name, param in zip(obj.params._fields, obj.params)
+                 if name in obj.fixed_params]
+        be.subtract_(deltas.vector, self.flat_params.vector)
+        for param, value in fixed:
+            param[:] = value
+        for layer in self.layers:
+            layer.enforce_constraints()
+        for conn in self.connections:
+            conn.weights.enforce_constraints()
+        self.mark_parameters_changed()
+
     def joint_energy(self, state):
         """
         Compute the joint energy of the model based on a state.
@@ -641,6 +954,38 @@ class BoltzmannMachine(object):
                         if i == self.connections[j].target_index]
         return connections
 
+    def _parameter_versions(self):
+        """
+        Helper function to retrieve the versions of the layers and weights.
+
+        Args:
+            None
+
+        Returns:
+            tuple(list[int], list[int]): the layer versions and weight versions
+
+        """
+        return ([layer.version for layer in self.layers],
+                [conn.weights.version for conn in self.connections])
+
+    def _get_reciprocal_scales(self) -> List:
+        """
+        Helper function to retrieve the reciprocal scale of each layer.
+
+        Notes:
+            The scales are memoized along with the rescaled weights
+            and are only recomputed after the parameters change.
+
+        Args:
+            None
+
+        Returns:
+            list[tensor]: the reciprocal scales, one for each layer
+
+        """
+        self._get_rescaled_weights()
+        return self._rescaled_weights[2]
+
     def _get_rescaled_weights(self) -> List:
         """
         Helper function to retrieve a list of weights and a list of squared weights
@@ -649,6 +994,13 @@ class BoltzmannMachine(object):
 
         W_ij |-> W_ij/(s_i*s_j)
 
+        Notes:
+            The result is memoized for the current versions of the layers
+            and weights, so repeated calls at fixed parameters are free.
+            Direct writes to the parameters are not detected; call
+            mark_parameters_changed after them.
+            The returned tensors must not be modified in place.
+
         Args:
             None
 
@@ -656,33 +1008,46 @@ class BoltzmannMachine(object):
             (list[weight tensor], list[weight tensor])
 
         """
-        rescaled_w = []
-        for conn in self.connections:
-            target_scale = self.layers[conn.target_index].reciprocal_scale()
-            domain_scale = self.layers[conn.domain_index].reciprocal_scale()
-            rescaled_w.append(be.multiply(be.multiply(
-                    be.unsqueeze(target_scale, axis=1), conn.weights.W()),
-                    be.unsqueeze(domain_scale, axis=0)))
-        rescaled_w2 = [be.square(w) for w in rescaled_w]
-        return (rescaled_w, rescaled_w2)
+        versions = self._parameter_versions()
+        if self._rescaled_weights is None or \
+            self._rescaled_weights[3] != versions:
+            scales = [layer.reciprocal_scale() for layer in self.layers]
+            rescaled_w = []
+            for conn in self.connections:
+                target_scale = scales[conn.target_index]
+                domain_scale = scales[conn.domain_index]
+                rescaled_w.append(be.multiply(be.multiply(
+                        be.unsqueeze(target_scale, axis=1), conn.weights.W()),
+                        be.unsqueeze(domain_scale, axis=0)))
+            rescaled_w2 = [be.square(w) for w in rescaled_w]
+            self._rescaled_weights = (rescaled_w, rescaled_w2, scales, versions)
+        return self._rescaled_weights[:2]
 
     def gibbs_free_energy(self, cumulants, rescaled_weight_cache=None):
         """
         Gibbs Free Energy (GFE) according to TAP2 appoximation
 
+        Notes:
+            If the cumulants have shape (num_seeds, num_units), the GFE
+            is computed for each seed.
+
         Args:
             cumulants list(CumulantsTAP): cumulants of the layers
             rescaled_weight_cache tuple(list[tensor], list[tensor]):
              cached list of rescaled weight matrices and squares thereof
 
         Returns:
-            float: Gibbs free energy
+            float or tensor (num_seeds,): Gibbs free energy
         """
 
         # cache rescaled weights for efficient computation of GFE
         if rescaled_weight_cache is None:
             rescaled_weight_cache = self._get_rescaled_weights()
 
+        quadratic = be.quadratic
+        if be.ndim(cumulants[0].mean) == 2:
+            quadratic = _batch_quadratic
+
         total = 0
         for index in range(self.num_layers):
             lay = self.layers[index]
@@ -691,21 +1056,28 @@ class BoltzmannMachine(object):
         for index in range(self.num_connections):
             w = rescaled_weight_cache[0][index]
             w2 = rescaled_weight_cache[1][index]
-            total -= be.quadratic(cumulants[index].mean, cumulants[index+1].mean, w)
-            total -= 0.5 * be.quadratic(cumulants[index].variance,
+            total -= quadratic(cumulants[index].mean, cumulants[index+1].mean, w)
+            total -= 0.5 * quadratic(cumulants[index].variance,
                            cumulants[index+1].variance, w2)
 
         return total
 
+    @timed('TAP_minimization')
     def compute_StateTAP(self, use_GD=True, init_lr=0.1, tol=1e-7, max_iters=50, ratchet=True,
                          decrease_on_neg=0.9, mean_weight=0.9, mean_square_weight=0.999,
-                         seed=None, rescaled_weight_cache=None):
+                         seed=None, rescaled_weight_cache=None, num_seeds=None,
+                         moments=None):
         """
         Compute the state of the layers by minimizing the second order TAP
         approximation to the Helmholtz free energy.  This function selects one of two
         possible implementations of this minimization procedure, gradient-descent or
         self-consistent iteration.
 
+        Notes:
+            If the seed has cumulants of shape (num_seeds, num_units), or if
+            num_seeds is given, the minimizations from all of the seeds are
+            run together and the GFE of each seed is returned.
+
         Args:
             use_GD (bool): use gradient descent or use self_consistent iteration
             init_lr (float): initial learning rate for GD
@@ -720,16 +1092,24 @@ class BoltzmannMachine(object):
             seed (CumulantsTAP): seed for the minimization
             rescaled_weight_cache tuple(list[tensor],list[tensor]): cache of
                 rescaled weight and weight_square matrices
+            num_seeds (int; optional): if the seed is None, the number of
+                random seeds to minimize from at once
+            moments (tuple(list[CumulantsTAP], list[CumulantsTAP]); optional):
+                the ADAM moments of a single-seed GD minimization, which are
+                updated in place (e.g., to warm start the next minimization)
 
         Returns:
-            tuple (StateTAP, float): TAP state of the layers and the GFE
+            tuple (StateTAP, float or tensor (num_seeds,)): TAP state of the
+                layers and the GFE
         """
+        if seed is None and num_seeds is not None:
+            seed = ms.StateTAP.from_model_rand_batch(self, num_seeds)
         if use_GD:
             return self._compute_StateTAP_GD(init_lr, tol, max_iters, ratchet,
                                              decrease_on_neg,
                                              mean_weight, mean_square_weight,
                                              rescaled_weight_cache=rescaled_weight_cache,
-                                             seed=seed)
+                                             seed=seed, moments=moments)
         else:
             return self._compute_StateTAP_self_consistent(tol=tol, max_iters=max_iters,
                                                           rescaled_weight_cache=rescaled_weight_cache,
@@ -737,7 +1117,7 @@ class BoltzmannMachine(object):
 
     def _compute_StateTAP_GD(self, init_lr=0.1, tol=1e-7, max_iters=50, ratchet=True,
                              decrease_on_neg=0.9, mean_weight=0.9, mean_square_weight=0.999,
-                             seed=None, rescaled_weight_cache=None):
+                             seed=None, rescaled_weight_cache=None, moments=None):
         """
         Compute the state of the layers by minimizing the second order TAP
         approximation to the Helmholtz free energy via gradient descent.
@@ -771,7 +1151,8 @@ class BoltzmannMachine(object):
         we can minimize \Gamma in m to obtain an approximation of F(v;q=0) = F(v)
 
         This implementation uses ADAM gradient descent from a random starting location
-         to minimize the function.
+         to minimize the function. If the seed holds a batch of magnetizations,
+         the minimizations are run together by _compute_StateTAP_GD_batch.
 
         Args:
             use_GD (bool): use gradient descent or use self_consistent iteration
@@ -787,6 +1168,10 @@ class BoltzmannMachine(object):
             seed (CumulantsTAP): seed for the minimization
             rescaled_weight_cache tuple(list[tensor],list[tensor]): cache of
                 rescaled weight and weight_square matrices
+            moments (tuple(list[CumulantsTAP], list[CumulantsTAP]); optional):
+                the ADAM moments (mean and mean square) of each layer, which
+                are updated in place. If None, the moments start from zero.
+                Unused for a batch of seeds.
 
         Returns:
             tuple (StateTAP, float): TAP state of the layers and the GFE
@@ -804,6 +1189,13 @@ class BoltzmannMachine(object):
         if rescaled_weight_cache is None:
             rescaled_weight_cache = self._get_rescaled_weights()
 
+        if be.ndim(cumulants[0].mean) == 2:
+            return self._compute_StateTAP_GD_batch(cumulants, init_lr, tol,
+                                                   max_iters, ratchet,
+                                                   decrease_on_neg, mean_weight,
+                                                   mean_square_weight,
+                                                   rescaled_weight_cache)
+
         free_energy = self.gibbs_free_energy(cumulants, rescaled_weight_cache)
 
         lr = be.float_scalar(init_lr)
@@ -815,8 +1207,11 @@ class BoltzmannMachine(object):
         comp_bt1 = partial(be.tmul, be.float_scalar(1.0/(1.0 - beta_1)))
         comp_bt2 = partial(be.tmul, be.float_scalar(1.0/(1.0 - beta_2)))
 
-        mom = [lay.get_zero_magnetization() for lay in self.layers]
-        var = [lay.get_zero_magnetization() for lay in self.layers]
+        if moments is None:
+            mom = [lay.get_zero_magnetization() for lay in self.layers]
+            var = [lay.get_zero_magnetization() for lay in self.layers]
+        else:
+            mom, var = moments
         var_corr = [lay.get_zero_magnetization() for lay in self.layers]
         grad = [lay.get_zero_magnetization() for lay in self.layers]
         eps = [be.apply(be.ones_like, mag) for mag in grad]
@@ -938,6 +1333,10 @@ class BoltzmannMachine(object):
         if rescaled_weight_cache is None:
             rescaled_weight_cache = self._get_rescaled_weights()
 
+        if be.ndim(state.cumulants[0].mean) == 2:
+            return self._compute_StateTAP_self_consistent_batch(
+                state, tol, max_iters, rescaled_weight_cache)
+
         free_energy = self.gibbs_free_energy(state.cumulants, rescaled_weight_cache)
 
         for itr in range(max_iters):
@@ -962,6 +1361,211 @@ class BoltzmannMachine(object):
 
         return state, free_energy
 
+    def _compute_StateTAP_GD_batch(self, seed_cumulants, init_lr, tol, max_iters,
+                                   ratchet, decrease_on_neg, mean_weight,
+                                   mean_square_weight, rescaled_weight_cache):
+        """
+        Minimize the second order TAP approximation to the Helmholtz free energy
+        via gradient descent from a batch of seeds.
+
+        Notes:
+            Performs the ADAM updates of _compute_StateTAP_GD for all of the
+            seeds at once, with a learning rate for each seed.
+            Seeds that have converged are removed from the set of active seeds,
+            so that they do not contribute to the work of later iterations.
+
+        Args:
+            seed_cumulants (list[CumulantsTAP]): the seeds for the minimization,
+                with tensors of shape (num_seeds, num_units)
+            init_lr (float): initial learning rate for GD
+            tol (float): tolerance for quitting minimization
+            max_iters (int): maximum gradient decsent steps
+            ratchet (bool): don't perform gradient update if not lowering GFE
+            decrease_on_neg (float): factor to multiply lr by if the gradient step
+                fails to lower the GFE
+            mean_weight (float): mean weight parameter for ADAM
+            mean_square_weight (float): mean square weight parameter for ADAM
+                setting to 0.0 turns off adaptive weighting
+            rescaled_weight_cache tuple(list[tensor],list[tensor]): cache of
+                rescaled weight and weight_square matrices
+
+        Returns:
+            tuple (StateTAP, tensor (num_seeds,)): TAP state of the layers and
+                the GFE of each seed
+
+        """
+        depth = range(self.num_layers)
+        cumulants = [be.apply(be.copy_tensor, c) for c in seed_cumulants]
+        result = [be.apply(be.copy_tensor, c) for c in seed_cumulants]
+
+        free_energy = self.gibbs_free_energy(cumulants, rescaled_weight_cache)
+        result_free_energy = be.copy_tensor(free_energy)
+
+        active = numpy.arange(be.shape(free_energy)[0])
+        lr = numpy.full(len(active), init_lr, dtype=numpy.float32)
+        beta_1 = be.float_scalar(mean_weight)
+        beta_2 = be.float_scalar(mean_square_weight)
+        bt_1_ = partial(be.mix_, beta_1)
+        bt_2_ = partial(be.mix_, beta_2)
+        comp_bt1 = partial(be.tmul, be.float_scalar(1.0/(1.0 - beta_1)))
+        comp_bt2 = partial(be.tmul, be.float_scalar(1.0/(1.0 - beta_2)))
+        eps = partial(be.add, be.float_scalar(1e-6))
+
+        mom = [be.apply(be.zeros_like, c) for c in cumulants]
+        var = [be.apply(be.zeros_like, c) for c in cumulants]
+        grad = [None for _ in depth]
+
+        for _ in range(max_iters):
+            # compute the gradient of the Gibbs Free Energy
+            new_grad = self._TAP_magnetization_grad(cumulants, rescaled_weight_cache)
+            lr_ = partial(be.multiply, be.float_tensor(lr[:, None]))
+
+            # compute momentum, and unbiased momentum.  Cache the latter in grad
+            for i in depth:
+                be.mapzip_(bt_1_, mom[i], new_grad[i])
+                grad[i] = be.apply(comp_bt1, mom[i])
+
+            # If we are using adaptive rescaling:
+            if mean_square_weight > 1e-6:
+                for i in depth:
+                    be.mapzip_(bt_2_, var[i], be.apply(be.square, new_grad[i]))
+                    coeff = be.apply(be.reciprocal, be.apply(eps,
+                                     be.apply(be.sqrt, be.apply(comp_bt2, var[i]))))
+                    grad[i] = be.mapzip(be.multiply, be.apply(lr_, coeff), grad[i])
+            else:
+                for i in depth:
+                    grad[i] = be.apply(lr_, grad[i])
+
+            new_cumulants = [
+                self.layers[l].clip_magnetization(
+                    be.mapzip(be.subtract, grad[l], cumulants[l])
+                )
+                for l in depth]
+            new_free_energy = self.gibbs_free_energy(new_cumulants,
+                                                     rescaled_weight_cache)
+
+            # the same decisions as _compute_StateTAP_GD, for each seed
+            diff = be.to_numpy_array(free_energy - new_free_energy)
+            neg = diff < 0
+            converged = numpy.abs(diff) < tol
+            too_large = neg & ~converged
+            lr[too_large] *= decrease_on_neg
+            stopped = converged | (too_large & (lr < 1e-10))
+            accepted = ~stopped & (~neg | (not ratchet))
+
+            if accepted.any():
+                index = be.long_tensor(numpy.flatnonzero(accepted))
+                _assign_cumulants_(_select_cumulants(new_cumulants, index),
+                                   index, cumulants)
+                free_energy[index] = new_free_energy[index]
+
+            if stopped.any():
+                index = be.long_tensor(numpy.flatnonzero(stopped))
+                done = be.long_tensor(active[stopped])
+                _assign_cumulants_(_select_cumulants(cumulants, index),
+                                   done, result)
+                result_free_energy[done] = free_energy[index]
+
+                # remove the converged seeds from the active set
+                keep = numpy.flatnonzero(~stopped)
+                active = active[keep]
+                if len(active) == 0:
+                    break
+                index = be.long_tensor(keep)
+                cumulants = _select_cumulants(cumulants, index)
+                mom = _select_cumulants(mom, index)
+                var = _select_cumulants(var, index)
+                free_energy = free_energy[index]
+                lr = lr[keep]
+
+        if len(active):
+            _assign_cumulants_(cumulants, be.long_tensor(active), result)
+            result_free_energy[be.long_tensor(active)] = free_energy
+
+        return ms.StateTAP(result, self.lagrange_multipliers_analytic(result)), \
+               result_free_energy
+
+    def _compute_StateTAP_self_consistent_batch(self, seed, tol, max_iters,
+                                                rescaled_weight_cache):
+        """
+        Minimize the second order TAP approximation to the Helmholtz free energy
+        by iterating the stationarity conditions from a batch of seeds.
+
+        Notes:
+            Performs the updates of _compute_StateTAP_self_consistent for all
+            of the seeds at once. Seeds that have converged are removed from
+            the set of active seeds, so that they do not contribute to the work
+            of later iterations.
+
+        Args:
+            seed (StateTAP): the seeds for the minimization, with tensors of
+                shape (num_seeds, num_units)
+            tol (float): tolerance for quitting minimization.
+            max_iters (int): maximum gradient decsent steps.
+            rescaled_weight_cache tuple(list[tensor],list[tensor]): cache of
+                rescaled weight and weight_square matrices
+
+        Returns:
+            tuple (StateTAP, tensor (num_seeds,)): TAP state of the layers and
+                the GFE of each seed
+
+        """
+        state = ms.StateTAP.from_state(seed)
+        result = ms.StateTAP.from_state(seed)
+
+        free_energy = self.gibbs_free_energy(state.cumulants, rescaled_weight_cache)
+        result_free_energy = be.copy_tensor(free_energy)
+        active = numpy.arange(be.shape(free_energy)[0])
+
+        for itr in range(max_iters):
+            # Perform a self-consistent update to each layer
+            for i in range(self.num_layers-1, -1, -1):
+                self.layers[i].update_lagrange_multipliers_(
+                    state.cumulants[i],
+                    state.lagrange_multipliers[i],
+                    self._connected_elements(i, state.cumulants),
+                    self._connecting_transforms(i, rescaled_weight_cache[0]),
+                    self._connecting_transforms(i, rescaled_weight_cache[1]))
+                self.layers[i].self_consistent_update_(
+                    state.cumulants[i],
+                    state.lagrange_multipliers[i])
+
+            # compute the new free energy and perform an update
+            new_free_energy = self.gibbs_free_energy(state.cumulants, rescaled_weight_cache)
+
+            converged = numpy.abs(
+                be.to_numpy_array(free_energy - new_free_energy)) < tol
+            if converged.any():
+                index = be.long_tensor(numpy.flatnonzero(converged))
+                done = be.long_tensor(active[converged])
+                _assign_cumulants_(_select_cumulants(state.cumulants, index),
+                                   done, result.cumulants)
+                _assign_cumulants_(
+                    _select_cumulants(state.lagrange_multipliers, index),
+                    done, result.lagrange_multipliers)
+                result_free_energy[done] = free_energy[index]
+
+                # remove the converged seeds from the active set
+                keep = numpy.flatnonzero(~converged)
+                active = active[keep]
+                if len(active) == 0:
+                    break
+                index = be.long_tensor(keep)
+                state = ms.StateTAP(
+                    _select_cumulants(state.cumulants, index),
+                    _select_cumulants(state.lagrange_multipliers, index))
+                new_free_energy = new_free_energy[index]
+            free_energy = new_free_energy
+
+        if len(active):
+            index = be.long_tensor(active)
+            _assign_cumulants_(state.cumulants, index, result.cumulants)
+            _assign_cumulants_(state.lagrange_multipliers, index,
+                               result.lagrange_multipliers)
+            result_free_energy[index] = free_energy
+
+        return result, result_free_energy
+
     def lagrange_multipliers_analytic(self, cumulants):
         """
         Compute lagrange multipliers of each layer according to an analytic calculation
@@ -1039,7 +1643,8 @@ class BoltzmannMachine(object):
         return grad_GFE
 
     def grad_TAP_free_energy(self, use_GD=True, init_lr=0.1, tol=1e-7, max_iters=50, ratchet=True,
-                             decrease_on_neg=0.9, mean_weight=0.9, mean_square_weight=0.999):
+                             decrease_on_neg=0.9, mean_weight=0.9, mean_square_weight=0.999,
+                             state=None):
         """
         Compute the gradient of the Helmholtz free engergy of the model according
         to the TAP expansion around infinite temperature.
@@ -1060,21 +1665,24 @@ class BoltzmannMachine(object):
             mean_weight (float): mean weight parameter for ADAM
             mean_square_weight (float): mean square weight parameter for ADAM
                 setting to 0.0 turns off adaptive weighting
+            state (StateTAP; optional): the minimizing magnetizations. If None,
+                they are computed with compute_StateTAP.
 
         Returns:
             namedtuple: (Gradient): containing gradients of the model parameters.
 
         """
         rescaled_weight_cache = self._get_rescaled_weights()
-        state,_ = self.compute_StateTAP(use_GD, init_lr, tol, max_iters, ratchet,
-                                        decrease_on_neg, mean_weight, mean_square_weight,
-                                        rescaled_weight_cache = rescaled_weight_cache)
+        if state is None:
+            state,_ = self.compute_StateTAP(use_GD, init_lr, tol, max_iters, ratchet,
+                                            decrease_on_neg, mean_weight, mean_square_weight,
+                                            rescaled_weight_cache = rescaled_weight_cache)
         return self._grad_gibbs_free_energy(state,
                                             rescaled_weight_cache = rescaled_weight_cache)
 
     def TAP_gradient(self, data_state, use_GD=True, init_lr=0.1, tol=1e-7, max_iters=50,
                      ratchet=True, decrease_on_neg=0.9, mean_weight=0.9,
-                     mean_square_weight=0.999):
+                     mean_square_weight=0.999, state=None):
         """
         Gradient of -\ln P(v) with respect to the model parameters
 
@@ -1091,6 +1699,8 @@ class BoltzmannMachine(object):
             mean_weight (float): mean weight parameter for ADAM
             mean_square_weight (float): mean square weight parameter for ADAM
                 setting to 0.0 turns off adaptive weighting
+            state (StateTAP; optional): the minimizing magnetizations. If None,
+                they are computed with compute_StateTAP.
 
         Returns:
             gradient (Gradient): containing gradients of the model parameters.
@@ -1117,7 +1727,213 @@ class BoltzmannMachine(object):
         # compute the gradient of the Helmholtz FE via TAP_gradient
         neg_phase = self.grad_TAP_free_energy(use_GD, init_lr, tol, max_iters,
                                               ratchet, decrease_on_neg,
-                                              mean_weight, mean_square_weight)
+                                              mean_weight, mean_square_weight,
+                                              state=state)
 
         grad = gu.grad_mapzip(be.subtract, neg_phase, pos_phase)
         return grad
+
+    #
+    # Methods for exact computations on small models
+    #
+
+    def _check_enumerable(self, index=None):
+        """
+        Choose the layer to enumerate for exact computations.
+
+        Notes:
+            Exact computations are only supported for two-layer models of
+            Bernoulli layers.
+
+        Args:
+            index (int; optional): the index of the layer to enumerate.
+                If None, the layer with the fewest units is chosen.
+
+        Returns:
+            index (int): the index of the layer to enumerate.
+
+        """
+        if self.num_layers != 2:
+            raise ValueError("Exact computations require a model with 2 layers")
+        for layer in self.layers:
+            if not isinstance(layer, layers.BernoulliLayer):
+                raise ValueError("Exact computations require Bernoulli layers")
+        if index is None:
+            index = int(self.layers[1].len < self.layers[0].len)
+        if self.layers[index].len > MAX_ENUMERATED_UNITS:
+            raise ValueError("Cannot enumerate a layer with {} units"
+                             .format(self.layers[index].len))
+        return index
+
+    def log_marginal(self, index, units):
+        """
+        Compute the unnormalized log probability of the units of one layer,
+        with the other layer of a two-layer model summed out analytically.
+
+        log p~(x) = -E(x) + \sum_j logZ_j(field_j(x))
+
+        Notes:
+            Unlike the exact methods, this does not enumerate any layer,
+            so it can be combined with an estimate of the log partition
+            function (e.g., from an AnnealedImportanceSampler) for models
+            of any size.
+
+        Args:
+            index (int): the index of the layer of the units.
+            units (tensor (num_samples, num_units)): values of the units.
+
+        Returns:
+            tensor (num_samples,): unnormalized log probabilities.
+
+        """
+        other = 1 - index
+        state = [None, None]
+        state[index] = units
+        field = be.dot(self._connected_rescaled_units(other, state)[0],
+                       self._connected_weights(other)[0])
+        layer = self.layers[other]
+        log_prob = be.tsum(layer.log_partition_function(
+                field, be.zeros_like(field)), axis=1)
+        if layer.center:
+            # the rescaled units are shifted by the center of the layer
+            log_prob -= be.dot(field, layer.get_center())
+        return log_prob - self.layers[index].energy(units)
+
+    def exact_log_partition_function(self, index=None,
+                                     max_elements=MAX_ENUMERATION_ELEMENTS,
+                                     num_workers=0):
+        """
+        Compute the logarithm of the partition function of a small
+        two-layer model exactly.
+
+        Notes:
+            The layer with the fewest units (or the layer given by index) is
+            enumerated, and the other layer is summed out analytically
+            using its log_partition_function. The enumeration is streamed in
+            chunks so that the memory use is bounded, and the chunks can be
+            distributed over a pool of worker processes.
+            The cost grows as 2**num_units of the enumerated layer.
+
+        Args:
+            index (int; optional): the index of the layer to enumerate.
+            max_elements (int; optional): the largest number of elements in
+                the tensors of an enumeration chunk.
+            num_workers (int; optional): the number of worker processes.
+                If 0, the chunks are computed in the calling process.
+
+        Returns:
+            log_Z (float): the log partition function.
+
+        """
+        index = self._check_enumerable(index)
+        num_units = self.layers[index].len
+        chunk_size = max(1, max_elements // max(self.layers[0].len,
+                                                self.layers[1].len))
+        num_states = 2**num_units
+        starts = range(0, num_states, chunk_size)
+        stops = [min(start + chunk_size, num_states) for start in starts]
+        func = partial(_enumeration_log_sum, self, index)
+        if num_workers:
+            with ProcessPoolExecutor(max_workers=num_workers) as executor:
+                log_sums = list(executor.map(func, starts, stops))
+        else:
+            log_sums = list(map(func, starts, stops))
+        return float(numpy.logaddexp.reduce(log_sums))
+
+    def exact_log_likelihood(self, vis, log_Z=None, **kwargs):
+        """
+        Compute the exact log likelihood of the visible units of a small
+        two-layer model.
+
+        Args:
+            vis (tensor (num_samples, num_visible)): values of the visible units.
+            log_Z (float; optional): the log partition function.
+                If None, it is computed with exact_log_partition_function.
+            kwargs: keyword arguments for exact_log_partition_function.
+
+        Returns:
+            tensor (num_samples,): the log likelihood of each sample.
+
+        """
+        self._check_enumerable()
+        if log_Z is None:
+            log_Z = self.exact_log_partition_function(**kwargs)
+        return self.log_marginal(0, vis) - log_Z
+
+
+def _enumeration_log_sum(model, index, start, stop):
+    """
+    Compute the log of the sum of the unnormalized probabilities of a range
+    of the configurations of the units of one layer.
+
+    Notes:
+        Configuration k has units equal to the binary digits of k.
+
+    Args:
+        model (BoltzmannMachine): a two-layer model of Bernoulli layers.
+        index (int): the index of the enumerated layer.
+        start (int): the first configuration.
+        stop (int): the end of the range of configurations (exclusive).
+
+    Returns:
+        log_sum (float)
+
+    """
+    num_units = model.layers[index].len
+    codes = numpy.arange(start, stop, dtype=numpy.int64)
+    bits = (codes[:, None] >> numpy.arange(num_units, dtype=numpy.int64)) & 1
+    log_probs = model.log_marginal(index, be.float_tensor(bits))
+    log_max = be.tmax(log_probs)
+    return float(log_max) + \
+        numpy.log(float(be.tsum(be.exp(be.subtract(log_max, log_probs)))))
+
+
+def _batch_quadratic(a, b, W):
+    """
+    Evaluate the quadratic form a W b for each row of a and b.
+
+    Args:
+        a (tensor (num_seeds, num_units_a))
+        b (tensor (num_seeds, num_units_b))
+        W (tensor (num_units_a, num_units_b))
+
+    Returns:
+        tensor (num_seeds,)
+
+    """
+    return be.batch_quadratic(a, W, b)
+
+def _select_cumulants(cumulants, index):
+    """
+    Select rows of a list of batched cumulants.
+
+    Args:
+        cumulants (list[CumulantsTAP]): tensors of shape (num_seeds, num_units)
+        index (LongTensor): the rows to select
+
+    Returns:
+        list[CumulantsTAP]
+
+    """
+    select = partial(be.index_select, index=index, dim=0)
+    return [be.apply(select, c) for c in cumulants]
+
+def _assign_cumulants_(source, index, target):
+    """
+    Copy a list of batched cumulants into rows of another list.
+
+    Notes:
+        Modifies the tensors of target in place.
+
+    Args:
+        source (list[CumulantsTAP]): tensors of shape (len(index), num_units)
+        index (LongTensor): the rows of target to set
+        target (list[CumulantsTAP]): tensors of shape (num_seeds, num_units)
+
+    Returns:
+        None
+
+    """
+    for source_cumulants, target_cumulants in zip(source, target):
+        for source_tensor, target_tensor in zip(source_cumulants, target_cumulants):
+            target_tensor[index] = source_tensor
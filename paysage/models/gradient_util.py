@@ -1,5 +1,7 @@
 from cytoolz import compose, partial
 from math import sqrt
+from functools import reduce
+from operator import mul
 from collections import namedtuple
 
 from .. import backends as be
@@ -9,6 +11,97 @@ Gradient = namedtuple("Gradient", [
     "weights" # List[List[ParamsWeights]]
 ])
 
+class FlatGradient(object):
+    """
+    A Gradient whose tensors are views into a single contiguous vector.
+
+    The layers and weights attributes have the same structure as those of
+    a Gradient, so a FlatGradient can be used anywhere a Gradient is read.
+    The utility functions below operate on the vector in a single pass
+    when all of their Gradient arguments are flat.
+
+    """
+    def __init__(self, vector, layout):
+        """
+        Create a FlatGradient from a vector.
+
+        Notes:
+            The layout is a Gradient with the shapes of the tensors in place
+            of the tensors. The vector is not copied.
+
+        Args:
+            vector (tensor (num_parameters,))
+            layout (Gradient): the shapes of the tensors
+
+        Returns:
+            FlatGradient
+
+        """
+        self.vector = vector
+        self.layout = layout
+        offset = 0
+        def view(shape):
+            nonlocal offset
+            size = reduce(mul, shape, 1)
+            tensor = be.reshape(vector[offset: offset + size], shape)
+            offset += size
+            return tensor
+        views = grad_apply(view, layout)
+        self.layers = views.layers
+        self.weights = views.weights
+
+    @classmethod
+    def from_gradient(cls, grad, layout=None):
+        """
+        Copy a Gradient into a FlatGradient.
+
+        Args:
+            grad (Gradient)
+            layout (optional; Gradient): the shapes of the tensors in grad,
+                so that FlatGradients from the same model can share a layout
+
+        Returns:
+            FlatGradient
+
+        """
+        if isinstance(grad, FlatGradient):
+            return grad.copy()
+        if layout is None:
+            layout = grad_apply(be.shape, grad)
+        return cls(grad_flatten(grad), layout)
+
+    def copy(self):
+        """
+        Copy a FlatGradient.
+
+        Args:
+            None
+
+        Returns:
+            FlatGradient
+
+        """
+        return FlatGradient(be.copy_tensor(self.vector), self.layout)
+
+    def __deepcopy__(self, memo):
+        return self.copy()
+
+
+def is_flat(*grads):
+    """
+    Check if a set of Gradient objects are flat with a common layout.
+
+    Args:
+        grads (Gradient/FlatGradient)
+
+    Returns:
+        bool
+
+    """
+    return all(isinstance(g, FlatGradient) for g in grads) and \
+        all(g.layout is grads[0].layout or g.layout == grads[0].layout
+            for g in grads[1:])
+
 """
 Utility functions for manipulating Gradient objects
 """
@@ -92,6 +185,8 @@ def grad_apply(func, grad):
         Gradient
 
     """
+    if is_flat(grad):
+        return FlatGradient(func(grad.vector), grad.layout)
     return Gradient(
         [[be.apply(func, sub_layer) for sub_layer in layer] for layer in grad.layers],
         [[be.apply(func, sub_weight) for sub_weight in weight] for weight in grad.weights]
@@ -112,6 +207,9 @@ def grad_apply_(func_, grad):
         None
 
     """
+    if is_flat(grad):
+        func_(grad.vector)
+        return
     for layer in grad.layers:
         for sub_layer in layer:
             be.apply_(func_, sub_layer)
@@ -131,6 +229,8 @@ def grad_mapzip(func, grad1, grad2):
         Gradient
 
     """
+    if is_flat(grad1, grad2):
+        return FlatGradient(func(grad1.vector, grad2.vector), grad1.layout)
     n = len(grad1.layers)
     m = len(grad1.weights)
     return Gradient(
@@ -156,6 +256,9 @@ def grad_mapzip_(func_, grad1, grad2):
         None
 
     """
+    if is_flat(grad1, grad2):
+        func_(grad1.vector, grad2.vector)
+        return
     n = len(grad1.layers)
     m = len(grad1.weights)
     for i in range(n):
@@ -165,6 +268,34 @@ def grad_mapzip_(func_, grad1, grad2):
         for z in zip(grad1.weights[j], grad2.weights[j]):
             be.mapzip_(func_, z[0], z[1])
 
+def grad_zip_(func_, *grads):
+    """
+    Apply an in place function entrywise over the zip of several Gradient objects.
+
+    Notes:
+        Modifies elements of the gradients in place, according to func_.
+
+    Args:
+        func_ (callable, in place operation): a function with one tensor
+            argument for each Gradient
+        grads (Gradient)
+
+    Returns:
+        None
+
+    """
+    if is_flat(*grads):
+        func_(*[g.vector for g in grads])
+        return
+    for i in range(len(grads[0].layers)):
+        for sub_layers in zip(*[g.layers[i] for g in grads]):
+            for tensors in zip(*sub_layers):
+                func_(*tensors)
+    for j in range(len(grads[0].weights)):
+        for sub_weights in zip(*[g.weights[j] for g in grads]):
+            for tensors in zip(*sub_weights):
+                func_(*tensors)
+
 def grad_norm(grad):
     """
     Compute the l2 norm of the gradient.
@@ -177,6 +308,8 @@ def grad_norm(grad):
 
     """
     tensor_sum_square = compose(be.tsum, be.square)
+    if is_flat(grad):
+        return sqrt(tensor_sum_square(grad.vector))
     return sqrt(grad_accumulate(tensor_sum_square, grad))
 
 def grad_normalize_(grad):
@@ -217,6 +350,8 @@ def grad_flatten(grad):
     Returns:
         (tensor): vectorized gradient
     """
+    if is_flat(grad):
+        return be.copy_tensor(grad.vector)
     v = []
     for l in grad.layers:
         for c in l:
@@ -64,3 +64,96 @@ class Connection(object):
 
         """
         return self.weights.W(trans)
+
+
+class SamplingPlan(object):
+
+    def __init__(self, layers, connections):
+        """
+        Create an object that caches the structure of a Gibbs sweep.
+
+        Notes:
+            Holds the alternating (odd, even) layer order and, for each
+            layer, the connected layers and the connections that map them
+            onto the layer, so that a sweep does not need to rebuild these
+            lists. The plan only depends on the structure of the model.
+            The weights are not stored; they are read from the connections
+            in each sweep, so the plan sees every change to the parameters.
+
+        Args:
+            layers (List[Layer]): the layers of the model
+            connections (List[Connection]): the connections of the model
+
+        Returns:
+            SamplingPlan
+
+        """
+        num_layers = len(layers)
+        (odd_layers, even_layers) = (range(1, num_layers, 2),
+                                     range(0, num_layers, 2))
+        self.alternating_order = list(odd_layers) + list(even_layers)
+        self.schedules = {}
+
+        # for each layer, the connected layers, the connections that map them
+        # onto the layer (and whether the matrix is transposed), and whether
+        # the model multipliers apply to them
+        self.connected_indices = [[] for _ in range(num_layers)]
+        self.connected_transforms = [[] for _ in range(num_layers)]
+        self.multiplied = [[] for _ in range(num_layers)]
+        for conn in connections:
+            self.connected_indices[conn.target_index].append(conn.domain_index)
+            self.connected_transforms[conn.target_index].append((conn, True))
+            self.multiplied[conn.target_index].append(True)
+
+            self.connected_indices[conn.domain_index].append(conn.target_index)
+            self.connected_transforms[conn.domain_index].append((conn, False))
+            self.multiplied[conn.domain_index].append(False)
+
+        self.connections = list(connections)
+
+    def is_current(self, connections):
+        """
+        Check if the plan is consistent with the connections of a model.
+
+        Args:
+            connections (List[Connection]): the connections of the model
+
+        Returns:
+            bool
+
+        """
+        return len(self.connections) == len(connections) and \
+            all(a is b for a, b in zip(self.connections, connections))
+
+    def connected_weights(self, i):
+        """
+        Get the current weights connecting layer i to its neighbors.
+
+        Args:
+            i (int): the index of the layer of interest
+
+        Returns:
+            list[tensor]: the weights connecting layer i to its neighbors
+
+        """
+        return [conn.W(trans) for conn, trans in self.connected_transforms[i]]
+
+    def layer_schedule(self, clamped_sampling):
+        """
+        Get the order in which the layers are updated in a sweep.
+
+        Notes:
+            The schedule for each set of clamped layers is computed once.
+
+        Args:
+            clamped_sampling (List[int]): the layers that are not sampled
+
+        Returns:
+            List[int]: the layers to update, odd layers first
+
+        """
+        key = tuple(clamped_sampling)
+        if key not in self.schedules:
+            self.schedules[key] = [i for i in self.alternating_order
+                                   if i not in clamped_sampling]
+        return self.schedules[key]
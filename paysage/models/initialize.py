@@ -173,5 +173,5 @@ def pca(batch, model, **kwargs):
             model.connections[i].weights.set_params(layers.ParamsWeights(
             glorot_multiplier * math.sqrt(n) * weights * pca.W))
         else:
-            model.connections[i].weights.params.matrix[:] = \
-            glorot_multiplier * be.randn(model.connections[i].shape)
+            model.connections[i].weights.set_params(layers.ParamsWeights(
+            glorot_multiplier * be.randn(model.connections[i].shape)))
@@ -1,4 +1,5 @@
 from copy import deepcopy
+from cytoolz import partial
 from .. import backends as be
 
 class State(object):
@@ -228,6 +229,172 @@ class State(object):
         return self.units[0]
 
 
+class PackedState(object):
+    """
+    A PackedState holds the same samples as a State, with the units
+    of binary layers (e.g., Bernoulli or one hot units) packed into bits.
+
+    A packed binary unit takes 1 bit instead of the 32 bits of a float,
+    so many more samples (e.g., persistent chains or fantasy particles)
+    can be kept in memory. The units of the other layers are stored as
+    they are.
+
+    """
+    def __init__(self, units, num_units, packed):
+        """
+        Create a PackedState object.
+
+        Args:
+            units: a list of tensors (packed or not)
+            num_units (List[int]): the number of units in each layer
+            packed (List[bool]): whether each layer is packed
+
+        Returns:
+            PackedState
+
+        """
+        self.units = units
+        self.num_units = num_units
+        self.packed = packed
+        self.len = len(self.units)
+
+    def batch_size(self):
+        """
+        Get the batch size of the state.
+
+        Args:
+            None
+
+        Returns:
+            batch size: int
+
+        """
+        return be.shape(self.units[0])[0]
+
+    def __len__(self):
+        """
+        Get the number of layers in the state.
+
+        Args:
+            None
+
+        Returns:
+            number_of_layers (int)
+
+        """
+        return self.len
+
+    @staticmethod
+    def is_binary(tensor):
+        """
+        Check if all of the values of a tensor are 0 or 1.
+
+        Args:
+            tensor
+
+        Returns:
+            bool
+
+        """
+        return bool(be.tall(be.equal(tensor, be.tround(tensor)))) and \
+            float(be.tmin(tensor)) >= 0 and float(be.tmax(tensor)) <= 1
+
+    @classmethod
+    def from_state(cls, state, binary=None):
+        """
+        Create a PackedState by packing the binary layers of a State.
+
+        Args:
+            state (State): a State instance
+            binary (optional; List[bool]): whether each layer is binary.
+                If None, packs the layers whose units are all 0 or 1.
+
+        Returns:
+            PackedState
+
+        """
+        if binary is None:
+            binary = [cls.is_binary(t) for t in state.units]
+        units = [be.pack_bits(t) if b else be.copy_tensor(t)
+                 for t, b in zip(state.units, binary)]
+        num_units = [be.shape(t)[1] for t in state.units]
+        return cls(units, num_units, list(binary))
+
+    @classmethod
+    def concatenate(cls, states):
+        """
+        Concatenate the samples of a list of PackedStates.
+
+        Args:
+            states (List[PackedState]): states with the same layers
+
+        Returns:
+            PackedState
+
+        """
+        units = [be.vstack([state.units[i] for state in states])
+                 for i in range(states[0].len)]
+        return cls(units, list(states[0].num_units), list(states[0].packed))
+
+    def unpack_range(self, start, stop):
+        """
+        Unpack a contiguous range of samples into a State.
+
+        Args:
+            start (int): the first sample
+            stop (int): the sample after the last sample
+
+        Returns:
+            State
+
+        """
+        return State([be.unpack_bits(t[start:stop], n) if p
+                      else be.copy_tensor(t[start:stop])
+                      for t, n, p in zip(self.units, self.num_units, self.packed)])
+
+    def set_range_(self, start, stop, state):
+        """
+        Pack the samples of a State into a contiguous range of samples.
+
+        Notes:
+            Modifies the units attribute in place.
+
+        Args:
+            start (int): the first sample
+            stop (int): the sample after the last sample
+            state (State): a State with stop - start samples
+
+        Returns:
+            None
+
+        """
+        for t, units, p in zip(self.units, state.units, self.packed):
+            t[start:stop] = be.pack_bits(units) if p else units
+
+    def unpack(self, sample_indices=None):
+        """
+        Unpack all (or a subset of) the samples into a State.
+
+        Args:
+            sample_indices (optional; tensor): a tensor of sample indices
+
+        Returns:
+            State
+
+        """
+        tensors = []
+        for t, n, p in zip(self.units, self.num_units, self.packed):
+            if sample_indices is not None:
+                t = be.index_select(t, sample_indices, 0)
+            if p:
+                tensors.append(be.unpack_bits(t, n))
+            elif sample_indices is None:
+                tensors.append(be.copy_tensor(t))
+            else:
+                tensors.append(t)
+        return State(tensors)
+
+
 class StateTAP(object):
     """
     A StateTAP is a list of CumulantsTAP objects for each layer in the model.
@@ -299,6 +466,31 @@ class StateTAP(object):
         lms = model.lagrange_multipliers_analytic(cumulants)
         return cls(cumulants,lms)
 
+    @classmethod
+    def from_model_rand_batch(cls, model, num_samples):
+        """
+        Create a StateTAP object with a batch of random magnetizations.
+
+        Notes:
+            Unlike from_model_rand, the cumulants always have shape
+            (num_samples, num_units), even if num_samples is 1.
+
+        Args:
+            model (BoltzmannMachine): a BoltzmannMachine instance
+            num_samples (int): number of random samples to draw
+
+        Returns:
+            StateTAP object
+
+        """
+        cumulants = [layer.get_random_magnetization(num_samples)
+                     for layer in model.layers]
+        if num_samples == 1:
+            cumulants = [be.apply(partial(be.unsqueeze, axis=0), c)
+                         for c in cumulants]
+        lms = model.lagrange_multipliers_analytic(cumulants)
+        return cls(cumulants,lms)
+
 
 def state_allclose(state1: State, state2: State,
                    rtol:float=1e-05, atol:float=1e-08) -> bool:
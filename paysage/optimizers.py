@@ -167,6 +167,7 @@ class Optimizer(object):
         self.stepsize = stepsize
         self.tolerance = tolerance
         self.delta = {}
+        self.lr = None
         self.lr_ = partial(be.tmul_, stepsize)
 
     def check_convergence(self):
@@ -196,8 +197,8 @@ class Optimizer(object):
             None
 
         """
-        lr = be.float_scalar(next(self.stepsize))
-        self.lr_ = partial(be.tmul_, lr)
+        self.lr = be.float_scalar(next(self.stepsize))
+        self.lr_ = partial(be.tmul_, self.lr)
 
 
 class Gradient(Optimizer):
@@ -385,6 +386,9 @@ class RMSProp(Optimizer):
 
         Notes:
             Changes parameters of model in place.
+            After the first update, the step is computed in place
+            in the delta attribute with a fused kernel (unless
+            mean_square_weight == 0).
 
         Args:
             model: a BoltzmannMachine object to optimize
@@ -395,9 +399,15 @@ class RMSProp(Optimizer):
             None
 
         """
+        first_update = self.memory.mean_square_gradient is None
         self.memory.update(grad)
-        self.delta = self.memory.normalize(grad, True)
-        gu.grad_apply_(self.lr_, self.delta)
+        if first_update:
+            self.delta = self.memory.normalize(grad, True)
+            gu.grad_apply_(self.lr_, self.delta)
+        else:
+            gu.grad_zip_(partial(be.adam_delta_, self.lr, be.float_scalar(1),
+                                 1 - self.memory.mean_square_weight),
+                         grad, self.memory.mean_square_gradient, self.delta)
         model.parameter_update(self.delta)
 
 
@@ -461,6 +471,9 @@ class ADAM(Optimizer):
 
         Notes:
             Changes parameters of model in place.
+            After the first update, the step is computed in place
+            in the delta attribute with a fused kernel (unless
+            mean_square_weight == 0).
 
         Args:
             model: a BoltzmannMachine object to optimize
@@ -471,9 +484,20 @@ class ADAM(Optimizer):
             None
 
         """
+        # the fused kernel needs both moment estimates, which are missing
+        # on the first update or if mean_square_weight == 0
+        fused = self.memory.mean_gradient is not None and \
+            self.memory.mean_square_gradient is not None
         self.memory.update(grad)
-        self.delta = self.memory.normalize(self.memory.mean_gradient, True)
-        gu.grad_apply_(self.lr_, self.delta)
+        if not fused:
+            self.delta = self.memory.normalize(self.memory.mean_gradient, True)
+            gu.grad_apply_(self.lr_, self.delta)
+        else:
+            gu.grad_zip_(partial(be.adam_delta_, self.lr,
+                                 1 - self.memory.mean_weight,
+                                 1 - self.memory.mean_square_weight),
+                         self.memory.mean_gradient,
+                         self.memory.mean_square_gradient, self.delta)
         model.parameter_update(self.delta)
 
 
@@ -5,14 +5,22 @@ from . import backends as be
 
 class Transformation(object):
 
-    def __init__(self, function=be.do_nothing, args=None, kwargs=None):
+    def __init__(self, function=be.do_nothing, args=None, kwargs=None,
+                 deterministic=False):
         """
         Create a transformation that operates on a list of tensors.
 
+        Notes:
+            A deterministic transformation always maps a row of the data
+            to the same output row (e.g., scale, l2_normalize,
+            binarize_color, or one_hot). The tables in the batch module
+            compute it once for each row and reuse the result in later epochs.
+
         Args:
             function (optional; callable)
             args (optional; List)
             kwargs (optional; Dict)
+            deterministic (optional; bool)
 
         Returns:
             Transformation
@@ -22,6 +30,7 @@ class Transformation(object):
         self.function = function
         self.args = args if args is not None else []
         self.kwargs = kwargs if kwargs is not None else {}
+        self.deterministic = deterministic
 
     def _closure(self):
         """
@@ -65,7 +74,8 @@ class Transformation(object):
         """
         return {'name': self.name,
                 'args': self.args if len(self.args) > 0 else None,
-                'kwargs': self.kwargs if len(self.kwargs) > 0 else None}
+                'kwargs': self.kwargs if len(self.kwargs) > 0 else None,
+                'deterministic': self.deterministic}
 
     @classmethod
     def from_config(cls, config):
@@ -80,7 +90,8 @@ class Transformation(object):
 
         """
         function = getattr(sys.modules[__name__], config["name"])
-        return cls(function, config['args'], config['kwargs'])
+        return cls(function, config['args'], config['kwargs'],
+                   config.get('deterministic', False))
 
 
 def scale(tensor, denominator=1):
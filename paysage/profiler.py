@@ -0,0 +1,205 @@
+import time
+from collections import OrderedDict
+from functools import wraps
+
+
+class _NullTimer(object):
+    """
+    A context manager that does nothing, used when profiling is disabled.
+
+    """
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer(object):
+    """
+    A context manager that adds the time spent in its block to a profiler.
+
+    """
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        self.profiler.add_time(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class Profiler(object):
+    """
+    Accumulates the time spent in, and the number of calls to,
+    named phases of the computation.
+
+    Samplers, models, optimizers and batch readers report to the module
+    level PROFILER through the timer and count methods (or the timed
+    decorator). When the profiler is disabled, these only check a flag,
+    so the instrumentation costs almost nothing.
+
+    """
+    def __init__(self):
+        """
+        Create a profiler.
+
+        Notes:
+            The profiler is created disabled.
+
+        Args:
+            None
+
+        Returns:
+            Profiler
+
+        """
+        self.enabled = False
+        self.times = OrderedDict()
+        self.counts = OrderedDict()
+
+    def enable(self):
+        """
+        Start recording.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        self.enabled = True
+
+    def disable(self):
+        """
+        Stop recording.
+
+        Notes:
+            The recorded times and counts are kept.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        self.enabled = False
+
+    def reset(self):
+        """
+        Discard the recorded times and counts.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        self.times = OrderedDict()
+        self.counts = OrderedDict()
+
+    def add_time(self, name, seconds):
+        """
+        Add to the time spent in a phase and count one call.
+
+        Args:
+            name (str): the name of the phase
+            seconds (float): the time spent
+
+        Returns:
+            None
+
+        """
+        self.times[name] = self.times.get(name, 0.0) + seconds
+        self.counts[name] = self.counts.get(name, 0) + 1
+
+    def count(self, name, n=1):
+        """
+        Increment a counter.
+
+        Args:
+            name (str): the name of the counter
+            n (int; optional): the amount to increment by
+
+        Returns:
+            None
+
+        """
+        if self.enabled:
+            self.counts[name] = self.counts.get(name, 0) + n
+
+    def timer(self, name):
+        """
+        Get a context manager that times its block.
+
+        Notes:
+            Timers can be nested, in which case the time of the inner
+            block is also included in the time of the outer block.
+
+        Args:
+            name (str): the name of the phase
+
+        Returns:
+            context manager
+
+        """
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name)
+
+    def summary(self):
+        """
+        Get the recorded times and counts.
+
+        Notes:
+            The total time of a phase is reported as 'time_<name>' and
+            the number of calls (or the counter value) as 'count_<name>'.
+
+        Args:
+            None
+
+        Returns:
+            summary (OrderedDict)
+
+        """
+        summary = OrderedDict()
+        for name in self.times:
+            summary['time_' + name] = self.times[name]
+        for name in self.counts:
+            summary['count_' + name] = self.counts[name]
+        return summary
+
+# the profiler that the instrumented code reports to
+PROFILER = Profiler()
+
+
+def timed(name):
+    """
+    Decorator that times each call of a function with the PROFILER.
+
+    Args:
+        name (str): the name of the phase
+
+    Returns:
+        decorator
+
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not PROFILER.enabled:
+                return func(*args, **kwargs)
+            with _Timer(PROFILER, name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
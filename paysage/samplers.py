@@ -1,6 +1,11 @@
+from math import log
+import numpy
+
 from . import backends as be
+from . import layers
 from . import schedules
 from .models import state as model_state
+from .profiler import PROFILER
 
 class AutoregressiveGammaSampler(object):
     """Sampler from an autoregressive Gamma process."""
@@ -128,10 +133,16 @@ class SequentialMC(object):
     """An accelerated sequential Monte Carlo sampler"""
     def __init__(self, model, mcsteps=1, clamped=None, updater='markov_chain',
                  beta_momentum=0.9, beta_std=0.6,
-                 schedule=schedules.Constant(initial=1.0)):
+                 schedule=schedules.Constant(initial=1.0), inplace=False):
         """
         Create a sequential Monte Carlo sampler.
 
+        Notes:
+            In the inplace mode, the sampler owns its state and a set of
+            preallocated sampling buffers so that the Monte Carlo updates
+            do not allocate new tensors. States passed to set_state are
+            copied into the owned state.
+
         Args:
             model (BoltzmannMachine)
             mcsteps (int; optional): the number of Monte Carlo steps
@@ -142,6 +153,7 @@ class SequentialMC(object):
             beta_std (float >= 0; optional): the standard deviation of the
                 inverse temperature beta
             schedule (generator; optional)
+            inplace (bool; optional): whether to update the state in place
 
         Returns:
             SequentialMC
@@ -149,8 +161,10 @@ class SequentialMC(object):
         """
         self.model = model
         self.state = None
+        self.buffers = None
+        self.inplace = inplace
         self.update_method = updater
-        self.updater = getattr(model, updater)
+        self.updater = getattr(model, updater + '_' if inplace else updater)
         self.mcsteps = mcsteps
 
         self.clamped = []
@@ -167,6 +181,9 @@ class SequentialMC(object):
 
         Notes:
             Modifies the state attribute in place.
+            In the inplace mode, the state is copied into the owned state,
+            which (along with the buffers) is only reallocated if
+            the batch size changes.
 
         Args:
             state (State): The state of the units.
@@ -175,7 +192,15 @@ class SequentialMC(object):
             None
 
         """
-        self.state = state
+        if not self.inplace:
+            self.state = state
+        elif self.state is not None and \
+            self.state.batch_size() == state.batch_size():
+            for i in range(len(state)):
+                self.state[i][:] = state[i]
+        else:
+            self.state = model_state.State.from_state(state)
+            self.buffers = self.model.get_sampling_buffers(state.batch_size())
 
     def set_state_from_visible(self, vdata):
         """
@@ -208,6 +233,7 @@ class SequentialMC(object):
 
         """
         self.state = None
+        self.buffers = None
         self.beta_sampler.beta = None
 
     def update_state(self, steps=None):
@@ -230,11 +256,17 @@ class SequentialMC(object):
                 'You must call the initialize(self, array_or_shape)'
                 +' method to set the initial state of the Markov Chain')
         STEPS = self.mcsteps if steps is None else steps
+        PROFILER.count('mc_steps', STEPS)
         for _ in range(STEPS):
             self.beta_sampler.update_beta(be.shape(self.state[0])[0])
             clamping = self.model.clamped_sampling
             self.model.set_clamped_sampling(self.clamped)
-            self.state = self.updater(1, self.state, beta=self.beta_sampler.get_beta())
+            if self.inplace:
+                self.updater(1, self.state, beta=self.beta_sampler.get_beta(),
+                             buffers=self.buffers)
+            else:
+                self.state = self.updater(1, self.state,
+                                          beta=self.beta_sampler.get_beta())
             self.model.set_clamped_sampling(clamping)
 
     def state_for_grad(self, target_layer):
@@ -330,3 +362,544 @@ class SequentialMC(object):
         sampler = cls.from_model(model, batch_size, **kwargs)
         sampler.update_state(update_steps)
         return sampler.state
+
+
+class ParallelTempering(SequentialMC):
+    """A vectorized parallel tempering (replica exchange) sampler"""
+    def __init__(self, model, mcsteps=1, clamped=None, updater='markov_chain',
+                 num_replicas=4, min_beta=0.5, inplace=False):
+        """
+        Create a parallel tempering sampler.
+
+        Notes:
+            The replicas of all temperatures are stored as one batched state,
+            with the rows of replica k in the block
+            [k * num_chains, (k+1) * num_chains).
+            Replica 0 runs at beta = 1 and the inverse temperatures decrease
+            geometrically to min_beta.
+            After each Monte Carlo step, adjacent replicas attempt to swap
+            configurations with the Metropolis acceptance probability
+            min(1, exp((beta_k - beta_{k+1}) * (E_k - E_{k+1}))).
+            Alternating steps attempt the even and odd pairs of replicas.
+
+            The state attribute holds the beta = 1 replica, so the sampler
+            can be used as the negative_phase in fit.methods.pcd.
+            The beta_sampler inherited from SequentialMC is not used.
+
+        Args:
+            model (BoltzmannMachine)
+            mcsteps (int; optional): the number of Monte Carlo steps
+            clamped (List[int]; optional): list of layers to clamp
+            updater (str; optional): method for updating the state
+            num_replicas (int; optional): the number of temperatures
+            min_beta (float in (0, 1]; optional): the smallest inverse
+                temperature
+            inplace (bool; optional): whether to update the state in place
+
+        Returns:
+            ParallelTempering
+
+        """
+        super().__init__(model, mcsteps=mcsteps, clamped=clamped,
+                         updater=updater, beta_std=0, inplace=inplace)
+        self.num_replicas = num_replicas
+        self.ladder = [min_beta ** (k / max(1, num_replicas - 1))
+                       for k in range(num_replicas)]
+        self.num_chains = None
+        self.replicas = None
+        self.betas = None
+        self.swap_offset = 0
+        self.swap_attempts = [0 for _ in range(num_replicas - 1)]
+        self.swap_accepts = [0 for _ in range(num_replicas - 1)]
+
+    def _set_cold_state(self):
+        """
+        Point the state attribute at the beta = 1 replica.
+
+        Notes:
+            Modifies the state attribute in place.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        self.state = model_state.State(
+            [t[:self.num_chains] for t in self.replicas])
+
+    def set_state(self, state):
+        """
+        Set the state of every replica.
+
+        Notes:
+            Modifies the state, replicas, and betas attributes in place.
+            Every replica starts from a copy of the given state.
+
+        Args:
+            state (State): The state of the units for each chain.
+
+        Returns:
+            None
+
+        """
+        self.num_chains = state.batch_size()
+        self.replicas = model_state.State(
+            [be.vstack([t for _ in range(self.num_replicas)]) for t in state])
+        self.betas = be.float_tensor([[b] for b in self.ladder
+                                      for _ in range(self.num_chains)])
+        if self.inplace:
+            self.buffers = self.model.get_sampling_buffers(
+                self.num_chains * self.num_replicas)
+        self._set_cold_state()
+
+    def reset(self):
+        """
+        Reset the sampler state.
+
+        Notes:
+            Modifies sampler.state attribute in place.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        super().reset()
+        self.num_chains = None
+        self.replicas = None
+        self.betas = None
+        self.swap_offset = 0
+        self.swap_attempts = [0 for _ in range(self.num_replicas - 1)]
+        self.swap_accepts = [0 for _ in range(self.num_replicas - 1)]
+
+    def _swap_replicas_(self):
+        """
+        Attempt to exchange the configurations of adjacent replicas.
+
+        Notes:
+            Modifies the replicas attribute in place.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        n = self.num_chains
+        energy = self.model.joint_energy(self.replicas)
+        for k in range(self.swap_offset, self.num_replicas - 1, 2):
+            lo = slice(k * n, (k + 1) * n)
+            hi = slice((k + 1) * n, (k + 2) * n)
+            log_ratio = (self.ladder[k] - self.ladder[k+1]) * \
+                        (energy[lo] - energy[hi])
+            accept = be.cast_float(
+                be.lesser(be.log(be.rand((n,))), log_ratio))
+            self.swap_attempts[k] += n
+            self.swap_accepts[k] += be.float_scalar(be.tsum(accept))
+
+            # w in {0, 1} so the mixtures are exact swaps
+            accept = be.unsqueeze(accept, 1)
+            for t in self.replicas:
+                swapped_lo = be.mix(accept, t[hi], t[lo])
+                swapped_hi = be.mix(accept, t[lo], t[hi])
+                t[lo] = swapped_lo
+                t[hi] = swapped_hi
+        self.swap_offset = 1 - self.swap_offset
+
+    def acceptance_rates(self):
+        """
+        Get the fraction of accepted swaps between adjacent replicas.
+
+        Args:
+            None
+
+        Returns:
+            List[float]: the acceptance rate of swaps between
+                replicas k and k+1
+
+        """
+        return [a / max(1, n) for a, n in
+                zip(self.swap_accepts, self.swap_attempts)]
+
+    def update_state(self, steps=None):
+        """
+        Update the state of the particles.
+
+        Notes:
+            Modifies the state and replicas attributes in place.
+
+        Args:
+            steps (int): the number of Monte Carlo steps
+
+        Returns:
+            None
+
+        """
+        if not self.replicas:
+            raise AttributeError(
+                'You must call the initialize(self, array_or_shape)'
+                +' method to set the initial state of the Markov Chain')
+        STEPS = self.mcsteps if steps is None else steps
+        PROFILER.count('mc_steps', STEPS)
+        for _ in range(STEPS):
+            clamping = self.model.clamped_sampling
+            self.model.set_clamped_sampling(self.clamped)
+            if self.inplace:
+                self.updater(1, self.replicas, beta=self.betas,
+                             buffers=self.buffers)
+            else:
+                self.replicas = self.updater(1, self.replicas, beta=self.betas)
+            self.model.set_clamped_sampling(clamping)
+            self._swap_replicas_()
+        self._set_cold_state()
+
+
+class PackedPersistentMC(SequentialMC):
+    """A sequential Monte Carlo sampler with a pool of bit-packed persistent chains"""
+    def __init__(self, model, batch_size=None, mcsteps=1, clamped=None,
+                 updater='markov_chain', beta_momentum=0.9, beta_std=0.6,
+                 schedule=schedules.Constant(initial=1.0), inplace=False):
+        """
+        Create a sampler with a pool of packed persistent chains.
+
+        Notes:
+            The pool stores the units of the binary layers (Bernoulli and
+            one hot) with 1 bit per unit (see PackedState), so it can hold
+            many more chains than a float state in the same memory.
+            Each call to update_state advances the next block of batch_size
+            chains, cycling through the pool: the block is unpacked into the
+            state attribute, updated, and packed back into the pool.
+            The state attribute holds the block that was updated last,
+            so the sampler can be used as the negative_phase in
+            fit.methods.pcd.
+            The inverse temperatures of the beta_sampler are shared
+            by the blocks.
+
+        Args:
+            model (BoltzmannMachine)
+            batch_size (int; optional): the number of chains to update at
+                a time. If None, updates the whole pool.
+            mcsteps (int; optional): the number of Monte Carlo steps
+            clamped (List[int]; optional): list of layers to clamp
+            updater (str; optional): method for updating the state
+            beta_momentum (float in [0,1]; optional): autoregressive coefficient
+                the inverse temperature of beta
+            beta_std (float >= 0; optional): the standard deviation of the
+                inverse temperature beta
+            schedule (generator; optional)
+            inplace (bool; optional): whether to update the state in place
+
+        Returns:
+            PackedPersistentMC
+
+        """
+        super().__init__(model, mcsteps=mcsteps, clamped=clamped,
+                         updater=updater, beta_momentum=beta_momentum,
+                         beta_std=beta_std, schedule=schedule, inplace=inplace)
+        self.batch_size = batch_size
+        self.binary = [isinstance(layer, (layers.BernoulliLayer,
+                                          layers.OneHotLayer))
+                       for layer in model.layers]
+        self.pool = None
+        self.block = None
+        self.block_updated = False
+
+    def _load_block(self, start):
+        """
+        Unpack a block of chains from the pool into the state.
+
+        Notes:
+            Modifies the state and block attributes in place.
+
+        Args:
+            start (int): the first chain of the block
+
+        Returns:
+            None
+
+        """
+        num_chains = self.pool.batch_size()
+        batch_size = num_chains if self.batch_size is None else self.batch_size
+        stop = min(num_chains, start + batch_size)
+        self.block = (start, stop)
+        self.block_updated = False
+        super().set_state(self.pool.unpack_range(start, stop))
+
+    def set_pool(self, pool, start=0):
+        """
+        Set the pool of chains.
+
+        Notes:
+            Modifies the pool, state, and block attributes in place.
+
+        Args:
+            pool (PackedState): the packed chains
+            start (int; optional): the first chain of the next block to update
+
+        Returns:
+            None
+
+        """
+        self.pool = pool
+        self._load_block(start)
+
+    def set_state(self, state):
+        """
+        Set the pool of chains from a state.
+
+        Notes:
+            Modifies the pool, state, and block attributes in place.
+
+        Args:
+            state (State): The state of the units for each chain.
+
+        Returns:
+            None
+
+        """
+        self.set_pool(model_state.PackedState.from_state(state, self.binary))
+
+    def reset(self):
+        """
+        Reset the sampler state.
+
+        Notes:
+            Modifies sampler.state attribute in place.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        super().reset()
+        self.pool = None
+        self.block = None
+        self.block_updated = False
+
+    def update_state(self, steps=None):
+        """
+        Update the next block of chains.
+
+        Notes:
+            Modifies the state, pool, and block attributes in place.
+            Calls the beta_sampler.update_beta() method.
+
+        Args:
+            steps (int): the number of Monte Carlo steps
+
+        Returns:
+            None
+
+        """
+        if self.pool is None:
+            raise AttributeError(
+                'You must call the initialize(self, array_or_shape)'
+                +' method to set the initial state of the Markov Chain')
+        if self.block_updated:
+            start = self.block[1] if self.block[1] < self.pool.batch_size() else 0
+            self._load_block(start)
+        super().update_state(steps)
+        self.pool.set_range_(self.block[0], self.block[1], self.state)
+        self.block_updated = True
+
+    @classmethod
+    def from_model(cls, model, batch_size, num_chains=None, **kwargs):
+        """
+        Create a sampler from a model object.
+
+        Notes:
+            The pool is built one block at a time, so the chains are never
+            all held as floats.
+
+        Args:
+            model: a BoltzmannMachine object
+            batch_size: the number of chains to update at a time
+            num_chains (int; optional): the number of chains in the pool.
+                If None, equals batch_size.
+            kwargs (optional)
+
+        Returns:
+            sampler
+
+        """
+        tmp = cls(model, batch_size=batch_size, **kwargs)
+        num_chains = batch_size if num_chains is None else num_chains
+        tmp.set_pool(model_state.PackedState.concatenate([
+            model_state.PackedState.from_state(
+                model_state.State.from_model_envelope(
+                    min(batch_size, num_chains - start), model), tmp.binary)
+            for start in range(0, num_chains, batch_size)]))
+        return tmp
+
+
+class AnnealedImportanceSampler(object):
+    """
+    Estimate the log partition function of a model with annealed
+    importance sampling (AIS).
+
+    The chains are annealed from the uniform distribution at beta = 0 to
+    the model at beta = 1 through the distributions p_beta ~ exp(-beta E),
+    where E is the joint energy of the model.
+
+    """
+    def __init__(self, model, num_chains=1000, num_steps=1000, schedule=None,
+                 chunk_size=None, mcsteps=1):
+        """
+        Create an annealed importance sampler.
+
+        Notes:
+            The chains are run as a single batched state using the in-place
+            markov_chain_ updater with a tensor of inverse temperatures.
+            If chunk_size is given, the chains are run in chunks of at most
+            chunk_size chains so that the memory use is bounded.
+            Only models of Bernoulli layers are supported, because the
+            distribution at beta = 0 must be normalizable.
+
+        Args:
+            model (BoltzmannMachine)
+            num_chains (int; optional): the number of annealing chains
+            num_steps (int; optional): the number of annealing steps
+            schedule (Schedule; optional): the schedule of the inverse
+                temperatures, starting at 0 and increasing to 1. The values
+                are clipped to [0, 1], and the first and last values are
+                set to 0 and 1. If None, a linear schedule is used.
+            chunk_size (int; optional): the largest number of chains to
+                run at once. If None, all of the chains are run at once.
+            mcsteps (int; optional): the number of Monte Carlo steps
+                at each inverse temperature
+
+        Returns:
+            AnnealedImportanceSampler
+
+        """
+        for layer in model.layers:
+            if not isinstance(layer, layers.BernoulliLayer):
+                raise ValueError("AIS requires a model of Bernoulli layers")
+        self.model = model
+        self.num_chains = num_chains
+        self.num_steps = num_steps
+        if schedule is None:
+            schedule = schedules.Linear(initial=0.0, delta=-1.0/num_steps)
+        self.schedule = schedule
+        self.chunk_size = chunk_size if chunk_size is not None else num_chains
+        self.mcsteps = mcsteps
+        self.log_weights = None
+
+    def get_betas(self):
+        """
+        Get the inverse temperatures of the annealing steps.
+
+        Args:
+            None
+
+        Returns:
+            betas (numpy array (num_steps + 1,))
+
+        """
+        schedule = self.schedule.copy()
+        schedule.reset()
+        betas = numpy.array([next(schedule) for _ in range(self.num_steps + 1)],
+                            dtype=numpy.float64)
+        betas = numpy.clip(betas, 0, 1)
+        betas[0] = 0
+        betas[-1] = 1
+        return betas
+
+    def base_log_partition_function(self):
+        """
+        Compute the log partition function at beta = 0.
+
+        Args:
+            None
+
+        Returns:
+            log_Z (float)
+
+        """
+        return sum(layer.len for layer in self.model.layers) * log(2)
+
+    def _anneal(self, num_chains, betas):
+        """
+        Anneal a batch of chains and compute their log importance weights.
+
+        Args:
+            num_chains (int): the number of chains
+            betas (numpy array (num_steps + 1,)): the inverse temperatures
+
+        Returns:
+            log_weights (tensor (num_chains,))
+
+        """
+        # draw the chains from the uniform distribution at beta = 0
+        state = model_state.State(
+            [be.cast_float(be.rand((num_chains, layer.len)) < 0.5)
+             for layer in self.model.layers])
+        buffers = self.model.get_sampling_buffers(num_chains)
+        ones = be.ones((num_chains, 1))
+        log_weights = be.zeros((num_chains,))
+
+        for k in range(1, len(betas)):
+            # log w += log p*_k(x) - log p*_(k-1)(x)
+            be.add_(float(betas[k-1] - betas[k]) * self.model.joint_energy(state),
+                    log_weights)
+            self.model.markov_chain_(self.mcsteps, state,
+                                     beta=float(betas[k]) * ones,
+                                     buffers=buffers)
+        return log_weights
+
+    def run(self):
+        """
+        Run the annealing chains and estimate the log partition function.
+
+        Notes:
+            Stores the log importance weights of the chains in the
+            log_weights attribute.
+
+        Args:
+            None
+
+        Returns:
+            log_Z (float): the estimate of the log partition function
+
+        """
+        betas = self.get_betas()
+        clamping = self.model.clamped_sampling
+        self.model.set_clamped_sampling([])
+        log_weights = []
+        try:
+            for start in range(0, self.num_chains, self.chunk_size):
+                num_chains = min(self.chunk_size, self.num_chains - start)
+                log_weights.append(
+                    be.to_numpy_array(self._anneal(num_chains, betas)))
+        finally:
+            self.model.set_clamped_sampling(clamping)
+        self.log_weights = numpy.concatenate(log_weights).astype(numpy.float64)
+        return self.log_partition_function()
+
+    def log_partition_function(self):
+        """
+        Compute the estimate of the log partition function from the
+        stored log importance weights.
+
+        log Z = log Z_0 + log(mean(w))
+
+        Args:
+            None
+
+        Returns:
+            log_Z (float)
+
+        """
+        if self.log_weights is None:
+            raise AttributeError(
+                'You must call the run() method to compute the weights')
+        return self.base_log_partition_function() + \
+            float(numpy.logaddexp.reduce(self.log_weights)) - \
+            log(len(self.log_weights))
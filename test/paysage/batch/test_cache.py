@@ -0,0 +1,101 @@
+import numpy as np
+
+from paysage import batch
+from paysage import backends as be
+from paysage import preprocess as pre
+
+import pytest
+
+def counting_transform(counter):
+    def double(tensor):
+        counter.append(len(tensor))
+        return 2 * tensor
+    return pre.Transformation(double, deterministic=True)
+
+def read_epoch(table):
+    minibatches = []
+    while True:
+        try:
+            minibatches.append(be.to_numpy_array(be.copy_tensor(table.get())))
+        except StopIteration:
+            break
+    return minibatches
+
+@pytest.mark.parametrize("cache_mem", [1.0, 0])
+def test_in_memory_table_cache(cache_mem):
+    num_rows = 1000
+    num_cols = 10
+    tensor = be.rand((num_rows, num_cols))
+    expected = 2 * be.to_numpy_array(tensor)
+
+    counter = []
+    data = batch.InMemoryTable(tensor, 300, counting_transform(counter),
+                               cache_mem=cache_mem)
+    counter.clear()
+
+    for i_loop in range(3):
+        rows = np.concatenate(read_epoch(data))
+        assert np.allclose(rows, expected)
+    # only the rows that were not stored by the test call are transformed
+    assert sum(counter) == num_rows - 300
+    # the cache is spilled to a file if it does not fit into memory
+    assert isinstance(data.cache.values, np.memmap) == (cache_mem == 0)
+    data.close()
+
+def test_shuffled_table_cache():
+    num_rows = 1000
+    num_cols = 10
+    tensor = be.rand((num_rows, num_cols))
+    counter = []
+    transform = counting_transform(counter)
+
+    data = batch.InMemoryTable(tensor, 300, transform, shuffle=True, seed=3)
+    reference = batch.InMemoryTable(tensor, 300, pre.Transformation(double_tensor),
+                                    shuffle=True, seed=3)
+    for i_loop in range(3):
+        for cached, computed in zip(read_epoch(data), read_epoch(reference)):
+            assert np.allclose(cached, computed)
+    assert sum(counter) <= 2 * num_rows
+
+    # changing the transform discards the stored rows
+    counter.clear()
+    data.transform = counting_transform(counter)
+    read_epoch(data)
+    assert sum(counter) == num_rows
+
+@pytest.mark.parametrize("shuffle", [False, True])
+def test_cached_rows_not_overwritten(shuffle):
+    tensor = be.rand((100, 10))
+    expected = 2 * be.to_numpy_array(tensor)
+    data = batch.InMemoryTable(tensor, 30, counting_transform([]),
+                               shuffle=shuffle)
+    read_epoch(data)
+
+    # changing a minibatch in place does not change the stored rows
+    while True:
+        try:
+            minibatch = data.get()
+        except StopIteration:
+            break
+        minibatch *= 0
+    assert np.allclose(data.cache.values, expected)
+    data.close()
+
+def double_tensor(tensor):
+    return 2 * tensor
+
+def test_nondeterministic_transform_not_cached():
+    tensor = be.rand((100, 10))
+    counter = []
+    transform = counting_transform(counter)
+    transform.deterministic = False
+    data = batch.InMemoryTable(tensor, 30, transform)
+    counter.clear()
+    read_epoch(data)
+    read_epoch(data)
+    assert sum(counter) == 200
+    assert data.cache.values is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
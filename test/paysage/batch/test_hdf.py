@@ -89,5 +89,68 @@ def test_hdf_batch():
             i_batch += 1
 
 
+def test_hdf_table_mixed_dtypes():
+    # the temporary storage files
+    store_file = tempfile.NamedTemporaryFile()
+    shuffled_file = tempfile.NamedTemporaryFile()
+
+    # create data with columns of several dtypes
+    num_rows = 1003
+    num_cols = 7
+    df_A = pd.DataFrame(np.random.rand(num_rows, num_cols))
+    df_A[num_cols] = np.arange(num_rows)
+    df_A[num_cols + 1] = np.random.rand(num_rows).astype(np.float32)
+    df_A = df_A[[num_cols] + list(range(num_cols)) + [num_cols + 1]]
+
+    # save it, and a shuffled copy
+    with pd.HDFStore(store_file.name, mode="w") as store:
+        store.put("train", df_A, format="table")
+    batch.DataShuffler(store_file.name, shuffled_file.name,
+                       allowed_mem=0.00002).shuffle()
+
+    # read them back with the HDFtable
+    batch_size = 100
+    for filename in [store_file.name, shuffled_file.name]:
+        data = batch.HDFtable(filename, "train", batch_size)
+        batches = []
+        while True:
+            try:
+                batches.append(be.to_numpy_array(data.get()))
+            except StopIteration:
+                break
+        data.close()
+
+        assert len(batches) == int(np.ceil(num_rows / batch_size))
+        ref = pd.read_hdf(filename, "train").values.astype(np.float32)
+        assert np.all(np.vstack(batches) == ref)
+
+
+def test_hdf_table_get_by_index():
+    # the temporary storage file
+    store_file = tempfile.NamedTemporaryFile()
+
+    # create data
+    num_rows = 1000
+    num_cols = 10
+    df_A = pd.DataFrame(np.arange(num_rows*num_cols).reshape(num_rows, num_cols))
+
+    # save it
+    with pd.HDFStore(store_file.name, mode="w") as store:
+        store.put("train", df_A, format="table")
+
+    data = batch.HDFtable(store_file.name, "train", 100)
+
+    # unsorted indices with duplicates, contiguous runs, and isolated rows
+    index = np.concatenate([np.arange(500, 550), [3, 999, 3],
+                            np.arange(20, 10, -1),
+                            np.random.randint(0, num_rows, size=100)])
+    batch_data = data.get_by_index(index)
+    assert np.all(be.to_numpy_array(batch_data) == df_A.values[index])
+
+    batch_data = data.get_by_index(be.long_tensor([7]))
+    assert np.all(be.to_numpy_array(batch_data) == df_A.values[[7]])
+    data.close()
+
+
 if __name__ == "__main__":
     pytest.main([__file__])
@@ -1,3 +1,5 @@
+import numpy as np
+
 from paysage import batch
 from paysage import backends as be
 
@@ -66,5 +68,61 @@ def test_in_memory_batch():
             i_batch += 1
 
 
+def test_in_memory_table_shuffle():
+    # create data
+    num_rows = 1000
+    num_cols = 10
+    tensor = be.rand((num_rows, num_cols))
+    original = be.copy_tensor(tensor)
+
+    batch_size = 300
+    data = batch.InMemoryTable(tensor, batch_size, shuffle=True, seed=7)
+    same_seed = batch.InMemoryTable(tensor, batch_size, shuffle=True, seed=7)
+
+    epochs = []
+    for i_loop in range(2):
+        rows = []
+        while True:
+            try:
+                batch_data = data.get()
+            except StopIteration:
+                break
+            assert be.allclose(batch_data, same_seed.get())
+            rows.append(be.to_numpy_array(be.copy_tensor(batch_data)))
+        with pytest.raises(StopIteration):
+            same_seed.get()
+        epochs.append(np.concatenate(rows))
+
+    # each epoch visits every row once, in a different order
+    expected = be.to_numpy_array(tensor)
+    for rows in epochs:
+        assert rows.shape == expected.shape
+        assert np.allclose(np.sort(rows, axis=0), np.sort(expected, axis=0))
+    assert not np.allclose(epochs[0], epochs[1])
+
+    # the data are not modified
+    assert be.allclose(tensor, original)
+
+
+def test_shuffled_batch_minibatches_are_not_overwritten():
+    num_rows = 2000
+    num_cols = 10
+    tensor = be.rand((num_rows, num_cols))
+
+    # keep the minibatches without copying them, like a queue does
+    with batch.in_memory_batch(tensor, 300, train_fraction=0.5,
+                               shuffle=True, seed=5) as data:
+        minibatches = []
+        while True:
+            try:
+                minibatches.append(data.get('train'))
+            except StopIteration:
+                break
+        rows = np.concatenate([be.to_numpy_array(m) for m in minibatches])
+
+    expected = be.to_numpy_array(tensor)[:num_rows // 2]
+    assert np.allclose(np.sort(rows, axis=0), np.sort(expected, axis=0))
+
+
 if __name__ == "__main__":
     pytest.main([__file__])
@@ -0,0 +1,100 @@
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+
+from paysage import batch
+from paysage import backends as be
+
+import pytest
+
+def test_memmap_table_batch():
+    # create data
+    num_rows = 10000
+    num_cols = 10
+    array = np.random.rand(num_rows, num_cols).astype(np.float32)
+
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "data.npy")
+        np.save(filename, array)
+
+        # read it back with the MemmapTable
+        batch_size = 1000
+        num_train_batches = num_rows // batch_size
+        data = batch.MemmapTable(filename, batch_size, readahead=2)
+
+        # loop through twice, checking the data
+        for i_loop in range(2):
+            i_batch = 0
+            while True:
+                # get the data
+                try:
+                    batch_data = data.get()
+                except StopIteration:
+                    assert i_batch == num_train_batches
+                    i_batch = 0
+                    break
+
+                # check it
+                assert np.allclose(be.to_numpy_array(batch_data),
+                    array[i_batch * batch_size: (i_batch + 1) * batch_size])
+
+                i_batch += 1
+
+        index = be.long_tensor([3, 10, 7])
+        assert np.allclose(be.to_numpy_array(data.get_by_index(index)),
+                           array[[3, 10, 7]])
+        data.close()
+
+def test_memmap_raw_file():
+    num_rows = 100
+    num_cols = 5
+    array = np.arange(num_rows*num_cols, dtype=np.float64).reshape(num_rows, num_cols)
+
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "data.bin")
+        array.tofile(filename)
+
+        data = batch.MemmapTable(filename, 30, shape=(num_rows, num_cols),
+                                 dtype=np.float64, start=20, stop=80)
+        assert data.nrows == 60
+        batches = []
+        while True:
+            try:
+                batches.append(be.to_numpy_array(data.get()))
+            except StopIteration:
+                break
+        assert np.allclose(np.concatenate(batches), array[20:80])
+        data.close()
+
+def test_memmap_batch_from_hdf():
+    # the temporary storage file
+    store_file = tempfile.NamedTemporaryFile()
+
+    # create data
+    num_rows = 1000
+    num_cols = 10
+    df_A = pd.DataFrame(np.random.rand(num_rows, num_cols))
+
+    # save it
+    with pd.HDFStore(store_file.name, mode="w", format="table") as store:
+        store.append("train", df_A)
+
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "data.npy")
+        batch.hdf_to_npy(store_file.name, "train", filename, chunksize=300)
+        assert np.allclose(np.load(filename), df_A.values)
+
+        # split the file into train and validate sets
+        batch_size = 100
+        with batch.memmap_batch(filename, batch_size, train_fraction=0.8) as data:
+            assert data.batch['train'].nrows == 800
+            assert data.batch['validate'].nrows == 200
+            assert np.allclose(be.to_numpy_array(data.get('validate')),
+                               df_A.values[800:900])
+
+    store_file.close()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
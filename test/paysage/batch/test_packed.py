@@ -0,0 +1,70 @@
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+
+from paysage import batch
+from paysage import backends as be
+
+import pytest
+
+def read_epoch(table):
+    minibatches = []
+    while True:
+        try:
+            minibatches.append(be.to_numpy_array(be.copy_tensor(table.get())))
+        except StopIteration:
+            break
+    return np.concatenate(minibatches)
+
+def test_packed_table_batch():
+    # create data
+    num_rows = 1000
+    num_cols = 20
+    tensor = be.float_tensor(be.rand((num_rows, num_cols)) < 0.5)
+    expected = be.to_numpy_array(tensor)
+
+    data = batch.PackedTable(be.pack_bits(tensor), num_cols, 300)
+    assert data.ncols == num_cols
+    for i_loop in range(2):
+        assert np.allclose(read_epoch(data), expected)
+
+    index = be.long_tensor([3, 10, 7])
+    assert np.allclose(be.to_numpy_array(data.get_by_index(index)),
+                       expected[[3, 10, 7]])
+
+    # a shuffled table visits each row once per epoch
+    shuffled = batch.PackedTable(be.pack_bits(tensor), num_cols, 300,
+                                 shuffle=True, seed=1)
+    rows = read_epoch(shuffled)
+    assert np.allclose(np.sort(rows, axis=0), np.sort(expected, axis=0))
+
+def test_packed_npy_files():
+    # the temporary storage file
+    store_file = tempfile.NamedTemporaryFile()
+
+    num_rows = 500
+    num_cols = 13
+    values = (np.random.rand(num_rows, num_cols) < 0.5).astype(np.float32)
+    with pd.HDFStore(store_file.name, mode="w", format="table") as store:
+        store.append("train", pd.DataFrame(values))
+
+    with tempfile.TemporaryDirectory() as directory:
+        saved = os.path.join(directory, "saved.npy")
+        converted = os.path.join(directory, "converted.npy")
+        batch.save_packed(saved, be.float_tensor(values))
+        num_units = batch.hdf_to_packed_npy(store_file.name, "train", converted,
+                                            chunksize=120)
+        assert num_units == num_cols
+        assert np.array_equal(np.load(saved), np.load(converted))
+
+        data = batch.PackedTable.from_npy(converted, num_units, 100, start=100)
+        assert data.nrows == num_rows - 100
+        assert np.allclose(read_epoch(data), values[100:])
+        data.close()
+
+    store_file.close()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,87 @@
+from paysage import batch
+from paysage import backends as be
+
+import pytest
+
+def test_prefetch_table():
+    # create data
+    num_rows = 10000
+    num_cols = 10
+    tensor = be.rand((num_rows, num_cols))
+
+    # batch it with a prefetching InMemoryTable
+    batch_size = 1000
+    num_train_batches = num_rows // batch_size
+    data = batch.PrefetchTable(batch.InMemoryTable(tensor, batch_size),
+                               queue_size=3)
+    assert data.output_batch_size == batch_size
+
+    # loop through thrice, checking the data
+    for i_loop in range(3):
+        i_batch = 0
+        while True:
+            # get the data
+            try:
+                batch_data = data.get()
+            except StopIteration:
+                assert i_batch == num_train_batches
+                break
+
+            # check it
+            assert be.allclose(batch_data,
+                tensor[i_batch * batch_size: (i_batch + 1) * batch_size])
+
+            i_batch += 1
+
+    # resetting in the middle of the data starts from the beginning
+    data.get()
+    data.get()
+    data.reset_generator()
+    assert be.allclose(data.get(), tensor[:batch_size])
+
+    # reading by index does not disturb the prefetched minibatches
+    assert be.allclose(data.get_by_index([0, 5]), tensor[[0, 5]])
+    assert be.allclose(data.get(), tensor[batch_size: 2 * batch_size])
+
+    data.close()
+
+
+def test_prefetch_batch():
+    # create data
+    num_rows = 10000
+    num_cols = 10
+    tensor = be.rand((num_rows, num_cols))
+
+    # read it back with a prefetching Batch
+    batch_size = 1000
+    num_train_batches = num_rows // batch_size
+    in_memory = batch.Batch({'train': batch.InMemoryTable(tensor, batch_size),
+                             'validate': batch.InMemoryTable(tensor, batch_size)})
+    with batch.prefetch_batch(in_memory) as data:
+        assert data.nrows == num_rows
+        assert data.ncols == num_cols
+
+        # loop through twice, checking the data
+        for i_loop in range(2):
+            i_batch = 0
+            while True:
+                # get the data
+                try:
+                    batch_data_train = data.get("train")
+                    batch_data_validate = data.get("validate")
+                except StopIteration:
+                    assert i_batch == num_train_batches
+                    data.reset_generator("all")
+                    break
+
+                # check it
+                assert be.allclose(batch_data_train,
+                    tensor[i_batch * batch_size: (i_batch + 1) * batch_size])
+                assert be.allclose(batch_data_validate,
+                    tensor[i_batch * batch_size: (i_batch + 1) * batch_size])
+
+                i_batch += 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -57,5 +57,56 @@ def test_shuffle():
     assert np.abs(diff_dist_std / (num_rows / np.sqrt(6)) - 1) < 0.05
 
 
+def test_shuffle_workers():
+    # create temporary files
+    file_original = tempfile.NamedTemporaryFile()
+    file_shuffle = tempfile.NamedTemporaryFile()
+    file_shuffle_repeat = tempfile.NamedTemporaryFile()
+
+    # create data
+    num_rows = 5000
+    df_A = pd.DataFrame(np.arange(num_rows*3).reshape(num_rows, 3))
+    df_B = pd.DataFrame(np.arange(num_rows))
+
+    # save it
+    with pd.HDFStore(file_original.name, mode='w') as store:
+        store.put("A", df_A, format='table')
+        store.put("B", df_B, format='table')
+
+    # shuffle it twice, with an artificially low memory limit
+    for filename in [file_shuffle.name, file_shuffle_repeat.name]:
+        shuffler = batch.DataShuffler(file_original.name, filename,
+                                      allowed_mem=0.00005, num_workers=2)
+        shuffler.shuffle()
+
+    df_As = pd.read_hdf(file_shuffle.name, "A")
+    df_Bs = pd.read_hdf(file_shuffle.name, "B")
+
+    # check the two shuffles are consistent permutations
+    assert (df_As.index == df_Bs.index).all()
+    assert (df_As[0] // 3 == df_Bs[0]).all()
+    assert sorted(df_Bs[0]) == list(range(num_rows))
+    assert (df_Bs[0].values == np.arange(num_rows)).sum() < 5
+
+    # check that the shuffle is deterministic
+    assert (df_Bs == pd.read_hdf(file_shuffle_repeat.name, "B")).all().all()
+
+
+def test_reassemble_empty_table():
+    file_original = tempfile.NamedTemporaryFile()
+    file_shuffle = tempfile.NamedTemporaryFile()
+
+    with pd.HDFStore(file_original.name, mode='w') as store:
+        store.put("A", pd.DataFrame(np.arange(10)), format='table')
+
+    shuffler = batch.DataShuffler(file_original.name, file_shuffle.name)
+    # a table without rows has nothing to reassemble
+    shuffler.reassemble_table("A", 0, [], [])
+    assert "/A" not in shuffler.shuffled_store.keys()
+    shuffler.store.close()
+    shuffler.shuffled_store.close()
+    shuffler.chunk_store.close()
+
+
 if __name__ == "__main__":
     pytest.main([__file__])
@@ -0,0 +1,89 @@
+import os
+import tempfile
+
+from paysage import backends as be
+from paysage import batch
+from paysage import layers
+from paysage.models import BoltzmannMachine
+from paysage.metrics import ProgressMonitor
+from paysage.metrics import generator_metrics as M
+from paysage import fit
+from paysage import optimizers
+from paysage import samplers
+from paysage import schedules
+
+import pytest
+
+num_visible_units = 20
+num_hidden_units = 10
+num_samples = 100
+batch_size = 20
+
+def _trainer(data):
+    rbm = BoltzmannMachine([layers.BernoulliLayer(num_visible_units),
+                            layers.BernoulliLayer(num_hidden_units)])
+    rbm.initialize(data)
+    sgd = fit.SGD(rbm, data)
+    sgd.monitor = ProgressMonitor(generator_metrics=[M.ReconstructionError()])
+    opt = optimizers.ADAM(stepsize=schedules.PowerLawDecay(initial=0.01,
+                                                           coefficient=0.1))
+    return sgd, opt
+
+def _train(trainer, opt, num_epochs, negative_phase=None, **kwargs):
+    if negative_phase is not None:
+        kwargs['negative_phase_sampler'] = negative_phase(trainer.model)
+    trainer.train(opt, num_epochs, method=fit.pcd, verbose=False, **kwargs)
+    return kwargs.get('negative_phase_sampler')
+
+def _resume_from_checkpoint(negative_phase=None):
+    be.set_seed()
+    data = be.cast_float(be.rand((num_samples, num_visible_units)) < 0.5)
+    data_batch = batch.in_memory_batch(data, batch_size, train_fraction=0.6)
+
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, 'checkpoint.h5')
+
+        # train without interruption
+        be.set_seed()
+        sgd, opt = _trainer(data_batch)
+        sampler = _train(sgd, opt, 2, negative_phase)
+        weights = sgd.model.connections[0].weights.W()
+
+        # the same run, stopped after epoch 1
+        be.set_seed()
+        stopped, stopped_opt = _trainer(data_batch)
+        _train(stopped, stopped_opt, 1, negative_phase,
+               checkpoint_filename=filename)
+
+        # a new model resumes from the checkpoint
+        be.set_seed(1)
+        resumed, resumed_opt = _trainer(data_batch)
+        resumed_sampler = _train(resumed, resumed_opt, 2, negative_phase,
+                                 resume_from=filename)
+
+    assert len(resumed.monitor.memory) == 2
+    assert be.allclose(resumed.model.connections[0].weights.W(), weights)
+    assert be.allclose(resumed_opt.memory.mean_gradient.weights[0][0].matrix,
+                       opt.memory.mean_gradient.weights[0][0].matrix)
+    data_batch.close()
+    return sampler, resumed_sampler
+
+def test_resume_from_checkpoint():
+    _resume_from_checkpoint()
+
+def test_resume_packed_chains_from_checkpoint():
+    _resume_from_checkpoint(lambda model: samplers.PackedPersistentMC.from_model(
+        model, batch_size, num_chains=3*batch_size, beta_std=0))
+
+def test_resume_parallel_tempering_from_checkpoint():
+    sampler, resumed_sampler = _resume_from_checkpoint(
+        lambda model: samplers.ParallelTempering.from_model(
+            model, batch_size, num_replicas=3))
+    # there is an odd number of swaps in each epoch
+    assert resumed_sampler.swap_offset == sampler.swap_offset
+    assert resumed_sampler.swap_attempts == sampler.swap_attempts
+    assert resumed_sampler.swap_accepts == sampler.swap_accepts
+    assert be.allclose(resumed_sampler.replicas[0], sampler.replicas[0])
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,121 @@
+import tempfile
+
+from paysage import backends as be
+from paysage import batch
+from paysage import layers
+from paysage.models import BoltzmannMachine
+from paysage import fit
+from paysage import optimizers
+from paysage import preprocess as pre
+
+import pytest
+
+def _pretrain(cache, shuffle=False):
+    num_visible_units = 12
+    num_hidden_units = [8, 6, 4]
+    num_samples = 60
+    batch_size = 10
+
+    be.set_seed()
+    data = be.cast_float(be.rand((num_samples, num_visible_units)) < 0.5)
+    data_batch = batch.in_memory_batch(data, batch_size, train_fraction=0.5,
+                                       shuffle=shuffle, seed=4)
+
+    dbm = BoltzmannMachine([layers.BernoulliLayer(num_visible_units)] +
+                           [layers.BernoulliLayer(n) for n in num_hidden_units])
+    pretrainer = fit.LayerwisePretrain(dbm, data_batch)
+    pretrainer.train(optimizers.ADAM(), 1, method=fit.pcd, verbose=False,
+                     cache=cache)
+
+    # the transforms of the data are restored
+    if not shuffle:
+        assert be.allclose(data_batch.get('train'), data[:batch_size])
+    data_batch.close()
+    return dbm
+
+def test_cache_representation():
+    num_visible_units = 12
+    num_hidden_units = 8
+    num_samples = 60
+    batch_size = 10
+
+    be.set_seed()
+    data = be.cast_float(be.rand((num_samples, num_visible_units)) < 0.5)
+    data_batch = batch.in_memory_batch(data, batch_size, train_fraction=0.5)
+
+    rbm = BoltzmannMachine([layers.BernoulliLayer(num_visible_units),
+                            layers.BernoulliLayer(num_hidden_units)])
+    rbm.initialize(data_batch, 'glorot_normal')
+    pretrainer = fit.LayerwisePretrain(rbm, data_batch)
+
+    for cache in ['memory', 'memmap']:
+        with tempfile.TemporaryDirectory() as directory:
+            cached = pretrainer._cache_representation(rbm, data_batch, cache,
+                                                      directory)
+            # the cached minibatches match the propagated data
+            for key in data_batch.modes:
+                data_batch.reset_generator(key)
+                while True:
+                    try:
+                        v_data = data_batch.get(key)
+                    except StopIteration:
+                        break
+                    assert be.allclose(cached.get(key),
+                                       pretrainer._propagate(rbm, v_data))
+                with pytest.raises(StopIteration):
+                    cached.get(key)
+            cached.close()
+    data_batch.close()
+
+def test_layerwise_cache():
+    reference = _pretrain(None)
+    for cache in ['memory', 'memmap']:
+        dbm = _pretrain(cache)
+        # the first layer is trained before anything is cached
+        assert be.allclose(dbm.connections[0].weights.W(),
+                           reference.connections[0].weights.W())
+        # the deeper layers draw their random numbers in a different order,
+        # so only their shapes are compared (see test_cache_representation)
+        for i in range(1, dbm.num_connections):
+            assert be.shape(dbm.connections[i].weights.W()) == \
+                be.shape(reference.connections[i].weights.W())
+
+def test_layerwise_cache_shuffled():
+    # the cached tables shuffle like the data, with seeded generators
+    first = _pretrain('memory', shuffle=True)
+    second = _pretrain('memory', shuffle=True)
+    for i in range(first.num_connections):
+        assert be.allclose(first.connections[i].weights.W(),
+                           second.connections[i].weights.W())
+
+def test_cache_representation_shuffle():
+    be.set_seed()
+    data = be.cast_float(be.rand((60, 12)) < 0.5)
+    rbm = BoltzmannMachine([layers.BernoulliLayer(12), layers.BernoulliLayer(8)])
+    for shuffle in [False, True]:
+        data_batch = batch.in_memory_batch(data, 10, train_fraction=0.5,
+                                           shuffle=shuffle, seed=4)
+        rbm.initialize(data_batch, 'glorot_normal')
+        pretrainer = fit.LayerwisePretrain(rbm, data_batch)
+        cached = pretrainer._cache_representation(rbm, data_batch, 'memory', None)
+        for key in data_batch.modes:
+            assert cached.batch[key].shuffle == data_batch.batch[key].shuffle
+        cached.close()
+        data_batch.close()
+
+def test_layerwise_cache_requires_deterministic_transform():
+    be.set_seed()
+    data = be.cast_float(be.rand((60, 12)) < 0.5)
+    data_batch = batch.in_memory_batch(
+        data, 10, train_fraction=0.5,
+        transform=pre.Transformation(pre.binarize_color))
+    dbm = BoltzmannMachine([layers.BernoulliLayer(12), layers.BernoulliLayer(8),
+                            layers.BernoulliLayer(4)])
+    pretrainer = fit.LayerwisePretrain(dbm, data_batch)
+    with pytest.raises(AssertionError):
+        pretrainer.train(optimizers.ADAM(), 1, method=fit.pcd, verbose=False,
+                         cache='memory')
+    data_batch.close()
+
+if __name__ == "__main__":
+    pytest.main([__file__])
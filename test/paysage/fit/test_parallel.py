@@ -0,0 +1,58 @@
+from paysage import backends as be
+from paysage import batch
+from paysage import layers
+from paysage.models import BoltzmannMachine
+from paysage import fit
+from paysage import optimizers
+
+import pytest
+
+def _train(asynchronous):
+    num_visible_units = 20
+    num_hidden_units = 10
+    num_samples = 120
+    batch_size = 20
+
+    be.set_seed()
+    data = be.cast_float(be.rand((num_samples, num_visible_units)) < 0.3)
+    data_batch = batch.in_memory_batch(data, batch_size, train_fraction=0.5)
+
+    rbm = BoltzmannMachine([layers.BernoulliLayer(num_visible_units),
+                            layers.BernoulliLayer(num_hidden_units)])
+    rbm.initialize(data_batch)
+    initial = be.copy_tensor(rbm.connections[0].weights.W())
+
+    trainer = fit.DataParallelSGD(rbm, data_batch, num_workers=2,
+                                  asynchronous=asynchronous)
+    trainer.monitor = None
+    trainer.train(optimizers.ADAM(), 2, method=fit.pcd, verbose=False)
+
+    # the parameters in shared memory were updated by the training
+    assert rbm.flat_params is not None
+    assert not be.allclose(initial, rbm.connections[0].weights.W())
+    assert trainer.workers is None
+    data_batch.close()
+    return rbm.connections[0].weights.W()
+
+def test_synchronous():
+    _train(False)
+
+def test_asynchronous():
+    _train(True)
+
+def test_synchronous_seeded():
+    # the seeds of the workers are drawn from the backend generator
+    assert be.allclose(_train(False), _train(False))
+
+def test_shared_flat_parameters():
+    rbm = BoltzmannMachine([layers.BernoulliLayer(5),
+                            layers.BernoulliLayer(3)])
+    rbm.connections[0].weights.params.matrix[:] = be.randn((5, 3))
+    weights = be.copy_tensor(rbm.connections[0].weights.W())
+    vector = be.shared_zeros((rbm.num_parameters(),))
+    rbm.use_flat_parameters(vector)
+    assert rbm.flat_params.vector is vector
+    assert be.allclose(rbm.connections[0].weights.W(), weights)
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,52 @@
+from paysage import backends as be
+from paysage import batch
+from paysage import layers
+from paysage.models import BoltzmannMachine
+from paysage.metrics import ProgressMonitor
+from paysage.metrics import generator_metrics as M
+
+import pytest
+
+def test_fantasy_pool():
+    num_visible_units = 20
+    num_hidden_units = 10
+    num_samples = 100
+    batch_size = 15
+    pool_size = 40
+
+    be.set_seed()
+    data = be.cast_float(be.rand((num_samples, num_visible_units)) < 0.5)
+    data_batch = batch.in_memory_batch(data, batch_size, train_fraction=0.5)
+
+    rbm = BoltzmannMachine([layers.BernoulliLayer(num_visible_units),
+                            layers.BernoulliLayer(num_hidden_units)])
+    rbm.initialize(data_batch)
+
+    monitor = ProgressMonitor(generator_metrics=[M.EnergyCoefficient()],
+                              fantasy_pool_size=pool_size,
+                              fantasy_pool_steps=2)
+
+    monitor.epoch_update(data_batch, rbm, store=True)
+    pool = monitor.fantasy_pool
+    assert be.shape(pool.state[0]) == (pool_size, num_visible_units)
+    assert len(monitor.memory) == 1
+    assert monitor.memory[0]['EnergyCoefficient'] is not None
+
+    # the pool persists across epochs
+    previous = be.copy_tensor(pool.state[0])
+    monitor.epoch_update(data_batch, rbm, store=True)
+    assert monitor.fantasy_pool is pool
+    assert not be.allclose(previous, monitor.fantasy_pool.state[0])
+
+    # slices wrap around the end of the pool
+    monitor.fantasy_pool_position = pool_size - 5
+    particles = monitor.get_fantasy_particles(10)
+    assert be.allclose(particles[0][:5], pool.state[0][-5:])
+    assert be.allclose(particles[0][5:], pool.state[0][:5])
+    assert monitor.fantasy_pool_position == 5
+
+    monitor.reset_fantasy_pool()
+    assert monitor.fantasy_pool is None
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,108 @@
+import itertools
+import numpy
+
+from paysage import backends as be
+from paysage import batch
+from paysage import layers
+from paysage.models import BoltzmannMachine
+from paysage.models.state import State
+from paysage.metrics import ProgressMonitor
+from paysage.metrics import generator_metrics as M
+
+import pytest
+
+def random_rbm(num_visible_units, num_hidden_units, center=False):
+    vis_layer = layers.BernoulliLayer(num_visible_units, center=center)
+    hid_layer = layers.BernoulliLayer(num_hidden_units, center=center)
+    rbm = BoltzmannMachine([vis_layer, hid_layer])
+    rbm.connections[0].weights.params.matrix[:] = \
+        be.randn((num_visible_units, num_hidden_units))
+    vis_layer.params.loc[:] = be.randn((num_visible_units,))
+    hid_layer.params.loc[:] = be.randn((num_hidden_units,))
+    if center:
+        vis_layer.centering_vec = be.rand((num_visible_units,))
+        hid_layer.centering_vec = be.rand((num_hidden_units,))
+    return rbm
+
+def all_states(num_units):
+    return numpy.array(list(itertools.product([0, 1], repeat=num_units)),
+                       dtype=numpy.float32)
+
+def test_exact_log_partition_function():
+    num_visible_units = 6
+    num_hidden_units = 4
+
+    be.set_seed()
+
+    for center in [False, True]:
+        rbm = random_rbm(num_visible_units, num_hidden_units, center)
+
+        # brute force sum over the joint states
+        vis = all_states(num_visible_units)
+        hid = all_states(num_hidden_units)
+        state = State([be.float_tensor(numpy.repeat(vis, len(hid), axis=0)),
+                       be.float_tensor(numpy.tile(hid, (len(vis), 1)))])
+        energy = be.to_numpy_array(rbm.joint_energy(state)).astype(numpy.float64)
+        log_Z = numpy.logaddexp.reduce(-energy)
+
+        assert numpy.isclose(log_Z, rbm.exact_log_partition_function())
+        assert numpy.isclose(log_Z, rbm.exact_log_partition_function(
+            index=0, max_elements=50))
+        assert numpy.isclose(log_Z, rbm.exact_log_partition_function(
+            max_elements=20, num_workers=2))
+
+        # the probabilities of the visible states sum to one
+        log_likelihood = rbm.exact_log_likelihood(be.float_tensor(vis))
+        assert numpy.isclose(
+            numpy.exp(be.to_numpy_array(log_likelihood)).sum(), 1, atol=1e-5)
+
+def test_exact_log_likelihood_metric():
+    num_visible_units = 8
+    num_hidden_units = 5
+    num_samples = 60
+    batch_size = 10
+
+    be.set_seed()
+    data = be.cast_float(be.rand((num_samples, num_visible_units)) < 0.5)
+    data_batch = batch.in_memory_batch(data, batch_size, train_fraction=0.5)
+
+    rbm = random_rbm(num_visible_units, num_hidden_units)
+    metric = M.ExactLogLikelihood()
+    monitor = ProgressMonitor(generator_metrics=[metric])
+    monitor.epoch_update(data_batch, rbm, store=True, reset=False)
+
+    log_Z = rbm.exact_log_partition_function()
+    assert numpy.isclose(metric.log_Z, log_Z)
+
+    validation = data_batch.batch['validate'].tensor
+    expected = be.mean(rbm.exact_log_likelihood(validation, log_Z=log_Z))
+    assert numpy.isclose(monitor.memory[0]['ExactLogLikelihood'], expected,
+                         rtol=1e-4)
+
+def test_ais_log_likelihood_metric():
+    num_visible_units = 8
+    num_hidden_units = 5
+    num_samples = 60
+    batch_size = 10
+
+    be.set_seed()
+    data = be.cast_float(be.rand((num_samples, num_visible_units)) < 0.5)
+    data_batch = batch.in_memory_batch(data, batch_size, train_fraction=0.5)
+
+    rbm = random_rbm(num_visible_units, num_hidden_units)
+    exact = M.ExactLogLikelihood()
+    ais = M.AISLogLikelihood(num_chains=200, num_steps=200)
+    monitor = ProgressMonitor(generator_metrics=[exact, ais])
+    monitor.epoch_update(data_batch, rbm, store=True)
+
+    assert abs(monitor.memory[0]['AISLogLikelihood'] -
+               monitor.memory[0]['ExactLogLikelihood']) < 0.2
+
+def test_exact_requires_bernoulli():
+    rbm = BoltzmannMachine([layers.GaussianLayer(5), layers.BernoulliLayer(3)])
+    with pytest.raises(ValueError):
+        rbm.exact_log_partition_function()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,31 @@
+from paysage import backends as be
+from paysage.models.state import State, PackedState, state_allclose
+
+import pytest
+
+def test_packed_state():
+    num_samples = 50
+    vis = be.float_tensor(be.rand((num_samples, 21)) < 0.5)
+    hid = be.randn((num_samples, 5))
+    state = State([vis, hid])
+
+    packed = PackedState.from_state(state)
+    assert packed.packed == [True, False]
+    assert be.shape(packed.units[0]) == (num_samples, 3)
+    assert packed.batch_size() == num_samples
+    assert state_allclose(packed.unpack(), state)
+
+    indices = be.long_tensor([4, 0, 9])
+    subset = packed.unpack(indices)
+    assert state_allclose(subset, State.from_state(state, indices))
+
+    # write back a range of samples
+    block = State([be.float_tensor(be.rand((10, 21)) < 0.5), be.randn((10, 5))])
+    packed.set_range_(20, 30, block)
+    assert state_allclose(packed.unpack_range(20, 30), block)
+    assert state_allclose(packed.unpack_range(0, 20),
+                          State([t[:20] for t in state]))
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -153,5 +153,28 @@ def test_find_k_nearest_neighbors():
     assert be.allclose(indices, perm)
     assert be.allclose(_distances, be.zeros((20,)), 1e-2, 1e-2)
 
+def test_find_nearest_neighbors_chunked():
+    be.set_seed()
+    k = 4
+    # binary data has many (nearly) tied distances
+    x = be.cast_float(be.rand((50, 8)) < 0.5)
+    y = be.cast_float(be.rand((70, 8)) < 0.5)
+
+    # reference result from a full sort of the distances
+    dist = math_utils.pdist(x, y)
+    sorted_dist = be.sort(dist, axis=1)
+    rows = be.trange(0, 50, dtype=be.Long)
+
+    for max_distances in [1, 100, 1000, 100000]:
+        indices, distances = math_utils.find_nearest_neighbors(x, y, k,
+                                                    max_distances=max_distances)
+        for j in range(k):
+            assert be.allclose(distances[j], sorted_dist[:, j])
+            assert be.allclose(dist[rows, indices[j]], sorted_dist[:, j])
+            # the neighbors are distinct
+            for i in range(j):
+                assert be.tsum(be.cast_float(
+                    be.equal(indices[i], indices[j]))) == 0
+
 if __name__ == "__main__":
     pytest.main([__file__])
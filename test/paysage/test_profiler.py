@@ -0,0 +1,92 @@
+from paysage import backends as be
+from paysage import batch
+from paysage import layers
+from paysage.models import BoltzmannMachine
+from paysage import fit
+from paysage import optimizers
+from paysage import profiler
+
+import pytest
+
+def test_profiler():
+    prof = profiler.Profiler()
+
+    # nothing is recorded while disabled
+    with prof.timer('phase'):
+        pass
+    prof.count('counter')
+    assert prof.summary() == {}
+
+    prof.enable()
+    for _ in range(3):
+        with prof.timer('phase'):
+            pass
+    prof.count('counter', 5)
+    summary = prof.summary()
+    assert summary['count_phase'] == 3
+    assert summary['count_counter'] == 5
+    assert summary['time_phase'] >= 0
+
+    prof.reset()
+    assert prof.summary() == {}
+    prof.disable()
+    assert not prof.enabled
+
+def test_profile_training():
+    num_visible_units = 20
+    num_hidden_units = 10
+    num_samples = 100
+    batch_size = 20
+    num_epochs = 2
+    mcsteps = 2
+
+    be.set_seed()
+    data = be.cast_float(be.rand((num_samples, num_visible_units)) < 0.5)
+    data_batch = batch.in_memory_batch(data, batch_size, train_fraction=0.6)
+
+    rbm = BoltzmannMachine([layers.BernoulliLayer(num_visible_units),
+                            layers.BernoulliLayer(num_hidden_units)])
+    rbm.initialize(data_batch)
+
+    sgd = fit.SGD(rbm, data_batch)
+    sgd.train(optimizers.ADAM(), num_epochs, mcsteps=mcsteps,
+              method=fit.pcd, verbose=False, profile=True)
+    assert not profiler.PROFILER.enabled
+
+    num_minibatches = 60 // batch_size
+    assert len(sgd.monitor.memory) == num_epochs
+    for epoch in sgd.monitor.memory:
+        for phase in ['read_train', 'positive_phase', 'negative_phase',
+                      'gradient', 'optimizer', 'constraints', 'metrics']:
+            assert epoch['time_' + phase] >= 0
+        assert epoch['count_gradient'] == num_minibatches
+        assert epoch['count_optimizer'] == num_minibatches
+        assert epoch['count_mc_steps'] >= 2 * mcsteps * num_minibatches
+    data_batch.close()
+
+def test_profiler_disabled_after_error():
+    num_visible_units = 20
+    num_hidden_units = 10
+    batch_size = 20
+
+    be.set_seed()
+    data = be.cast_float(be.rand((100, num_visible_units)) < 0.5)
+    data_batch = batch.in_memory_batch(data, batch_size, train_fraction=0.6)
+
+    rbm = BoltzmannMachine([layers.BernoulliLayer(num_visible_units),
+                            layers.BernoulliLayer(num_hidden_units)])
+    rbm.initialize(data_batch)
+
+    class FailingOptimizer(optimizers.Gradient):
+        def update(self, model, grad):
+            raise RuntimeError('update failed')
+
+    sgd = fit.SGD(rbm, data_batch)
+    with pytest.raises(RuntimeError):
+        sgd.train(FailingOptimizer(), 1, method=fit.pcd, verbose=False,
+                  profile=True)
+    assert not profiler.PROFILER.enabled
+    data_batch.close()
+
+if __name__ == "__main__":
+    pytest.main([__file__])
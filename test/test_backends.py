@@ -268,6 +268,49 @@ def test_index_select():
     torch_select = torch_matrix.index_select(torch_mat, torch_inds, 1)
     assert_close(py_select, torch_select, "index_select: dim = 1")
 
+def test_index_select_():
+    shape = (100, 100)
+
+    py_rand.set_seed()
+
+    py_mat = py_rand.randn(shape)
+    torch_mat = torch_matrix.float_tensor(py_mat)
+
+    py_inds = py_matrix.long_tensor([0, 7, 5, 3, 2, 1, 5, 8, 4, 2])
+    torch_inds = torch_matrix.long_tensor(py_inds)
+
+    py_select = py_matrix.zeros((len(py_inds), shape[1]))
+    torch_select = torch_matrix.zeros((len(py_inds), shape[1]))
+    py_matrix.index_select_(py_mat, py_inds, py_select)
+    torch_matrix.index_select_(torch_mat, torch_inds, torch_select)
+    assert_close(py_select, torch_select, "index_select_")
+    assert py_matrix.allclose(py_select,
+                              py_matrix.index_select(py_mat, py_inds, 0))
+
+def test_pack_bits():
+    shape = (100, 37)
+
+    py_rand.set_seed()
+    py_mat = py_matrix.float_tensor(py_rand.rand(shape) < 0.5)
+    torch_mat = torch_matrix.float_tensor(py_mat)
+
+    py_packed = py_matrix.pack_bits(py_mat)
+    torch_packed = torch_matrix.pack_bits(torch_mat)
+    assert py_packed.shape == (shape[0], 5)
+    assert py_matrix.allclose(py_packed,
+                              torch_matrix.to_numpy_array(torch_packed))
+
+    assert_close(py_matrix.unpack_bits(py_packed, shape[1]),
+                 torch_matrix.unpack_bits(torch_packed, shape[1]),
+                 "unpack_bits")
+    assert py_matrix.allclose(py_matrix.unpack_bits(py_packed, shape[1]), py_mat)
+
+    py_out = py_matrix.zeros(shape)
+    torch_out = torch_matrix.zeros(shape)
+    py_matrix.unpack_bits_(py_packed, py_out)
+    torch_matrix.unpack_bits_(torch_packed, torch_out)
+    assert_close(py_out, torch_out, "unpack_bits_")
+
 def test_sign():
 
     shape = (100,100)
@@ -980,6 +1023,25 @@ def test_lesser():
     assert py_matrix.allclose(py_res, py_torch_res), \
     "python lesser != torch lesser"
 
+def test_lesser_():
+    shape = (100, 100)
+
+    py_rand.set_seed()
+    py_x = py_rand.randn(shape)
+    py_y = py_rand.randn(shape)
+    py_res = py_matrix.zeros(shape)
+
+    torch_x = torch_matrix.float_tensor(py_x)
+    torch_y = torch_matrix.float_tensor(py_y)
+    torch_res = torch_matrix.zeros(shape)
+
+    py_matrix.lesser_(py_x, py_y, py_res)
+    torch_matrix.lesser_(torch_x, torch_y, torch_res)
+
+    assert_close(py_res, torch_res, "lesser_")
+    assert py_matrix.allclose(py_res, py_matrix.lesser(py_x, py_y)), \
+    "python lesser_ != python lesser"
+
 def test_lesser_equal():
     shape = (100, 100)
 
@@ -1143,6 +1205,48 @@ def test_argsort():
     assert py_matrix.allclose(py_res, py_torch_res), \
     "python argsort != torch argsort"
 
+def test_adam_delta_():
+    shape = (100, 50)
+    stepsize = 0.01
+    mean_norm = 0.1
+    mean_square_norm = 0.001
+
+    py_rand.set_seed()
+    py_mean = py_rand.randn(shape)
+    py_mean_square = py_rand.rand(shape)
+    py_delta = py_matrix.zeros(shape)
+
+    torch_mean = torch_matrix.float_tensor(py_mean)
+    torch_mean_square = torch_matrix.float_tensor(py_mean_square)
+    torch_delta = torch_matrix.zeros(shape)
+
+    py_matrix.adam_delta_(stepsize, mean_norm, mean_square_norm,
+                          py_mean, py_mean_square, py_delta)
+    torch_matrix.adam_delta_(stepsize, mean_norm, mean_square_norm,
+                             torch_mean, torch_mean_square, torch_delta)
+
+    assert_close(py_delta, torch_delta, "adam_delta_")
+
+    ref = stepsize * py_matrix.sqrt_div(py_mean / mean_norm,
+                                        py_mean_square / mean_square_norm)
+    assert py_matrix.allclose(py_delta, ref), \
+    "python adam_delta_ != reference"
+
+def test_kth_smallest():
+    shape = (50, 100)
+    k = 7
+
+    py_rand.set_seed()
+    py_x = py_rand.randn(shape)
+    torch_x = torch_matrix.float_tensor(py_x)
+
+    py_res = py_matrix.kth_smallest(py_x, k, axis=1)
+    torch_res = torch_matrix.kth_smallest(torch_x, k, axis=1)
+
+    assert_close(py_res, torch_res, "kth_smallest")
+    assert py_matrix.allclose(py_res, py_matrix.sort(py_x, axis=1)[:, k-1]), \
+    "python kth_smallest != python sort"
+
 def test_sort():
     shape = (100,)
 
@@ -1252,6 +1356,26 @@ def test_dot():
     # occasionally fails without a looser threshold
     assert_close(py_dot, torch_dot, "dot: matrix-matrix", 1e-4, 1e-4)
 
+def test_dot_():
+    a_shape = (100, 50)
+    b_shape = (50, 20)
+
+    py_rand.set_seed()
+    py_a = py_rand.randn(a_shape)
+    py_b = py_rand.randn(b_shape)
+    py_out = py_matrix.zeros((100, 20))
+    torch_a = torch_matrix.float_tensor(py_a)
+    torch_b = torch_matrix.float_tensor(py_b)
+    torch_out = torch_matrix.zeros((100, 20))
+
+    py_matrix.dot_(py_a, py_b, py_out)
+    torch_matrix.dot_(torch_a, torch_b, torch_out)
+
+    # occasionally fails without a looser threshold
+    assert_close(py_out, torch_out, "dot_: matrix-matrix", 1e-4, 1e-4)
+    assert_close(py_out, torch_matrix.dot(torch_a, torch_b),
+                 "dot_ vs dot", 1e-4, 1e-4)
+
 def test_outer():
     a_shape = (100,)
     b_shape = (100,)
@@ -2349,6 +2473,51 @@ def test_expit():
     torch_y = torch_func.expit(torch_x)
     assert_close(py_y, torch_y, "expit")
 
+def test_expit_():
+    shape = (100, 100)
+
+    py_rand.set_seed()
+    py_x = py_rand.randn(shape)
+    torch_x = torch_matrix.float_tensor(py_x)
+
+    py_y = py_func.expit(py_x)
+    py_func.expit_(py_x)
+    torch_func.expit_(torch_x)
+    assert_close(py_x, torch_x, "expit_")
+    assert_close(py_y, torch_x, "expit_ vs expit")
+
+def test_rand_bernoulli_():
+    shape = (10000, 10)
+
+    py_rand.set_seed()
+    torch_rand.set_seed()
+    py_field = py_rand.randn((1, 10)) * py_matrix.ones(shape)
+    py_loc = py_rand.randn((10,))
+    py_beta = py_rand.rand((shape[0], 1))
+    torch_field = torch_matrix.float_tensor(py_field)
+    torch_loc = torch_matrix.float_tensor(py_loc)
+    torch_beta = torch_matrix.float_tensor(py_beta)
+
+    for (py_b, torch_b) in [(None, None), (py_beta, torch_beta)]:
+        py_out = py_matrix.zeros(shape)
+        torch_out = torch_matrix.zeros(shape)
+        py_rand.rand_bernoulli_(py_matrix.copy_tensor(py_field), py_loc, py_b,
+                                py_matrix.zeros(shape), py_out)
+        torch_rand.rand_bernoulli_(torch_matrix.copy_tensor(torch_field),
+                                   torch_loc, torch_b,
+                                   torch_matrix.zeros(shape), torch_out)
+
+        # compare the sample means to the exact means
+        if py_b is None:
+            p = py_func.expit(py_field + py_loc)
+        else:
+            p = py_func.expit(py_b * (py_field + py_loc))
+        py_mean = py_matrix.mean(py_out, axis=0)
+        torch_mean = torch_matrix.mean(torch_out, axis=0)
+        assert allclose(py_mean, py_matrix.mean(p, axis=0), atol=0.05), \
+        "python rand_bernoulli_ has the wrong mean"
+        assert_close(py_mean, torch_mean, "rand_bernoulli_", atol=0.05)
+
 def test_softmax():
     shape = (100, 100)
 
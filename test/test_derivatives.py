@@ -2,7 +2,10 @@ from paysage import backends as be
 from paysage import layers
 from paysage.models import BoltzmannMachine
 from paysage.models import gradient_util as gu
-from paysage.models.state import StateTAP
+from paysage.models.state import State, StateTAP
+from paysage import optimizers
+from paysage import samplers
+from paysage.fit import methods
 import pytest
 from copy import deepcopy
 from cytoolz import partial
@@ -179,6 +182,133 @@ def test_grad_normalize_():
     assert nrm < 1+1e-6
 
 
+def test_flat_gradient():
+    num_visible_units = 10
+    num_hidden_units = 5
+
+    # set a seed for the random number generator
+    be.set_seed()
+
+    # set up some layer and model objects
+    vis_layer = layers.GaussianLayer(num_visible_units)
+    hid_layer = layers.BernoulliLayer(num_hidden_units)
+    rbm = BoltzmannMachine([vis_layer, hid_layer])
+
+    grad_1 = gu.random_grad(rbm)
+    grad_2 = gu.random_grad(rbm)
+    flat_1 = gu.FlatGradient.from_gradient(grad_1)
+    flat_2 = gu.FlatGradient.from_gradient(grad_2, flat_1.layout)
+
+    # the views have the structure of the gradient
+    assert be.allclose(flat_1.layers[0][0].log_var, grad_1.layers[0][0].log_var)
+    assert be.allclose(flat_1.weights[0][0].matrix, grad_1.weights[0][0].matrix)
+
+    def check(tree, flat):
+        assert isinstance(flat, gu.FlatGradient)
+        assert be.allclose(gu.grad_flatten(tree), flat.vector)
+
+    check(gu.grad_apply(be.square, grad_1), gu.grad_apply(be.square, flat_1))
+    check(gu.grad_mapzip(be.add, grad_1, grad_2),
+          gu.grad_mapzip(be.add, flat_1, flat_2))
+    assert abs(gu.grad_norm(grad_1) - gu.grad_norm(flat_1)) < 1e-4
+    assert abs(gu.grad_rms(grad_1) - gu.grad_rms(flat_1)) < 1e-4
+
+    # the in place functions write through to the views
+    gu.grad_mapzip_(be.add_, grad_1, grad_2)
+    gu.grad_mapzip_(be.add_, flat_1, flat_2)
+    gu.grad_apply_(be.square, grad_1)
+    gu.grad_apply_(be.square, flat_1)
+    check(grad_1, flat_1)
+    assert be.allclose(flat_1.layers[1][0].loc, grad_1.layers[1][0].loc)
+
+    # copies do not share memory
+    flat_3 = deepcopy(flat_1)
+    gu.grad_apply_(partial(be.tmul_, 0), flat_3)
+    assert be.allclose(flat_3.weights[0][0].matrix,
+                       be.zeros_like(flat_3.weights[0][0].matrix))
+    check(grad_1, flat_1)
+
+def test_flat_parameter_update():
+    num_visible_units = 10
+    num_hidden_units = 5
+    num_samples = 20
+
+    # set a seed for the random number generator
+    be.set_seed()
+
+    models = []
+    for flat in [False, True]:
+        vis_layer = layers.GaussianLayer(num_visible_units)
+        hid_layer = layers.BernoulliLayer(num_hidden_units)
+        vis_layer.set_fixed_params(["log_var"])
+        rbm = BoltzmannMachine([vis_layer, hid_layer])
+        models.append(rbm)
+    models[1].copy_params(models[0])
+    models[1].use_flat_parameters()
+    assert be.allclose(models[0].connections[0].weights.W(),
+                       models[1].connections[0].weights.W())
+
+    vdata = be.randn((num_samples, num_visible_units))
+    for opt_class in [optimizers.Gradient, optimizers.Momentum,
+                      optimizers.RMSProp, optimizers.ADAM]:
+        opts = [opt_class(), opt_class()]
+        for step in range(3):
+            data_state = State.from_visible(vdata, models[0])
+            model_state = State.from_model(num_samples, models[0])
+            for rbm, opt in zip(models, opts):
+                opt.update_lr()
+                grad = rbm.gradient(data_state, model_state)
+                opt.update(rbm, grad)
+            assert isinstance(opts[1].delta, gu.FlatGradient)
+            for i in range(2):
+                for p0, p1 in zip(models[0].layers[i].params,
+                                  models[1].layers[i].params):
+                    assert be.allclose(p0, p1)
+            assert be.allclose(models[0].connections[0].weights.W(),
+                               models[1].connections[0].weights.W())
+
+    # the layer params are views into the flat vector
+    assert be.allclose(models[1].flat_params.layers[0][0].loc,
+                       models[1].layers[0].params.loc)
+    assert be.allclose(models[1].layers[0].params.log_var,
+                       be.zeros((num_visible_units,)))
+
+
+def test_fused_optimizers():
+    num_visible_units = 10
+    num_hidden_units = 5
+
+    # set a seed for the random number generator
+    be.set_seed()
+
+    for flat in [False, True]:
+        vis_layer = layers.GaussianLayer(num_visible_units)
+        hid_layer = layers.BernoulliLayer(num_hidden_units)
+        rbm = BoltzmannMachine([vis_layer, hid_layer])
+        if flat:
+            rbm.use_flat_parameters()
+
+        for opt, mean_weight, mean_square_weight in [
+                (optimizers.ADAM(), 0.9, 0.999),
+                (optimizers.ADAM(mean_square_weight=0), 0.9, 0),
+                (optimizers.RMSProp(), 0, 0.9)]:
+            # the unfused reference computation of the step
+            memory = optimizers.GradientMemory(mean_weight, mean_square_weight)
+            opt.update_lr()
+            for step in range(4):
+                grad = gu.random_grad(rbm)
+                if flat:
+                    grad = gu.FlatGradient.from_gradient(grad)
+                memory.update(gu.grad_apply(be.copy_tensor, grad))
+                mean = memory.mean_gradient if mean_weight else grad
+                ref_delta = memory.normalize(mean, True)
+                gu.grad_apply_(partial(be.tmul_, opt.lr), ref_delta)
+
+                opt.update(rbm, grad)
+                assert be.allclose(gu.grad_flatten(ref_delta),
+                                   gu.grad_flatten(opt.delta))
+
+
 # ----- Layer Methods ----- #
 
 def test_bernoulli_conditional_params():
@@ -575,6 +705,142 @@ def test_gaussian_Compute_StateTAP_self_consistent():
             assert False, \
                 "compute_StateTAP_self_consistent is not reducing the GFE"
 
+def test_batch_Compute_StateTAP():
+    num_units = 10
+    num_seeds = 6
+
+    # set a seed for the random number generator
+    be.set_seed()
+
+    layer_1 = layers.BernoulliLayer(num_units)
+    layer_2 = layers.BernoulliLayer(num_units)
+    layer_3 = layers.BernoulliLayer(num_units)
+    rbm = BoltzmannMachine([layer_1, layer_2, layer_3])
+    for i in range(len(rbm.connections)):
+        rbm.connections[i].weights.params.matrix[:] = \
+        0.1 * be.randn(rbm.connections[i].shape)
+
+    for lay in rbm.layers:
+        lay.params.loc[:] = be.randn(be.shape(lay.params.loc))
+
+    seeds = StateTAP.from_model_rand_batch(rbm, num_seeds)
+    seed_GFE = rbm.gibbs_free_energy(seeds.cumulants)
+    assert be.shape(seed_GFE) == (num_seeds,)
+
+    for use_GD in [True, False]:
+        state, GFE = rbm.compute_StateTAP(use_GD=use_GD, seed=seeds,
+                                          tol=1e-7, max_iters=10)
+        assert be.shape(GFE) == (num_seeds,)
+        assert be.shape(state.cumulants[0].mean) == (num_seeds, num_units)
+
+        for k in range(num_seeds):
+            # minimize from the k'th seed on its own
+            cumulants = [be.apply(lambda x: be.copy_tensor(x[k]), c)
+                         for c in seeds.cumulants]
+            single_seed = StateTAP(cumulants,
+                                   rbm.lagrange_multipliers_analytic(cumulants))
+            assert be.allclose(be.float_tensor([seed_GFE[k]]),
+                be.float_tensor([rbm.gibbs_free_energy(cumulants)]))
+
+            single_state, single_GFE = rbm.compute_StateTAP(
+                use_GD=use_GD, seed=single_seed, tol=1e-7, max_iters=10)
+            assert be.allclose(be.float_tensor([GFE[k]]),
+                               be.float_tensor([single_GFE]))
+            assert be.allclose(state.cumulants[1].mean[k],
+                               single_state.cumulants[1].mean, atol=1e-5)
+
+    # the seed is not modified
+    assert be.allclose(seed_GFE, rbm.gibbs_free_energy(seeds.cumulants))
+
+def test_TAP_warm_start():
+    num_visible_units = 20
+    num_hidden_units = 10
+    batch_size = 25
+    num_updates = 6
+
+    # set a seed for the random number generator
+    be.set_seed()
+
+    vis_layer = layers.BernoulliLayer(num_visible_units)
+    hid_layer = layers.BernoulliLayer(num_hidden_units)
+    rbm = BoltzmannMachine([vis_layer, hid_layer])
+    rbm.connections[0].weights.params.matrix[:] = \
+        0.1 * be.randn(rbm.connections[0].shape)
+
+    vdata = be.cast_float(be.rand((batch_size, num_visible_units)) < 0.3)
+    positive_phase = samplers.SequentialMC(rbm, clamped=[0], beta_std=0)
+    opt = optimizers.Gradient()
+    opt.update_lr()
+
+    tap = methods.TAP(tolerance=1e-7, max_iters=10, warm_start=True,
+                      refresh_interval=4)
+    for i in range(num_updates):
+        grad = tap.tap_update(vdata, rbm, positive_phase)
+        opt.update(rbm, grad)
+        assert tap.state is not None
+        # the count restarts when the seed is refreshed
+        assert tap.num_updates == i % 4 + 1
+
+    # the warm started minimization is at least as good as a cold start
+    # with the same budget of iterations
+    warm_state = tap._warm_state(rbm)
+    _, cold_GFE = rbm.compute_StateTAP(tol=1e-7, max_iters=10,
+        seed=StateTAP.from_model_rand_batch(rbm, 5))
+    assert rbm.gibbs_free_energy(warm_state.cumulants) <= be.tmin(cold_GFE) + 1e-4
+
+    tap.reset()
+    assert tap.state is None and tap.moments is None
+
+def test_rescaled_weight_cache():
+    num_visible_units = 8
+    num_hidden_units = 5
+
+    # set a seed for the random number generator
+    be.set_seed()
+
+    vis_layer = layers.GaussianLayer(num_visible_units)
+    hid_layer = layers.BernoulliLayer(num_hidden_units)
+    rbm = BoltzmannMachine([vis_layer, hid_layer])
+    rbm.connections[0].weights.params.matrix[:] = \
+        0.1 * be.randn(rbm.connections[0].shape)
+    vis_layer.params.log_var[:] = be.randn((num_visible_units,))
+
+    # the rescaled weights are reused while the parameters are fixed
+    (w, w2) = rbm._get_rescaled_weights()
+    assert rbm._get_rescaled_weights()[0][0] is w[0]
+    scale = vis_layer.reciprocal_scale()
+    expected = be.multiply(be.unsqueeze(scale, axis=1),
+                           rbm.connections[0].weights.W())
+    assert be.allclose(w[0], expected)
+    assert be.allclose(w2[0], be.square(expected))
+
+    # an update of either the layers or the weights invalidates them
+    rbm.parameter_update(gu.random_grad(rbm))
+    (w, w2) = rbm._get_rescaled_weights()
+    scale = vis_layer.reciprocal_scale()
+    expected = be.multiply(be.unsqueeze(scale, axis=1),
+                           rbm.connections[0].weights.W())
+    assert be.allclose(w[0], expected)
+    assert be.allclose(rbm._get_reciprocal_scales()[0], scale)
+
+    vis_layer.set_params([layers.ParamsGaussian(vis_layer.params.loc,
+                                                vis_layer.params.log_var + 1)])
+    assert not be.allclose(rbm._get_rescaled_weights()[0][0], w[0])
+
+    # direct writes to the parameters are marked explicitly
+    rbm._get_rescaled_weights()
+    vis_layer.params.log_var[:] = be.randn((num_visible_units,))
+    rbm.connections[0].weights.params.matrix[:] = \
+        0.1 * be.randn(rbm.connections[0].shape)
+    rbm.mark_parameters_changed()
+    (w, w2) = rbm._get_rescaled_weights()
+    scale = vis_layer.reciprocal_scale()
+    expected = be.multiply(be.unsqueeze(scale, axis=1),
+                           rbm.connections[0].weights.W())
+    assert be.allclose(w[0], expected)
+    assert be.allclose(w2[0], be.square(expected))
+    assert be.allclose(rbm._get_reciprocal_scales()[0], scale)
+
 def test_gaussian_Compute_StateTAP_GD():
     num_units = 10
 
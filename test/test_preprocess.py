@@ -51,5 +51,10 @@ def test_transformation_config():
     config_result = [transformer_from_config.compute(tensor) for tensor in tensors]
     assert compare_lists(transformer_result, config_result)
 
+def test_deterministic_transformation_config():
+    transformer = pre.Transformation(pre.l2_normalize, deterministic=True)
+    config = transformer.get_config()
+    assert pre.Transformation.from_config(config).deterministic
+
 if __name__ == "__main__":
     pytest.main([__file__])
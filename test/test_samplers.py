@@ -1,9 +1,11 @@
 from paysage import backends as be
 from paysage import layers
 from paysage.models import BoltzmannMachine
+from paysage.models import gradient_util as gu
 from paysage import math_utils as mu
-from paysage.models.state import State
+from paysage.models.state import State, state_allclose
 from paysage import samplers
+from paysage.fit import methods
 
 import pytest
 
@@ -152,6 +154,123 @@ def test_conditional_sampling():
             assert close, "{} conditional standard deviation".format(layer_type)
 
 
+def test_inplace_iteration():
+    """
+    Test that the in-place updates match the updates that allocate new states,
+    and that in-place sampling draws from the correct distribution.
+
+    Note:
+        The sampling part of this test compares values estimated by *sampling*
+        to values computed analytically. It can fail for small batch_size,
+        or strict tolerances, even if everything is working propery.
+
+    """
+    num_visible_units = 20
+    num_hidden_units = 10
+    batch_size = 1000
+    steps = 10
+    mean_tol = 0.2
+
+    # set a seed for the random number generator
+    be.set_seed()
+
+    layer_types = [
+            layers.BernoulliLayer,
+            layers.GaussianLayer]
+
+    for layer_type in layer_types:
+        # set up some layer and model objects
+        vis_layer = layer_type(num_visible_units)
+        hid_layer = layer_type(num_hidden_units)
+        rbm = BoltzmannMachine([vis_layer, hid_layer])
+
+        # randomly set the intrinsic model parameters
+        a = be.rand((num_visible_units,))
+        b = be.rand((num_hidden_units,))
+        W = be.randn((num_visible_units, num_hidden_units)) / num_visible_units
+
+        rbm.layers[0].params.loc[:] = a
+        rbm.layers[1].params.loc[:] = b
+        rbm.connections[0].weights.params.matrix[:] = W
+
+        if layer_type == layers.GaussianLayer:
+            log_var_a = be.randn((num_visible_units,))
+            log_var_b = be.randn((num_hidden_units,))
+            rbm.layers[0].params.log_var[:] = log_var_a
+            rbm.layers[1].params.log_var[:] = log_var_b
+
+        # the deterministic updates should match exactly
+        buffers = rbm.get_sampling_buffers(batch_size)
+        for u in ['mean_field_iteration', 'deterministic_iteration']:
+            state = State.from_model(batch_size, rbm)
+            new_state = getattr(rbm, u)(steps, state)
+            tensors = [state[i] for i in range(state.len)]
+            getattr(rbm, u + '_')(steps, state, buffers=buffers)
+            for i in range(rbm.num_layers):
+                assert state[i] is tensors[i], \
+                "{0} {1}: state was not updated in place".format(layer_type, u)
+                assert be.allclose(new_state[i], state[i],
+                                   rtol=1e-4, atol=1e-4), \
+                "{0} {1}: in-place update does not match".format(layer_type, u)
+
+        # the sample means should match the model means without weights
+        rbm.connections[0].weights.params.matrix[:] = \
+            be.zeros((num_visible_units, num_hidden_units))
+        state = State.from_model(batch_size, rbm)
+        rbm.markov_chain_(steps, state, buffers=buffers)
+
+        state_for_moments = State.from_model(1, rbm)
+        for i in range(rbm.num_layers):
+            model_mean = rbm.layers[i].conditional_mean(
+                rbm._connected_rescaled_units(i, state_for_moments),
+                rbm._connected_weights(i))
+            close = be.allclose(be.mean(state[i], axis=0), model_mean[0],
+                                rtol=mean_tol, atol=mean_tol)
+            assert close, \
+            "{0} {1}: sample mean does not match model mean".format(layer_type, i)
+
+
+def test_sampling_plan():
+    num_units = [20, 10, 5]
+
+    # set a seed for the random number generator
+    be.set_seed()
+
+    # set up a deep model
+    dbm = BoltzmannMachine([layers.BernoulliLayer(n) for n in num_units])
+    for conn in dbm.connections:
+        conn.weights.set_params(layers.ParamsWeights(be.randn(conn.shape)))
+
+    # the plan is reused while the connections do not change
+    plan = dbm.get_sampling_plan()
+    assert dbm.get_sampling_plan() is plan, "plan should be cached"
+    assert plan.layer_schedule([]) == [1, 0, 2]
+    assert plan.layer_schedule([0]) == [1, 2]
+
+    def check_plan_weights():
+        for i in range(dbm.num_layers):
+            for w_plan, w_model in zip(plan.connected_weights(i),
+                                       dbm._connected_weights(i)):
+                assert be.allclose(w_plan, w_model), \
+                    "planned weights do not match"
+
+    check_plan_weights()
+
+    # the plan sees a parameter update
+    deltas = gu.random_grad(dbm)
+    dbm.parameter_update(deltas)
+    assert dbm.get_sampling_plan() is plan, "plan should not be rebuilt"
+    check_plan_weights()
+
+    # and a direct write to the parameters
+    dbm.connections[0].weights.params.matrix[:] = be.zeros(dbm.connections[0].shape)
+    check_plan_weights()
+
+    # and parameters that are replaced by views into a flat vector
+    dbm.use_flat_parameters()
+    check_plan_weights()
+
+
 # ----- TEST SAMPLER CLASSES ----- #
 
 def test_clamped_SequentialMC():
@@ -238,6 +357,64 @@ def test_unclamped_SequentialMC():
         assert not be.allclose(data_state[1], sampler.state[1]), \
         "hidden layer is not clamped, and should get updated: {}".format(u)
 
+def test_inplace_SequentialMC():
+    num_visible_units = 100
+    num_hidden_units = 50
+    batch_size = 25
+    steps = 1
+
+    # set a seed for the random number generator
+    be.set_seed()
+
+    # set up some layer and model objects
+    vis_layer = layers.BernoulliLayer(num_visible_units)
+    hid_layer = layers.BernoulliLayer(num_hidden_units)
+    rbm = BoltzmannMachine([vis_layer, hid_layer])
+
+    # randomly set the intrinsic model parameters
+    a = be.randn((num_visible_units,))
+    b = be.randn((num_hidden_units,))
+    W = be.randn((num_visible_units, num_hidden_units))
+
+    rbm.layers[0].params.loc[:] = a
+    rbm.layers[1].params.loc[:] = b
+    rbm.connections[0].weights.params.matrix[:] = W
+
+    # generate a random batch of data
+    vdata = rbm.layers[0].random((batch_size, num_visible_units))
+    data_state = State.from_visible(vdata, rbm)
+    data_copy = State.from_state(data_state)
+
+    for u in ['markov_chain', 'mean_field_iteration', 'deterministic_iteration']:
+        # set up the sampler with the visible layer clamped
+        sampler = samplers.SequentialMC(rbm, updater=u, clamped=[0],
+                                        beta_std=0, inplace=True)
+        sampler.set_state(data_state)
+        tensors = [sampler.state[i] for i in range(sampler.state.len)]
+
+        # update the sampler state and check the output
+        sampler.update_state(steps)
+
+        for i in range(sampler.state.len):
+            assert sampler.state[i] is tensors[i], \
+            "state should be updated in place: {}".format(u)
+            assert be.allclose(data_state[i], data_copy[i]), \
+            "the state passed to the sampler should not be modified: {}".format(u)
+
+        assert be.allclose(data_state[0], sampler.state[0]), \
+        "visible layer is clamped, and shouldn't get updated: {}".format(u)
+
+        assert not be.allclose(data_state[1], sampler.state[1]), \
+        "hidden layer is not clamped, and should get updated: {}".format(u)
+
+        # setting a state with the same batch size reuses the owned tensors
+        sampler.set_state(data_state)
+        for i in range(sampler.state.len):
+            assert sampler.state[i] is tensors[i], \
+            "owned state should be reused: {}".format(u)
+            assert be.allclose(data_state[i], sampler.state[i]), \
+            "owned state should be a copy of the state: {}".format(u)
+
 def test_state_for_grad_SequentialMC():
     num_visible_units = 100
     num_hidden_units = 50
@@ -286,6 +463,151 @@ def test_state_for_grad_SequentialMC():
         assert be.allclose(ave, grad_state[1]), \
         "hidden layer of grad_state should be conditional mean: {}".format(u)
 
+def test_ParallelTempering():
+    num_visible_units = 100
+    num_hidden_units = 50
+    batch_size = 25
+    num_replicas = 4
+    steps = 2
+
+    # set a seed for the random number generator
+    be.set_seed()
+
+    # set up some layer and model objects
+    vis_layer = layers.BernoulliLayer(num_visible_units)
+    hid_layer = layers.BernoulliLayer(num_hidden_units)
+    rbm = BoltzmannMachine([vis_layer, hid_layer])
+
+    # randomly set the intrinsic model parameters
+    a = be.randn((num_visible_units,))
+    b = be.randn((num_hidden_units,))
+    W = be.randn((num_visible_units, num_hidden_units))
+
+    rbm.layers[0].params.loc[:] = a
+    rbm.layers[1].params.loc[:] = b
+    rbm.connections[0].weights.params.matrix[:] = W
+
+    for inplace in [False, True]:
+        sampler = samplers.ParallelTempering.from_model(
+            rbm, batch_size, num_replicas=num_replicas, min_beta=0.25,
+            inplace=inplace)
+        assert sampler.replicas.batch_size() == batch_size * num_replicas
+        assert sampler.state.batch_size() == batch_size
+        assert be.allclose(sampler.betas[:batch_size], be.ones((batch_size, 1)))
+
+        # swaps only exchange configurations between replicas
+        sums = [be.tsum(t, axis=0) for t in sampler.replicas]
+        for _ in range(2):
+            sampler._swap_replicas_()
+        for s, t in zip(sums, sampler.replicas):
+            assert be.allclose(s, be.tsum(t, axis=0)), \
+            "swaps should permute the replicas"
+
+        # update the state
+        sampler.update_state(steps)
+        assert sampler.state.batch_size() == batch_size
+        assert be.allclose(sampler.state[0], sampler.replicas[0][:batch_size])
+        for rate in sampler.acceptance_rates():
+            assert 0 <= rate <= 1
+
+        # compute a gradient with the sampler as the negative phase
+        vdata = rbm.layers[0].random((batch_size, num_visible_units))
+        positive_phase = samplers.SequentialMC(rbm, clamped=[0], beta_std=0)
+        grad = methods.pcd(vdata, rbm, positive_phase, sampler)
+        assert be.shape(grad.weights[0][0].matrix) == \
+            (num_visible_units, num_hidden_units)
+
+def test_PackedPersistentMC():
+    num_visible_units = 100
+    num_hidden_units = 50
+    batch_size = 25
+    num_chains = 60
+
+    # set a seed for the random number generator
+    be.set_seed()
+
+    # set up some layer and model objects
+    vis_layer = layers.BernoulliLayer(num_visible_units)
+    hid_layer = layers.GaussianLayer(num_hidden_units)
+    rbm = BoltzmannMachine([vis_layer, hid_layer])
+    rbm.connections[0].weights.params.matrix[:] = \
+        0.1 * be.randn((num_visible_units, num_hidden_units))
+
+    for inplace in [False, True]:
+        sampler = samplers.PackedPersistentMC.from_model(
+            rbm, batch_size, num_chains=num_chains, inplace=inplace)
+        # only the binary layer is packed
+        assert sampler.pool.packed == [True, False]
+        assert be.shape(sampler.pool.units[0]) == (num_chains, 13)
+        assert sampler.pool.batch_size() == num_chains
+
+        # the blocks cycle through the pool and are packed back into it
+        blocks = []
+        for _ in range(4):
+            sampler.update_state()
+            blocks.append(sampler.block)
+            start, stop = sampler.block
+            assert sampler.state.batch_size() == stop - start
+            assert state_allclose(sampler.pool.unpack_range(start, stop),
+                                  sampler.state)
+        assert blocks == [(0, 25), (25, 50), (50, 60), (0, 25)]
+
+        # compute a gradient with the sampler as the negative phase
+        vdata = rbm.layers[0].random((batch_size, num_visible_units))
+        positive_phase = samplers.SequentialMC(rbm, clamped=[0], beta_std=0)
+        grad = methods.pcd(vdata, rbm, positive_phase, sampler)
+        assert be.shape(grad.weights[0][0].matrix) == \
+            (num_visible_units, num_hidden_units)
+
+def test_AnnealedImportanceSampler():
+    """
+    Compare the AIS estimate of the log partition function of a small rbm
+    to the value computed by exact enumeration.
+
+    Note:
+        This test compares values estimated by *sampling* to values computed
+        exactly. It can fail for few chains, or strict tolerances,
+        even if everything is working propery.
+
+    """
+    num_visible_units = 20
+    num_hidden_units = 8
+    num_chains = 300
+    chunk_size = 120
+
+    be.set_seed()
+
+    vis_layer = layers.BernoulliLayer(num_visible_units)
+    hid_layer = layers.BernoulliLayer(num_hidden_units)
+    rbm = BoltzmannMachine([vis_layer, hid_layer])
+    rbm.connections[0].weights.params.matrix[:] = \
+        0.3 * be.randn((num_visible_units, num_hidden_units))
+    vis_layer.params.loc[:] = be.randn((num_visible_units,))
+    hid_layer.params.loc[:] = be.randn((num_hidden_units,))
+    rbm.set_clamped_sampling([0])
+
+    ais = samplers.AnnealedImportanceSampler(rbm, num_chains=num_chains,
+                                             num_steps=300,
+                                             chunk_size=chunk_size)
+    log_Z = ais.run()
+
+    assert len(ais.log_weights) == num_chains
+    assert abs(log_Z - rbm.exact_log_partition_function()) < 0.1
+    # the clamping of the model is restored
+    assert rbm.clamped_sampling == [0]
+
+    # even if the annealing fails
+    def failing_anneal(num_chains, betas):
+        raise RuntimeError('annealing failed')
+    ais._anneal = failing_anneal
+    with pytest.raises(RuntimeError):
+        ais.run()
+    assert rbm.clamped_sampling == [0]
+
+    with pytest.raises(ValueError):
+        samplers.AnnealedImportanceSampler(
+            BoltzmannMachine([layers.GaussianLayer(5), layers.BernoulliLayer(3)]))
+
 def test_clamped_DrivenSequentialMC():
     num_visible_units = 100
     num_hidden_units = 50